@@ -1,18 +1,81 @@
+import argparse
 import subprocess
 from flask import Flask, request, jsonify
 import threading
 import time
 import os
 import sys
+import tempfile
 import uuid
 
+from task_scheduler import DuplicateTaskError, QueueFullError, TaskScheduler
+
 app = Flask(__name__)
 
 # 存储执行状态和结果
 execution_status = {}
+# 任务准入控制, 限制同时执行的任务数和排队任务数, 启动时根据参数重新创建
+scheduler = TaskScheduler()
+# 新窗口模式下检查主脚本是否退出的间隔（秒）
+WINDOW_POLL_INTERVAL = 2
+
+
+def start_in_thread(task_id, target, args):
+    """在新线程中执行任务, 结束后释放调度器名额"""
+    def run():
+        try:
+            target(task_id, *args)
+        except Exception as e:
+            # 执行函数在更新状态之前出错时记录失败, 避免任务一直显示为排队或执行中
+            status = execution_status.get(task_id)
+            if status is not None:
+                status["running"] = False
+                status["queued"] = False
+                status["last_error"] = {
+                    "returncode": -1,
+                    "stdout": "",
+                    "stderr": str(e),
+                    "completed": False
+                }
+                status["end_time"] = time.time()
+            print(f"执行异常，任务ID: {task_id}: {e}")
+        finally:
+            scheduler.finish(task_id)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+def window_exit_file(task_id):
+    """新窗口中的主脚本退出时写入返回码的文件"""
+    return os.path.join(tempfile.gettempdir(), f"chaoxing_task_{task_id}.exit")
+
+
+def wait_window_exit(exit_file):
+    """
+    等待新窗口中的主脚本退出, 返回其返回码
+
+    终端程序打开窗口后会立即返回, 只能通过窗口中命令写入的返回码文件判断主脚本何时结束
+    """
+    while True:
+        if os.path.exists(exit_file):
+            with open(exit_file, encoding="utf8", errors="ignore") as f:
+                content = f.read().strip()
+            # 文件刚创建时内容可能还未写入
+            if content:
+                os.remove(exit_file)
+                try:
+                    return int(content)
+                except ValueError:
+                    return -1
+        time.sleep(WINDOW_POLL_INTERVAL)
+
 
 def run_main_script_in_new_window(task_id, username, password, list_id):
-    """在新的命令窗口中运行主脚本"""
+    """
+    在新的命令窗口中运行主脚本, 主脚本退出后才返回, 使调度器名额覆盖主脚本的整个运行过程
+    """
     global execution_status
     
     execution_status[task_id] = {
@@ -23,55 +86,71 @@ def run_main_script_in_new_window(task_id, username, password, list_id):
     }
     
     try:
+        exit_file = window_exit_file(task_id)
         # 根据操作系统选择不同的命令
         if sys.platform == "win32":
-            # Windows 系统
-            cmd = [
-                "cmd", "/c", "start", "cmd", "/k",
-                f"python main.py -u {username} -p {password} -l {list_id} && echo 执行完成 && pause"
-            ]
-        elif sys.platform == "darwin":
-            # macOS 系统
-            cmd = [
-                "osascript", "-e",
-                f'tell app "Terminal" to do script "cd {os.getcwd()} && python main.py -u {username} -p {password} -l {list_id}"'
-            ]
+            # Windows 系统, 直接在新控制台中启动主脚本并等待其退出, 关闭窗口也会结束主脚本
+            cmd = ["python", "main.py", "-u", username, "-p", password, "-l", str(list_id)]
+            print(f"开始在新窗口中执行命令，任务ID: {task_id}")
+            print(f"命令: {' '.join(cmd)}")
+            process = subprocess.Popen(cmd, creationflags=subprocess.CREATE_NEW_CONSOLE)
+            print(f"新窗口启动成功，任务ID: {task_id}")
+            returncode = process.wait()
         else:
-            # Linux 系统
-            cmd = [
-                "x-terminal-emulator", "-e",
-                f"bash -c 'cd {os.getcwd()} && python main.py -u {username} -p {password} -l {list_id}; exec bash'"
-            ]
-        
-        print(f"开始在新窗口中执行命令，任务ID: {task_id}")
-        print(f"命令: {' '.join(cmd)}")
-        
-        # 执行命令打开新窗口
-        result = subprocess.run(
-            cmd, 
-            capture_output=True, 
-            text=True,
-            timeout=30  # 打开窗口的超时时间
-        )
+            # 主脚本结束或窗口被关闭时写入返回码
+            script = f"python main.py -u {username} -p {password} -l {list_id}; echo $? > {exit_file}"
+            if sys.platform == "darwin":
+                # macOS 系统
+                cmd = [
+                    "osascript", "-e",
+                    f'tell app "Terminal" to do script "cd {os.getcwd()} && trap \'echo 129 > {exit_file}; exit\' HUP; {script}"'
+                ]
+            else:
+                # Linux 系统
+                cmd = [
+                    "x-terminal-emulator", "-e",
+                    f"bash -c 'cd {os.getcwd()} && trap \"echo 129 > {exit_file}; exit\" HUP; {script}; exec bash'"
+                ]
+            
+            print(f"开始在新窗口中执行命令，任务ID: {task_id}")
+            print(f"命令: {' '.join(cmd)}")
+            
+            # 执行命令打开新窗口
+            result = subprocess.run(
+                cmd, 
+                capture_output=True, 
+                text=True,
+                timeout=30  # 打开窗口的超时时间
+            )
+            if result.returncode != 0:
+                execution_status[task_id]["last_error"] = {
+                    "returncode": result.returncode,
+                    "stdout": result.stdout,
+                    "stderr": result.stderr,
+                    "window_opened": False
+                }
+                print(f"新窗口启动失败，任务ID: {task_id}, 返回码: {result.returncode}")
+                return
+            print(f"新窗口启动成功，任务ID: {task_id}")
+            returncode = wait_window_exit(exit_file)
         
-        # 由于是在新窗口中执行，我们无法直接捕获执行结果
-        # 这里主要检查窗口是否成功打开
-        if result.returncode == 0:
+        # 输出显示在新窗口中, 这里只记录主脚本的返回码
+        if returncode == 0:
             execution_status[task_id]["last_result"] = {
                 "returncode": 0,
-                "stdout": "新窗口已启动，请在窗口中查看执行结果",
+                "stdout": "请在窗口中查看执行结果",
                 "stderr": "",
                 "window_opened": True
             }
-            print(f"新窗口启动成功，任务ID: {task_id}")
+            print(f"命令执行成功，任务ID: {task_id}")
         else:
             execution_status[task_id]["last_error"] = {
-                "returncode": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "window_opened": False
+                "returncode": returncode,
+                "stdout": "请在窗口中查看执行结果",
+                "stderr": "",
+                "window_opened": True
             }
-            print(f"新窗口启动失败，任务ID: {task_id}, 返回码: {result.returncode}")
+            print(f"命令执行失败，任务ID: {task_id}, 返回码: {returncode}")
             
     except subprocess.TimeoutExpired:
         execution_status[task_id]["last_error"] = {
@@ -90,8 +169,6 @@ def run_main_script_in_new_window(task_id, username, password, list_id):
         }
         print(f"执行异常，任务ID: {task_id}: {e}")
     finally:
-        # 注意：由于是在新窗口中执行，我们无法准确知道任务何时完成
-        # 这里只是标记窗口启动过程完成
         execution_status[task_id]["running"] = False
         execution_status[task_id]["end_time"] = time.time()
 
@@ -186,26 +263,46 @@ def run_script():
     
     # 获取执行模式，默认为新窗口模式
     use_new_window = data.get('new_window', True)
+    target = run_main_script_in_new_window if use_new_window else run_main_script_background
+    mode = "新窗口模式" if use_new_window else "后台模式"
     
-    # 在新线程中执行脚本
-    if use_new_window:
-        thread = threading.Thread(
-            target=run_main_script_in_new_window,
-            args=(task_id, username, password, list_id)
-        )
-    else:
-        thread = threading.Thread(
-            target=run_main_script_background,
-            args=(task_id, username, password, list_id)
+    # 执行名额已满时进入队列, 同一账号只允许一个未完成的任务
+    # 排队中的任务状态, 开始执行时由执行函数更新
+    execution_status[task_id] = {
+        "running": True,
+        "queued": True,
+        "last_result": None,
+        "last_error": None,
+        "start_time": time.time()
+    }
+    try:
+        position = scheduler.submit(
+            task_id, str(username),
+            lambda: start_in_thread(task_id, target, (username, password, list_id))
         )
+    except DuplicateTaskError as e:
+        del execution_status[task_id]
+        return jsonify({
+            "status": "error",
+            "message": f"账号 {username} 已有未完成的任务",
+            "task_id": e.task_id
+        }), 409
+    except QueueFullError as e:
+        del execution_status[task_id]
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 429
     
-    thread.daemon = True
-    thread.start()
-    
+    if position == 0:
+        message = f"任务已开始执行（{mode}）"
+    else:
+        message = f"任务已加入队列，当前排在第 {position} 位（{mode}）"
     return jsonify({
         "status": "success",
-        "message": "任务已开始执行" + ("（新窗口模式）" if use_new_window else "（后台模式）"),
+        "message": message,
         "task_id": task_id,
+        "queue_position": position,
         "new_window": use_new_window
     })
 
@@ -218,7 +315,10 @@ def get_status():
 def get_task_status(task_id):
     """获取特定任务状态的API接口"""
     if task_id in execution_status:
-        return jsonify(execution_status[task_id])
+        # queue_position: 0 表示执行中, 大于0表示排队位置, None 表示已结束
+        status = dict(execution_status[task_id])
+        status["queue_position"] = scheduler.position(task_id)
+        return jsonify(status)
     else:
         return jsonify({
             "status": "error",
@@ -232,7 +332,7 @@ def list_tasks():
     for task_id, status in execution_status.items():
         task_info = {
             "task_id": task_id,
-            "status": "running" if status["running"] else "completed",
+            "status": "queued" if status.get("queued") else ("running" if status["running"] else "completed"),
             "start_time": status.get("start_time"),
             "end_time": status.get("end_time")
         }
@@ -249,7 +349,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": time.time(),
-        "active_tasks": len([t for t in execution_status.values() if t["running"]])
+        "active_tasks": len([t for t in execution_status.values() if t["running"]]),
+        "scheduler": scheduler.stats()
     })
 
 @app.route('/api/cleanup', methods=['POST'])
@@ -276,7 +377,17 @@ def cleanup_tasks():
     })
 
 if __name__ == '__main__':
-    print("启动接口服务，监听端口 5000")
+    parser = argparse.ArgumentParser(description="学习任务接口服务")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="同时执行的最大任务数")
+    parser.add_argument(
+        "--max-queue", type=int, default=20,
+        help="排队等待的最大任务数, 队列已满时 /api/run 返回429"
+    )
+    args = parser.parse_args()
+    scheduler = TaskScheduler(args.max_concurrent, args.max_queue)
+
+    print(f"启动接口服务，监听端口 {args.port}")
     print("可用接口:")
     print("  POST /api/run        - 执行脚本")
     print("  GET  /api/status     - 获取所有任务状态")
@@ -287,5 +398,6 @@ if __name__ == '__main__':
     print("\n执行模式:")
     print("  - 默认在新窗口中执行")
     print("  - 可通过请求体中的 'new_window': false 切换到后台模式")
+    print(f"  - 最多同时执行 {scheduler.max_concurrent} 个任务，排队 {scheduler.max_queue} 个，同一账号只允许一个未完成的任务")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=args.port, debug=False)
\ No newline at end of file
@@ -1,56 +1,47 @@
+import atexit
 import configparser
+import importlib.util
 import json
 import random
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from re import sub
 
 import httpx
-import requests
 from openai import OpenAI
 from urllib3 import disable_warnings, exceptions
 
 from api.answer_check import *
+from api.cache import CacheDAO, LRUCache, SqliteCacheDAO, get_cache_dao, normalize_title
 from api.logger import logger
+from api.metrics import InstrumentedSession, httpx_event_hooks
 
 # 关闭警告
 disable_warnings(exceptions.InsecureRequestWarning)
 
-class CacheDAO:
+class RateLimiter:
     """
-    @Author: SocialSisterYi
-    @Reference: https://github.com/SocialSisterYi/xuexiaoyi-to-xuexitong-tampermonkey-proxy
+    线程安全的请求间隔限制器, 保证相邻两次放行之间至少间隔 min_interval 秒
     """
-    DEFAULT_CACHE_FILE = "cache.json"
 
-    def __init__(self, file: str = DEFAULT_CACHE_FILE):
-        self.cache_file = Path(file)
-        if not self.cache_file.is_file():
-            self._write_cache({})
+    def __init__(self, min_interval: float = 0) -> None:
+        self.min_interval = min_interval
+        self._next_time = 0.0
+        self._lock = threading.Lock()
 
-    def _read_cache(self) -> dict:
-        try:
-            with self.cache_file.open("r", encoding="utf8") as fp:
-                return json.load(fp)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def _write_cache(self, data: dict) -> None:
-        try:
-            with self.cache_file.open("w", encoding="utf8") as fp:
-                json.dump(data, fp, ensure_ascii=False, indent=4)
-        except IOError as e:
-            logger.error(f"Failed to write cache: {e}")
-
-    def get_cache(self, question: str):
-        data = self._read_cache()
-        return data.get(question)
-
-    def add_cache(self, question: str, answer: str) -> None:
-        data = self._read_cache()
-        data[question] = answer
-        self._write_cache(data)
+    def wait(self) -> None:
+        # 在锁内预约下一个可用时间点, 在锁外等待, 避免阻塞其他线程的预约
+        with self._lock:
+            now = time.time()
+            start_time = max(now, self._next_time)
+            self._next_time = start_time + self.min_interval
+        sleep_time = start_time - now
+        if sleep_time > 0:
+            logger.debug(f"API请求间隔过短, 等待 {sleep_time:.3f} 秒")
+            time.sleep(sleep_time)
 
 
 class Tiku:
@@ -58,12 +49,19 @@ class Tiku:
     DISABLE = False     # 停用标志
     SUBMIT = False      # 提交标志
     COVER_RATE = 0.8    # 覆盖率
+    QUERY_WORKERS = 4   # 并发查询线程数
     true_list = []
     false_list = []
+    # 进程内答案缓存, 位于持久化缓存之前, 所有题库实例共享
+    memory_cache = LRUCache()
+
     def __init__(self) -> None:
         self._name = None
         self._api = None
         self._conf = None
+        self._cache = None
+        self._session = None
+        self.rate_limiter = RateLimiter()  # 向题库接口发起查询的间隔限制
 
     @property
     def name(self):
@@ -81,6 +79,21 @@ class Tiku:
     def api(self, value):
         self._api = value
 
+    @property
+    def cache(self):
+        # 持久化答案缓存, 首次使用时根据配置创建, 由 close 刷新落盘, 未调用 close 时在进程退出时刷新
+        if self._cache is None:
+            self._cache = get_cache_dao(self._conf)
+            atexit.register(self._cache.close)
+        return self._cache
+
+    @property
+    def session(self):
+        # 向题库接口发起请求的会话, 复用连接并记录请求统计
+        if self._session is None:
+            self._session = InstrumentedSession()
+        return self._session
+
     @property
     def token(self):
         return self._token
@@ -100,6 +113,13 @@ class Tiku:
             self.COVER_RATE = float(self._conf['cover_rate'])
             self.true_list = self._conf['true_list'].split(',')
             self.false_list = self._conf['false_list'].split(',')
+            # 设置内存缓存容量
+            memory_size = self._conf.get('cache_memory_size')
+            if memory_size:
+                Tiku.memory_cache.resize(int(memory_size))
+            # 设置查询并发数与查询间隔
+            self.QUERY_WORKERS = max(1, int(self._conf.get('query_workers') or self.QUERY_WORKERS))
+            self.rate_limiter.min_interval = float(self._conf.get('delay') or 0)
             # 调用自定义题库初始化
             self._init_tiku()
         
@@ -107,6 +127,16 @@ class Tiku:
         # 仅用于题库初始化, 例如配置token, 交由自定义题库完成
         pass
 
+    def close(self):
+        # 释放题库持有的资源, 例如答案缓存和连接池, 自定义题库有额外资源时应重写并调用本方法
+        if self._cache is not None:
+            atexit.unregister(self._cache.close)
+            self._cache.close()
+            self._cache = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
     def config_set(self,config):
         self._conf = config
 
@@ -126,32 +156,109 @@ class Tiku:
         if self.DISABLE:
             return None
 
+        self._preprocess(q_info)
+        answer = self._get_cached_answer(q_info)
+        if answer:
+            return answer
+        self.rate_limiter.wait()
+        return self._accept_answer(q_info, self._query(q_info))
+
+    def query_batch(self, q_info_list: list) -> list:
+        """
+        批量查询多道题目, 返回结果与题目顺序一致
+
+        命中缓存的题目直接返回, 其余题目交由 _query_batch 一次性查询
+        """
+        if self.DISABLE:
+            return [None] * len(q_info_list)
+
+        results = [None] * len(q_info_list)
+        missed = []
+        for index, q_info in enumerate(q_info_list):
+            self._preprocess(q_info)
+            results[index] = self._get_cached_answer(q_info)
+            if not results[index]:
+                missed.append(index)
+        if missed:
+            answers = self._query_batch([q_info_list[index] for index in missed])
+            for index, answer in zip(missed, answers):
+                results[index] = self._accept_answer(q_info_list[index], answer)
+        return results
+
+    def _preprocess(self, q_info: dict) -> None:
         # 预处理, 去除【单选题】这样与标题无关的字段
         logger.debug(f"原始标题：{q_info['title']}")
         q_info['title'] = sub(r'^\d+', '', q_info['title'])
         q_info['title'] = sub(r'（\d+\.\d+分）$', '', q_info['title'])
         logger.debug(f"处理后标题：{q_info['title']}")
 
-        # 先过缓存
-        cache_dao = CacheDAO()
-        answer = cache_dao.get_cache(q_info['title'])
+    def _get_cached_answer(self, q_info: dict):
+        # 先过内存缓存, 再过持久化缓存
+        cache_key = normalize_title(q_info['title'])
+        answer = Tiku.memory_cache.get(cache_key)
+        if answer:
+            logger.info(f"从内存缓存中获取答案：{q_info['title']} -> {answer}")
+            return answer.strip()
+        answer = self.cache.get_cache(q_info['title'])
         if answer:
+            Tiku.memory_cache.put(cache_key, answer)
             logger.info(f"从缓存中获取答案：{q_info['title']} -> {answer}")
             return answer.strip()
-        else:
-            answer = self._query(q_info)
-            if answer:
-                answer = answer.strip()
-                cache_dao.add_cache(q_info['title'], answer)
-                logger.info(f"从{self.name}获取答案：{q_info['title']} -> {answer}")
-                if check_answer(answer, q_info['type'], self):
-                    return answer
-                else:
-                    logger.info(f"从{self.name}获取到的答案类型与题目类型不符，已舍弃")
-                    return None
-                    
-            logger.error(f"从{self.name}获取答案失败：{q_info['title']}")
         return None
+
+    def _accept_answer(self, q_info: dict, answer):
+        # 缓存题库返回的答案, 并校验答案类型是否与题目类型相符
+        if answer:
+            answer = answer.strip()
+            self.cache.add_cache(q_info['title'], answer)
+            Tiku.memory_cache.put(normalize_title(q_info['title']), answer)
+            logger.info(f"从{self.name}获取答案：{q_info['title']} -> {answer}")
+            if check_answer(answer, q_info['type'], self):
+                return answer
+            else:
+                logger.info(f"从{self.name}获取到的答案类型与题目类型不符，已舍弃")
+                return None
+
+        logger.error(f"从{self.name}获取答案失败：{q_info['title']}")
+        return None
+
+    def _query_batch(self, q_info_list: list) -> list:
+        """
+        批量查询接口, 默认逐题调用 _query 并发查询, 支持批量请求的题库可自行覆盖
+        """
+        return self._map_concurrent(self._limited_query, q_info_list)
+
+    def _limited_query(self, q_info: dict):
+        self.rate_limiter.wait()
+        return self._query(q_info)
+
+    def _query_in_chunks(self, q_info_list: list, batch_size: int, request_chunk) -> list:
+        """
+        将题目按 batch_size 分批, 每批通过一次 request_chunk 请求完成, 各批次之间并发执行
+
+        request_chunk 接收一批题目并返回与之等长的答案列表, 请求失败或缺失的题目会逐题补查
+        """
+        if batch_size <= 1:
+            return self._map_concurrent(self._limited_query, q_info_list)
+
+        def query_chunk(chunk):
+            self.rate_limiter.wait()
+            try:
+                answers = request_chunk(chunk)
+            except Exception as e:
+                logger.error(f"{self.name}批量查询失败, 改为逐题查询: {e}")
+                answers = [None] * len(chunk)
+            return [answer if answer else self._limited_query(q_info) for q_info, answer in zip(chunk, answers)]
+
+        chunks = [q_info_list[i:i + batch_size] for i in range(0, len(q_info_list), batch_size)]
+        return [answer for answers in self._map_concurrent(query_chunk, chunks) for answer in answers]
+
+    def _map_concurrent(self, func, items: list) -> list:
+        # 以 QUERY_WORKERS 为上限并发执行, 返回结果与输入顺序一致
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.QUERY_WORKERS, len(items))) as executor:
+            return list(executor.map(func, items))
     
     def _query(self,q_info:dict):
         """
@@ -218,14 +325,16 @@ class TikuYanxi(Tiku):
         self.api = 'https://tk.enncy.cn/query'
         self._token = None
         self._token_index = 0   # token队列计数器
+        self._token_lock = threading.Lock()
         self._times = 100   # 查询次数剩余, 初始化为100, 查询后校对修正
 
     def _query(self,q_info:dict):
-        res = requests.get(
+        token = self._token
+        res = self.session.get(
             self.api,
             params={
                 'question':q_info['title'],
-                'token': self._token,
+                'token': token,
                 # 'type':q_info['type'], #修复478题目类型与答案类型不符（不想写后处理了）
                 # 没用，就算有type和options，言溪题库还是可能返回类型不符，问了客服，type仅用于收集
             },
@@ -237,8 +346,11 @@ class TikuYanxi(Tiku):
                 # 如果是因为TOKEN次数到期, 则更换token
                 if self._times == 0 or '次数不足' in res_json['data']['answer']:
                     logger.info(f'TOKEN查询次数不足, 将会更换并重新搜题')
-                    self._token_index += 1
-                    self.load_token()
+                    with self._token_lock:
+                        # 并发查询时可能已被其他线程更换过
+                        if self._token == token:
+                            self._token_index += 1
+                            self.load_token()
                     # 重新查询
                     return self._query(q_info)
                 logger.error(f'{self.name}查询失败:\n\t剩余查询数{res_json["data"].get("times",f"{self._times}(仅参考)")}:\n\t消息:{res_json["message"]}')
@@ -274,6 +386,7 @@ class TikuLike(Tiku):
         self._times = -1
         self._search = False
         self._count = 0
+        self._times_lock = threading.Lock()  # 并发查询时保护剩余次数和查询计数
 
     def _query(self,q_info:dict):
         q_info_map = {"single":"【单选题】","multiple":"【多选题】","completion":"【填空题】","judgement":"【判断题】"}
@@ -285,7 +398,7 @@ class TikuLike(Tiku):
         question = f"{q_info_prefix}{q_info['title']}\n{options}"
         ret = ""
         ans = ""
-        res = requests.post(
+        res = self.session.post(
             self.query_api,
             json={
                 'query': question,
@@ -319,18 +432,19 @@ class TikuLike(Tiku):
 
         ret += str(ans)
 
-        self._times -= 1
+        with self._times_lock:
+            self._times -= 1
+            #10次查询后更新实际次数
+            self._count = (self._count+1) % 10
+            refresh = self._count == 0
 
-        #10次查询后更新实际次数
-        self._count = (self._count+1) % 10
-
-        if self._count == 0:
+        if refresh:
             self.update_times()
         
         return ret
     
     def update_times(self):
-        res = requests.post(
+        res = self.session.post(
             self.balance_api,
             json={
                 'token': self._token,
@@ -339,7 +453,8 @@ class TikuLike(Tiku):
         )
         if res.status_code == 200:
             res_json = res.json()
-            self._times = res_json["data"].get("balance",self._times)
+            with self._times_lock:
+                self._times = res_json["data"].get("balance",self._times)
             logger.info(f"当前LIKE知识库Token剩余查询次数为: {self._times}")
         else:
             logger.error('TOKEN出现错误，请检查后再试')
@@ -386,7 +501,7 @@ class TikuAdapter(Tiku):
             type = 4
 
         options = q_info['options']
-        res = requests.post(
+        res = self.session.post(
             self.api,
             json={
                 'question': q_info['title'],
@@ -413,33 +528,114 @@ class TikuAdapter(Tiku):
         # self.load_token()
         self.api = self._conf['url']
 
+def remove_md_json_wrapper(md_str):
+    # 使用正则表达式匹配Markdown代码块并提取内容
+    pattern = r'^\s*```(?:json)?\s*(.*?)\s*```\s*$'
+    match = re.search(pattern, md_str, re.DOTALL)
+    return match.group(1).strip() if match else md_str.strip()
+
+
+BATCH_TYPE_NAMES = {"single": "单选题", "multiple": "多选题", "completion": "填空题", "judgement": "判断题"}
+
+BATCH_SYSTEM_PROMPT = (
+    "下面给出若干道编号的题目，请依次回答每一道题。单选题只能选择一个选项，多选题必须选择两个或以上选项，"
+    "选择题请输出正确选项的具体内容而不是选项前的字母；判断题只能回答正确或者错误；填空题和简答题请直接给出答案内容。"
+    "以json格式输出所有题目的答案，index为题目编号，示例回答：{\"Answers\": [{\"index\": 1, \"Answer\": [\"答案1\", \"答案2\"]}, {\"index\": 2, \"Answer\": [\"正确\"]}]}。"
+    "除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
+)
+
+
+def build_batch_prompt(q_info_list: list) -> str:
+    """
+    将多道题目拼接为一条用户消息, 题目按 1 开始编号
+    """
+    parts = []
+    for index, q_info in enumerate(q_info_list, start=1):
+        type_name = BATCH_TYPE_NAMES.get(q_info['type'], "简答题")
+        part = f"{index}. 【{type_name}】题目：{q_info['title']}"
+        if q_info['type'] in ("single", "multiple") and q_info['options']:
+            # 去除选项字母，防止大模型直接输出字母而非内容
+            options = "\n".join(re.sub(r"^[A-Z]\s*", "", option) for option in q_info['options'].split('\n'))
+            part += f"\n选项：{options}"
+        parts.append(part)
+    return "\n\n".join(parts)
+
+
+def parse_batch_answers(content: str, count: int) -> list:
+    """
+    按题目编号拆分批量回答, 未能解析的题目对应位置为 None
+    """
+    answers = [None] * count
+    response = json.loads(remove_md_json_wrapper(content))
+    for item in response['Answers']:
+        index = int(item['index']) - 1
+        if 0 <= index < count and item.get('Answer'):
+            answers[index] = "\n".join(str(a) for a in item['Answer']).strip()
+    return answers
+
+
 class AI(Tiku):
     # AI大模型答题实现
     def __init__(self) -> None:
         super().__init__()
         self.name = 'AI大模型答题'
-        self.last_request_time = None
+        self.client = None
+        self._http_client = None
+        self._latency_lock = threading.Lock()
+        self.request_count = 0          # 请求次数
+        self.request_time_total = 0.0   # 请求总耗时(秒)
+        self.request_time_max = 0.0     # 单次请求最大耗时(秒)
+
+    def _new_client(self):
+        # 整个运行过程复用同一个连接池, 避免每道题重新建立TCP/TLS连接
+        pool_size = int(self._conf.get('pool_size') or 10)
+        timeout = float(self._conf.get('timeout') or 60)
+        self._http_client = httpx.Client(
+            proxy=self.http_proxy or None,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(timeout, connect=min(10.0, timeout)),
+            # 安装了h2时启用HTTP/2
+            http2=importlib.util.find_spec("h2") is not None,
+            event_hooks=httpx_event_hooks(),
+        )
+        return OpenAI(http_client=self._http_client, base_url = self.endpoint,api_key = self.key)
+
+    def _create_completion(self, **kwargs):
+        # 发起请求并记录耗时
+        start_time = time.perf_counter()
+        try:
+            return self.client.chat.completions.create(**kwargs)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self._latency_lock:
+                self.request_count += 1
+                self.request_time_total += elapsed
+                self.request_time_max = max(self.request_time_max, elapsed)
+            logger.debug(f"{self.name}请求耗时 {elapsed * 1000:.0f} ms")
+
+    def close(self):
+        super().close()
+        if self.client is None:
+            return
+        atexit.unregister(self.close)
+        if self.request_count:
+            logger.info(
+                f"{self.name}共请求 {self.request_count} 次, "
+                f"平均耗时 {self.request_time_total / self.request_count * 1000:.0f} ms, "
+                f"最大耗时 {self.request_time_max * 1000:.0f} ms"
+            )
+        self.client.close()
+        self._http_client.close()
+        self.client = None
 
     def _query(self, q_info: dict):
-        def remove_md_json_wrapper(md_str):
-            # 使用正则表达式匹配Markdown代码块并提取内容
-            pattern = r'^\s*```(?:json)?\s*(.*?)\s*```\s*$'
-            match = re.search(pattern, md_str, re.DOTALL)
-            return match.group(1).strip() if match else md_str.strip()
-        
-        if self.http_proxy:
-            proxy = self.http_proxy
-            httpx_client = httpx.Client(proxy=proxy)
-            client = OpenAI(http_client=httpx_client, base_url = self.endpoint,api_key = self.key)
-        else:
-            client = OpenAI(base_url = self.endpoint,api_key = self.key)
         # 去除选项字母，防止大模型直接输出字母而非内容
         options_list = q_info['options'].split('\n')
         cleaned_options = [re.sub(r"^[A-Z]\s*", "", option) for option in options_list]
         options = "\n".join(cleaned_options)
         # 判断题目类型
         if q_info['type'] == "single":
-            completion = client.chat.completions.create(
+            completion = self._create_completion(
                 model = self.model,
                 messages=[
                     {
@@ -453,7 +649,7 @@ class AI(Tiku):
                 ]
             )
         elif q_info['type'] == 'multiple':
-            completion = client.chat.completions.create(
+            completion = self._create_completion(
                 model = self.model,
                 messages=[
                     {
@@ -467,7 +663,7 @@ class AI(Tiku):
                 ]
             )
         elif q_info['type'] == 'completion':
-            completion = client.chat.completions.create(
+            completion = self._create_completion(
                 model = self.model,
                 messages=[
                     {
@@ -481,7 +677,7 @@ class AI(Tiku):
                 ]
             )
         elif q_info['type'] == 'judgement':
-            completion = client.chat.completions.create(
+            completion = self._create_completion(
                 model = self.model,
                 messages=[
                     {
@@ -495,7 +691,7 @@ class AI(Tiku):
                 ]
             )
         else:
-            completion = client.chat.completions.create(
+            completion = self._create_completion(
                 model = self.model,
                 messages=[
                     {
@@ -510,13 +706,6 @@ class AI(Tiku):
             )
 
         try:
-            if self.last_request_time:
-                interval_time = time.time() - self.last_request_time
-                if interval_time < self.min_interval_seconds:
-                    sleep_time = self.min_interval_seconds - interval_time
-                    logger.debug(f"API请求间隔过短, 等待 {sleep_time} 秒")
-                    time.sleep(sleep_time)
-            self.last_request_time = time.time()
             response = json.loads(remove_md_json_wrapper(completion.choices[0].message.content))
             sep = "\n"
             return sep.join(response['Answer']).strip()
@@ -524,26 +713,44 @@ class AI(Tiku):
             logger.error("无法解析大模型输出内容")
             return None
 
+    def _query_batch(self, q_info_list: list) -> list:
+        # 每次请求打包 batch_size 道题目
+        return self._query_in_chunks(q_info_list, self.batch_size, self._request_chunk)
+
+    def _request_chunk(self, q_info_list: list) -> list:
+        completion = self._create_completion(
+            model = self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": BATCH_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": build_batch_prompt(q_info_list)
+                }
+            ]
+        )
+        return parse_batch_answers(completion.choices[0].message.content, len(q_info_list))
+
     def _init_tiku(self):
         self.endpoint = self._conf['endpoint']
         self.key = self._conf['key']
         self.model = self._conf['model']
         self.http_proxy = self._conf['http_proxy']
         self.min_interval_seconds = int(self._conf['min_interval_seconds'])
+        self.batch_size = int(self._conf.get('batch_size') or 5)
+        self.client = self._new_client()
+        atexit.register(self.close)
+        # 请求间隔由限制器统一控制, 并发查询时同样生效
+        self.rate_limiter.min_interval = max(self.rate_limiter.min_interval, self.min_interval_seconds)
 class SiliconFlow(Tiku):
     """硅基流动大模型答题实现"""
     def __init__(self):
         super().__init__()
         self.name = '硅基流动大模型'
-        self.last_request_time = None
 
     def _query(self, q_info: dict):
-        def remove_md_json_wrapper(md_str):
-            # 解析可能存在的JSON包装
-            pattern = r'^\s*```(?:json)?\s*(.*?)\s*```\s*$'
-            match = re.search(pattern, md_str, re.DOTALL)
-            return match.group(1).strip() if match else md_str.strip()
-
         # 构造请求头
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -583,20 +790,13 @@ class SiliconFlow(Tiku):
             "response_format": {"type": "text"}
         }
 
-        # 处理请求间隔
-        if self.last_request_time:
-            interval = time.time() - self.last_request_time
-            if interval < self.min_interval:
-                time.sleep(self.min_interval - interval)
-
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_endpoint,
                 headers=headers,
                 json=payload,
                 timeout=30
             )
-            self.last_request_time = time.time()
             
             if response.status_code == 200:
                 result = response.json()
@@ -611,6 +811,42 @@ class SiliconFlow(Tiku):
             logger.error(f"硅基流动API异常：{e}")
             return None
 
+    def _query_batch(self, q_info_list: list) -> list:
+        # 每次请求打包 batch_size 道题目
+        return self._query_in_chunks(q_info_list, self.batch_size, self._request_chunk)
+
+    def _request_chunk(self, q_info_list: list) -> list:
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": BATCH_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": build_batch_prompt(q_info_list)
+                }
+            ],
+            "stream": False,
+            "max_tokens": 4096,
+            "temperature": 0.7,
+            "top_p": 0.7,
+            "response_format": {"type": "text"}
+        }
+        response = self.session.post(
+            self.api_endpoint,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json=payload,
+            timeout=60
+        )
+        response.raise_for_status()
+        content = response.json()['choices'][0]['message']['content']
+        return parse_batch_answers(content, len(q_info_list))
+
     def _init_tiku(self):
         # 从配置文件读取参数
         self.api_endpoint = self._conf.get('siliconflow_endpoint', 'https://api.siliconflow.cn/v1/chat/completions')
@@ -620,3 +856,5 @@ class SiliconFlow(Tiku):
 
 
         self.min_interval = int(self._conf.get('min_interval_seconds', 3))
+        self.rate_limiter.min_interval = max(self.rate_limiter.min_interval, self.min_interval)
+        self.batch_size = int(self._conf.get('batch_size', 5))
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from hashlib import md5
 
 import requests
 from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
 
 from api.answer import *
 from api.cipher import AESCipher
@@ -16,7 +19,9 @@ from api.decode import (
     decode_course_folder,
     decode_questions_info,
 )
+from api.metrics import InstrumentedSession
 from api.process import show_progress
+from api.progress import ProgressEvent, progress
 from api.exceptions import MaxRetryExceeded
 
 
@@ -28,19 +33,76 @@ def get_random_seconds():
     return random.randint(30, 90)
 
 
-def init_session(isVideo: bool = False, isAudio: bool = False):
-    _session = requests.session()
-    _session.verify = False
-    _session.mount("http://", HTTPAdapter(max_retries=3))
-    _session.mount("https://", HTTPAdapter(max_retries=3))
-    if isVideo:
-        _session.headers = gc.VIDEO_HEADERS
-    elif isAudio:
-        _session.headers = gc.AUDIO_HEADERS
-    else:
-        _session.headers = gc.HEADERS
-    _session.cookies.update(use_cookies())
-    return _session
+class SessionManager:
+    """
+    会话管理器, 为每种请求头配置(default/video/audio)维护一个带连接池的会话并在整个运行过程中复用
+
+    所有会话共享同一个cookie jar, cookies文件只在首次使用和登录刷新时读取
+    """
+    PROFILE_HEADERS = {
+        "default": gc.HEADERS,
+        "video": gc.VIDEO_HEADERS,
+        "audio": gc.AUDIO_HEADERS,
+    }
+
+    def __init__(self, pool_size: int = 10, mooc1_url: str = gc.MOOC1_URL):
+        self.pool_size = pool_size
+        self.mooc1_url = mooc1_url
+        self._sessions = {}
+        self._cookies = None
+        self._lock = threading.Lock()
+        self.created = 0  # 已创建的会话数量, 用于运行统计
+
+    @property
+    def cookies(self) -> requests.cookies.RequestsCookieJar:
+        if self._cookies is None:
+            self._cookies = requests.cookies.RequestsCookieJar()
+            self._load_cookies()
+        return self._cookies
+
+    def _load_cookies(self):
+        _cookies = use_cookies()
+        if _cookies:
+            self._cookies.update(_cookies)
+
+    def reload_cookies(self):
+        """cookies文件更新后(例如重新登录)调用, 原地刷新所有会话共享的cookie jar"""
+        with self._lock:
+            self.cookies.clear()
+            self._load_cookies()
+
+    def get(self, profile: str = "default") -> requests.Session:
+        with self._lock:
+            if profile not in self._sessions:
+                self._sessions[profile] = self._new_session(profile)
+            return self._sessions[profile]
+
+    def _new_session(self, profile: str) -> requests.Session:
+        self.created += 1
+        _session = InstrumentedSession()
+        _session.verify = False
+        _adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=3)
+        _session.mount("http://", _adapter)
+        _session.mount("https://", _adapter)
+        _session.headers = self._profile_headers(profile)
+        _session.cookies = self.cookies
+        return _session
+
+    def _profile_headers(self, profile: str) -> dict:
+        """视频/音频会话的 Host 和 Referer 指向默认的 mooc1 地址, 设置了 base_url 时替换为实际请求的地址"""
+        _headers = dict(self.PROFILE_HEADERS[profile])
+        if self.mooc1_url != gc.MOOC1_URL:
+            if "Host" in _headers:
+                _headers["Host"] = urlsplit(self.mooc1_url).netloc
+            if "Referer" in _headers:
+                _headers["Referer"] = _headers["Referer"].replace(gc.MOOC1_URL, self.mooc1_url, 1)
+        return _headers
+
+    def close(self):
+        with self._lock:
+            for _session in self._sessions.values():
+                _session.close()
+            self._sessions.clear()
 
 
 class Account:
@@ -48,13 +110,24 @@ class Account:
     password = None
     last_login = None
     isSuccess = None
+    fid = None
+    uid = None
 
     def __init__(self, _username, _password):
         self.username = _username
         self.password = _password
 
+    def update_identity(self, _cookies):
+        """从cookies中读取fid和uid, 在cookies刷新后调用"""
+        self.fid = _cookies.get("fid")
+        self.uid = _cookies.get("_uid")
+
 
 class Chaoxing:
+    MAX_FETCH_WORKERS = 8  # 并发请求课程列表等页面时的最大线程数
+    # 学习界面任务卡片数, 很少有3个的, 但是对于章节解锁任务点少一个都不行, 可以从API /mooc-ans/mycourse/studentstudyAjax获取值, 或者干脆直接加, 但二者都会造成额外的请求
+    CARD_NUMS = ["0", "1", "2", "3", "4", "5", "6"]
+
     class StudyResult(Enum):
         SUCCESS = 0
         FORBIDDEN = 1  # 403
@@ -75,11 +148,20 @@ class Chaoxing:
         self.tiku = tiku
         self.kwargs = kwargs
         self.rollback_times = 0
+        self._card_num_memo = {}  # 课程ID -> 该课程中返回过任务点的卡片下标集合
+        # 设置base_url后所有超星接口都请求该地址, 用于连接本地模拟服务器进行离线测试
+        # 请求头中的 Host/Origin/Referer 也随之从这些地址生成
+        base_url = (kwargs.get("base_url") or "").rstrip("/")
+        self.passport_url = base_url or gc.PASSPORT_URL
+        self.mooc1_url = base_url or gc.MOOC1_URL
+        self.mooc2_url = base_url or gc.MOOC2_URL
+        self.mooc_domain_url = base_url or gc.MOOC_DOMAIN_URL
+        self.session_manager = SessionManager(mooc1_url=self.mooc1_url)
 
     def login(self):
-        _session = requests.session()
+        _session = InstrumentedSession()
         _session.verify = False
-        _url = "https://passport2.chaoxing.com/fanyalogin"
+        _url = f"{self.passport_url}/fanyalogin"
         _data = {
             "fid": "-1",
             "uname": self.cipher.encrypt(self.account.username),
@@ -95,27 +177,31 @@ class Chaoxing:
         resp = _session.post(_url, headers=gc.HEADERS, data=_data)
         if resp and resp.json()["status"] == True:
             save_cookies(_session)
+            self.session_manager.reload_cookies()
+            self.account.update_identity(self.session_manager.cookies)
             logger.info("登录成功...")
             return {"status": True, "msg": "登录成功"}
         else:
             return {"status": False, "msg": str(resp.json()["msg2"])}
 
     def get_fid(self):
-        _session = init_session()
-        return _session.cookies.get("fid")
+        if self.account.fid is None:
+            self.account.update_identity(self.session_manager.cookies)
+        return self.account.fid
 
     def get_uid(self):
-        _session = init_session()
-        return _session.cookies.get("_uid")
+        if self.account.uid is None:
+            self.account.update_identity(self.session_manager.cookies)
+        return self.account.uid
 
     def get_course_list(self):
-        _session = init_session()
-        _url = "https://mooc2-ans.chaoxing.com/mooc2-ans/visit/courselistdata"
+        _session = self.session_manager.get()
+        _url = f"{self.mooc2_url}/mooc2-ans/visit/courselistdata"
         _data = {"courseType": 1, "courseFolderId": 0, "query": "", "superstarClass": 0}
         logger.trace("正在读取所有的课程列表...")
         # 接口突然抽风, 增加headers
         _headers = {
-            "Host": "mooc2-ans.chaoxing.com",
+            "Host": urlsplit(self.mooc2_url).netloc,
             "sec-ch-ua-platform": '"Windows"',
             "X-Requested-With": "XMLHttpRequest",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36 Edg/129.0.0.0",
@@ -123,35 +209,40 @@ class Chaoxing:
             "sec-ch-ua": '"Microsoft Edge";v="129", "Not=A?Brand";v="8", "Chromium";v="129"',
             "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
             "sec-ch-ua-mobile": "?0",
-            "Origin": "https://mooc2-ans.chaoxing.com",
+            "Origin": self.mooc2_url,
             "Sec-Fetch-Site": "same-origin",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Dest": "empty",
-            "Referer": "https://mooc2-ans.chaoxing.com/mooc2-ans/visit/interaction?moocDomain=https://mooc1-1.chaoxing.com/mooc-ans",
+            "Referer": f"{self.mooc2_url}/mooc2-ans/visit/interaction?moocDomain={self.mooc_domain_url}/mooc-ans",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6,ja;q=0.5",
         }
-        _resp = _session.post(_url, headers=_headers, data=_data)
-        # logger.trace(f"原始课程列表内容:\n{_resp.text}")
-        logger.info("课程列表读取完毕...")
-        course_list = decode_course_list(_resp.text)
-
-        _interaction_url = "https://mooc2-ans.chaoxing.com/mooc2-ans/visit/interaction"
-        _interaction_resp = _session.get(_interaction_url)
-        course_folder = decode_course_folder(_interaction_resp.text)
-        for folder in course_folder:
-            _data = {
+        _interaction_url = f"{self.mooc2_url}/mooc2-ans/visit/interaction"
+
+        def fetch_folder(folder):
+            _folder_data = {
                 "courseType": 1,
                 "courseFolderId": folder["id"],
                 "query": "",
                 "superstarClass": 0,
             }
-            _resp = _session.post(_url, data=_data)
-            course_list += decode_course_list(_resp.text)
+            return decode_course_list(_session.post(_url, data=_folder_data).text)
+
+        with ThreadPoolExecutor(max_workers=self.MAX_FETCH_WORKERS) as executor:
+            # 顶层课程列表与文件夹列表互不依赖, 同时请求
+            _list_future = executor.submit(_session.post, _url, headers=_headers, data=_data)
+            _interaction_future = executor.submit(_session.get, _interaction_url)
+            # logger.trace(f"原始课程列表内容:\n{_resp.text}")
+            course_list = decode_course_list(_list_future.result().text)
+            logger.info("课程列表读取完毕...")
+            course_folder = decode_course_folder(_interaction_future.result().text)
+            # 并发请求各文件夹下的课程, 按文件夹顺序合并结果
+            for folder_courses in executor.map(fetch_folder, course_folder):
+                course_list += folder_courses
         return course_list
 
     def get_course_point(self, _courseid, _clazzid, _cpi):
-        _session = init_session()
-        _url = f"https://mooc2-ans.chaoxing.com/mooc2-ans/mycourse/studentcourse?courseid={_courseid}&clazzid={_clazzid}&cpi={_cpi}&ut=s"
+        _session = self.session_manager.get()
+        _url = f"{self.mooc2_url}/mooc2-ans/mycourse/studentcourse?courseid={_courseid}&clazzid={_clazzid}&cpi={_cpi}&ut=s"
         logger.trace("开始读取课程所有章节...")
         _resp = _session.get(_url)
         # logger.trace(f"原始章节列表内容:\n{_resp.text}")
@@ -159,30 +250,46 @@ class Chaoxing:
         return decode_course_point(_resp.text)
 
     def get_job_list(self, _clazzid, _courseid, _cpi, _knowledgeid):
-        _session = init_session()
+        _session = self.session_manager.get()
         job_list = []
         job_info = {}
-        for _possible_num in [
-            "0",
-            "1",
-            "2",
-            "3",
-            "4",
-            "5",
-            "6",
-        ]:  # 学习界面任务卡片数, 很少有3个的, 但是对于章节解锁任务点少一个都不行, 可以从API /mooc-ans/mycourse/studentstudyAjax获取值, 或者干脆直接加, 但二者都会造成额外的请求
-            _url = f"https://mooc1.chaoxing.com/mooc-ans/knowledge/cards?clazzid={_clazzid}&courseid={_courseid}&knowledgeid={_knowledgeid}&num={_possible_num}&ut=s&cpi={_cpi}&v=20160407-3&mooc2=1"
-            logger.trace("开始读取章节所有任务点...")
-            _resp = _session.get(_url)
-            _job_list, _job_info = decode_course_card(_resp.text)
+
+        def probe(_possible_num):
+            _url = f"{self.mooc1_url}/mooc-ans/knowledge/cards?clazzid={_clazzid}&courseid={_courseid}&knowledgeid={_knowledgeid}&num={_possible_num}&ut=s&cpi={_cpi}&v=20160407-3&mooc2=1"
+            return decode_course_card(_session.get(_url).text)
+
+        logger.trace("开始读取章节所有任务点...")
+        # 卡片是连续的标签页, 下标超出卡片数时页面中没有任务信息。同一课程已探测过时, 只探测到
+        # 返回过任务点的最大下标的下一张卡片, 它仍是一张卡片(即使没有任务点)时再探测剩余下标,
+        # 避免漏掉任务点导致章节无法解锁
+        known = self._card_num_memo.get(_courseid)
+        if known is None:
+            candidates = list(self.CARD_NUMS)
+        else:
+            next_index = max((self.CARD_NUMS.index(num) for num in known), default=-1) + 1
+            candidates = list(self.CARD_NUMS[:next_index + 1])
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.MAX_FETCH_WORKERS, len(self.CARD_NUMS))) as executor:
+            results.update(zip(candidates, executor.map(probe, candidates)))
+            sentinel_jobs, sentinel_info = results[candidates[-1]]
+            if len(candidates) < len(self.CARD_NUMS) and (sentinel_jobs or sentinel_info):
+                remaining = self.CARD_NUMS[len(candidates):]
+                results.update(zip(remaining, executor.map(probe, remaining)))
+
+        # 按下标顺序合并结果
+        found = set()
+        for num in self.CARD_NUMS:
+            if num not in results:
+                continue
+            _job_list, _job_info = results[num]
             if _job_info.get("notOpen", False):
-                # 直接返回, 节省一次请求
                 logger.info("该章节未开放")
                 return [], _job_info
+            if _job_list:
+                found.add(num)
             job_list += _job_list
             job_info.update(_job_info)
-            # if _job_list and len(_job_list) != 0:
-            #     break
+        self._card_num_memo[_courseid] = (known or set()) | found
         # logger.trace(f"原始任务点列表内容:\n{_resp.text}")
         logger.info("章节任务点读取成功...")
         return job_list, job_info
@@ -210,7 +317,7 @@ class Chaoxing:
         _success = False
         for _possible_rt in ["0.9", "1"]:
             _url = (
-                f"https://mooc1.chaoxing.com/mooc-ans/multimedia/log/a/"
+                f"{self.mooc1_url}/mooc-ans/multimedia/log/a/"
                 f"{_course['cpi']}/"
                 f"{_dtoken}?"
                 f"clazzId={_course['clazzId']}&"
@@ -244,11 +351,10 @@ class Chaoxing:
         self, _course, _job, _job_info, _speed: float = 1.0, _type: str = "Video"
     ) -> StudyResult:
         if _type == "Video":
-            _session = init_session(isVideo=True)
+            _session = self.session_manager.get("video")
         else:
-            _session = init_session(isAudio=True)
-        _session.headers.update()
-        _info_url = f"https://mooc1.chaoxing.com/ananas/status/{_job['objectid']}?k={self.get_fid()}&flag=normal"
+            _session = self.session_manager.get("audio")
+        _info_url = f"{self.mooc1_url}/ananas/status/{_job['objectid']}?k={self.get_fid()}&flag=normal"
         _video_info = _session.get(_info_url).json()
         if _video_info["status"] == "success":
             _dtoken = _video_info["dtoken"]
@@ -284,7 +390,7 @@ class Chaoxing:
                     if _isPassed['isPassed']:
                         _isFinished = True
                 # 播放进度条
-                show_progress(_job["name"], _playingTime, _wait_time, _duration, _speed)
+                show_progress(_job["name"], _playingTime, _wait_time, _duration, _speed, _job["jobid"])
                 _playingTime += _wait_time
             print("\r", end="", flush=True)
             logger.info(f"任务完成: {_job['name']}")
@@ -311,12 +417,12 @@ class Chaoxing:
 
         Note:
             This method requires the following helper functions:
-            - init_session(): To initialize a new session
+            - self.session_manager: To get the shared session
             - get_timestamp(): To get current timestamp
             - re module for regular expression matching
         """
-        _session = init_session()
-        _url = f"https://mooc1.chaoxing.com/ananas/job/document?jobid={_job['jobid']}&knowledgeid={re.findall(r'nodeId_(.*?)-', _job['otherinfo'])[0]}&courseid={_course['courseId']}&clazzid={_course['clazzId']}&jtoken={_job['jtoken']}&_dc={get_timestamp()}"
+        _session = self.session_manager.get()
+        _url = f"{self.mooc1_url}/ananas/job/document?jobid={_job['jobid']}&knowledgeid={re.findall(r'nodeId_(.*?)-', _job['otherinfo'])[0]}&courseid={_course['courseId']}&clazzid={_course['clazzId']}&jtoken={_job['jtoken']}&_dc={get_timestamp()}"
         _resp = _session.get(_url)
         if _resp.status_code != 200:
             return self.StudyResult.ERROR
@@ -478,9 +584,9 @@ class Chaoxing:
             return decorator
 
         # 学习通这里根据参数差异能重定向至两个不同接口, 需要定向至https://mooc1.chaoxing.com/mooc-ans/workHandle/handle
-        _session = init_session()
+        _session = self.session_manager.get()
         headers = {
-            "Host": "mooc1.chaoxing.com",
+            "Host": urlsplit(self.mooc1_url).netloc,
             "sec-ch-ua": '"Microsoft Edge";v="129", "Not=A?Brand";v="8", "Chromium";v="129"',
             "sec-ch-ua-mobile": "?0",
             "sec-ch-ua-platform": '"Windows"',
@@ -492,17 +598,14 @@ class Chaoxing:
             "Sec-Fetch-Dest": "iframe",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6,ja;q=0.5",
         }
-        cookies = _session.cookies.get_dict()
 
-        _url = "https://mooc1.chaoxing.com/mooc-ans/api/work"
+        _url = f"{self.mooc1_url}/mooc-ans/api/work"
 
         @with_retry(max_retries=3, delay=1)
         def fetch_response():
-            return requests.get(
+            return _session.get(
                     _url,
                     headers=headers,
-                    cookies=cookies,
-                    verify=False,
                     params={
                         "api": "1",
                         "workId": _job["jobid"].replace("work-", ""),
@@ -536,12 +639,10 @@ class Chaoxing:
         # 搜题
         total_questions = len(questions["questions"])
         found_answers = 0
-        for q in questions["questions"]:
+        # 批量查询所有题目答案, 由题库负责并发与请求间隔控制
+        answers = self.tiku.query_batch(questions["questions"])
+        for q, res in zip(questions["questions"], answers):
             logger.debug(f"当前题目信息 -> {q}")
-            # 添加搜题延迟 #428 - 默认0s延迟
-            query_delay = self.kwargs.get("query_delay",0)
-            time.sleep(query_delay)
-            res = self.tiku.query(q)
             answer = ""
             if not res:
                 # 随机答题
@@ -604,6 +705,10 @@ class Chaoxing:
         else:
             questions["pyFlag"] = "1"
             logger.info(f"章节检测题库覆盖率低于{self.tiku.COVER_RATE*100:.0f}%，不予提交")
+        progress.emit(
+            ProgressEvent.ANSWERS, job_id=_job["jobid"], total=total_questions, found=found_answers,
+            submitted=questions["pyFlag"] == ""
+        )
         # 组建提交表单
         if questions["pyFlag"] == "1":
             for q in questions["questions"]:
@@ -626,10 +731,10 @@ class Chaoxing:
         del questions["questions"]
 
         res = _session.post(
-            "https://mooc1.chaoxing.com/mooc-ans/work/addStudentWorkNew",
+            f"{self.mooc1_url}/mooc-ans/work/addStudentWorkNew",
             data=questions,
             headers={
-                "Host": "mooc1.chaoxing.com",
+                "Host": urlsplit(self.mooc1_url).netloc,
                 "sec-ch-ua-platform": '"Windows"',
                 "X-Requested-With": "XMLHttpRequest",
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36 Edg/129.0.0.0",
@@ -637,7 +742,7 @@ class Chaoxing:
                 "sec-ch-ua": '"Microsoft Edge";v="129", "Not=A?Brand";v="8", "Chromium";v="129"',
                 "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
                 "sec-ch-ua-mobile": "?0",
-                "Origin": "https://mooc1.chaoxing.com",
+                "Origin": self.mooc1_url,
                 "Sec-Fetch-Site": "same-origin",
                 "Sec-Fetch-Mode": "cors",
                 "Sec-Fetch-Dest": "empty",
@@ -661,9 +766,9 @@ class Chaoxing:
         """
         阅读任务学习, 仅完成任务点, 并不增长时长
         """
-        _session = init_session()
+        _session = self.session_manager.get()
         _resp = _session.get(
-            url="https://mooc1.chaoxing.com/ananas/job/readv2",
+            url=f"{self.mooc1_url}/ananas/job/readv2",
             params={
                 "jobid": _job["jobid"],
                 "knowledgeid": _job_info["knowledgeid"],
@@ -681,10 +786,10 @@ class Chaoxing:
             return self.StudyResult.SUCCESS
 
     def study_emptypage(self, _course, _chapterId):
-        _session = init_session()
+        _session = self.session_manager.get()
         # &cpi=0&verificationcode=&mooc2=1&microTopicId=0&editorPreview=0
         _resp = _session.get(
-            url="https://mooc1.chaoxing.com/mooc-ans/mycourse/studentstudyAjax",
+            url=f"{self.mooc1_url}/mooc-ans/mycourse/studentstudyAjax",
             params={
                 "courseId": _course["courseId"],
                 "clazzid": _course["clazzId"],
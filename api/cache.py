@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+题库答案缓存模块
+
+提供可插拔的答案缓存后端:
+- CacheDAO: 兼容旧版本的 JSON 文件缓存
+- SqliteCacheDAO: 基于 SQLite (WAL 模式) 的索引缓存, 支持批量写入和从 cache.json 一次性迁移
+- LRUCache: 位于持久化缓存之前的进程内有界 LRU 缓存
+"""
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from api.logger import logger
+
+
+def normalize_title(title: str) -> str:
+    """
+    规范化题目标题, 作为缓存的主键
+
+    Args:
+        title: 题目标题
+
+    Returns:
+        合并连续空白并去除首尾空白后的标题
+    """
+    return re.sub(r"\s+", " ", title).strip()
+
+
+class CacheDAO:
+    """
+    @Author: SocialSisterYi
+    @Reference: https://github.com/SocialSisterYi/xuexiaoyi-to-xuexitong-tampermonkey-proxy
+    """
+    DEFAULT_CACHE_FILE = "cache.json"
+
+    def __init__(self, file: str = DEFAULT_CACHE_FILE):
+        self.cache_file = Path(file)
+        if not self.cache_file.is_file():
+            self._write_cache({})
+
+    def _read_cache(self) -> dict:
+        try:
+            with self.cache_file.open("r", encoding="utf8") as fp:
+                return json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_cache(self, data: dict) -> None:
+        try:
+            with self.cache_file.open("w", encoding="utf8") as fp:
+                json.dump(data, fp, ensure_ascii=False, indent=4)
+        except IOError as e:
+            logger.error(f"Failed to write cache: {e}")
+
+    def get_cache(self, question: str):
+        data = self._read_cache()
+        return data.get(question)
+
+    def add_cache(self, question: str, answer: str) -> None:
+        data = self._read_cache()
+        data[question] = answer
+        self._write_cache(data)
+
+    def flush(self) -> None:
+        """JSON 缓存每次写入即落盘, 无需刷新"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteCacheDAO(CacheDAO):
+    """
+    基于 SQLite 的答案缓存
+
+    以规范化后的题目标题为主键, 查询为索引查找, 不再随缓存规模增长而变慢;
+    写入先进入内存缓冲区, 累计到 batch_size 条或调用 flush/close 时批量提交
+    """
+    DEFAULT_CACHE_FILE = "cache.db"
+    DEFAULT_BATCH_SIZE = 20
+
+    def __init__(self, file: str = DEFAULT_CACHE_FILE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 migrate_from: Optional[str] = CacheDAO.DEFAULT_CACHE_FILE):
+        self.cache_file = Path(file)
+        self.batch_size = max(1, batch_size)
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.cache_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answer_cache (title TEXT PRIMARY KEY, answer TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.commit()
+        if migrate_from:
+            self._migrate_json(Path(migrate_from))
+
+    def _migrate_json(self, json_file: Path) -> None:
+        """从旧版 cache.json 一次性导入缓存, 导入记录写入 cache_meta 避免重复迁移"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache_meta WHERE key = 'migrated_from'"
+            ).fetchone()
+            if row or not json_file.is_file():
+                return
+            try:
+                with json_file.open("r", encoding="utf8") as fp:
+                    data = json.load(fp)
+            except (IOError, json.JSONDecodeError) as e:
+                logger.warning(f"读取旧缓存文件失败, 跳过迁移: {e}")
+                return
+            rows = [
+                (normalize_title(title), answer)
+                for title, answer in data.items()
+                if isinstance(answer, str) and answer
+            ]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO answer_cache (title, answer) VALUES (?, ?)", rows
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('migrated_from', ?)",
+                    (str(json_file),),
+                )
+            logger.info(f"已从 {json_file} 迁移 {len(rows)} 条缓存到 {self.cache_file}")
+
+    def get_cache(self, question: str):
+        key = normalize_title(question)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            row = self._conn.execute(
+                "SELECT answer FROM answer_cache WHERE title = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def add_cache(self, question: str, answer: str) -> None:
+        with self._lock:
+            self._pending[normalize_title(question)] = answer
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """将缓冲区中的写入批量提交到数据库"""
+        with self._lock:
+            if not self._pending:
+                return
+            rows: List[Tuple[str, str]] = list(self._pending.items())
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO answer_cache (title, answer) VALUES (?, ?)", rows
+                    )
+                self._pending.clear()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write cache: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+class LRUCache:
+    """
+    线程安全的有界 LRU 缓存, 记录命中/未命中/淘汰次数
+    """
+    DEFAULT_MAXSIZE = 1024
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = max(0, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if self.maxsize == 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize: int) -> None:
+        """调整缓存容量, 缩小时按最近最少使用的顺序淘汰"""
+        with self._lock:
+            self.maxsize = max(0, maxsize)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+CACHE_BACKENDS = {
+    "json": CacheDAO,
+    "sqlite": SqliteCacheDAO,
+}
+
+
+def get_cache_dao(conf=None) -> CacheDAO:
+    """
+    根据题库配置创建缓存后端
+
+    支持的配置项(均位于 [tiku] 节, 可选):
+        cache_backend: 缓存后端, json 或 sqlite, 默认为 sqlite
+        cache_file: 缓存文件路径, 默认为对应后端的默认文件
+        cache_batch_size: sqlite 后端批量写入的条数
+        cache_memory_size: 进程内 LRU 缓存容量, 由 Tiku 读取
+
+    Args:
+        conf: 题库配置
+
+    Returns:
+        缓存后端实例
+    """
+    conf = conf or {}
+    backend = (conf.get("cache_backend") or "sqlite").strip().lower()
+    if backend not in CACHE_BACKENDS:
+        logger.warning(f"未知的缓存后端 {backend}, 将使用 sqlite")
+        backend = "sqlite"
+    cache_cls = CACHE_BACKENDS[backend]
+    cache_file = conf.get("cache_file") or cache_cls.DEFAULT_CACHE_FILE
+    if cache_cls is SqliteCacheDAO:
+        batch_size = int(conf.get("cache_batch_size") or SqliteCacheDAO.DEFAULT_BATCH_SIZE)
+        return SqliteCacheDAO(cache_file, batch_size=batch_size)
+    return cache_cls(cache_file)
@@ -6,6 +6,11 @@ class GlobalConst:
         "Sec-Ch-Ua": '"Chromium";v="118", "Google Chrome";v="118", "Not=A?Brand";v="99"',
     }
     COOKIES_PATH = "cookies.txt"
+    # 超星各接口的默认地址, 可通过 Chaoxing(base_url=...) 统一替换
+    PASSPORT_URL = "https://passport2.chaoxing.com"
+    MOOC1_URL = "https://mooc1.chaoxing.com"
+    MOOC2_URL = "https://mooc2-ans.chaoxing.com"
+    MOOC_DOMAIN_URL = "https://mooc1-1.chaoxing.com"  # 课程列表页 Referer 中的 moocDomain 参数
     VIDEO_HEADERS = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
         "Referer": "https://mooc1.chaoxing.com/ananas/modules/video/index.html?v=2023-1110-1610",
@@ -17,3 +22,5 @@ class GlobalConst:
         "Host": "mooc1.chaoxing.com",
     }
     THRESHOLD = 3
+    FONT_MAP_CACHE_SIZE = 64  # 加密字体映射表内存缓存数量
+    FONT_MAP_CACHE_DIR = None  # 加密字体映射表磁盘缓存目录, 为None时只使用内存缓存
@@ -7,14 +7,22 @@
 import base64
 import hashlib
 import json
+import mmap
 import os
+import struct
 import sys
+import tempfile
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
 from io import BytesIO
 from pathlib import Path
 from typing import Dict, IO, Optional, Union
 
 from fontTools.ttLib.tables._g_l_y_f import Glyph, table__g_l_y_f
 from fontTools.ttLib.ttFont import TTFont
+from api.cache import LRUCache
+from api.config import GlobalConst as gc
 from api.exceptions import FontDecodeError
 from api.logger import logger
 
@@ -48,9 +56,98 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(base_path, relative_path)
 
 
+# 字体哈希二进制索引格式
+FONT_INDEX_MAGIC = b"CXFH"
+FONT_INDEX_HEADER = struct.Struct("<4sI")
+FONT_DIGEST_SIZE = 16
+FONT_CODE_POINT = struct.Struct("<I")
+
+
+def font_index_count(buffer) -> Optional[int]:
+    """校验二进制索引的魔数和长度, 返回条目数, 索引损坏或不完整时返回None"""
+    if len(buffer) < FONT_INDEX_HEADER.size:
+        return None
+    magic, count = FONT_INDEX_HEADER.unpack_from(buffer)
+    if magic != FONT_INDEX_MAGIC:
+        return None
+    if len(buffer) != FONT_INDEX_HEADER.size + count * (FONT_DIGEST_SIZE + FONT_CODE_POINT.size):
+        return None
+    return count
+
+
+def compile_font_table(json_path: str, bin_path: Optional[str] = None) -> bytes:
+    """
+    将字体映射表JSON编译为紧凑的二进制索引
+
+    索引格式(小端): 文件头(魔数, 条目数) + 按哈希排序的16字节MD5数组 + 对应的uint32码位数组。
+    与原先 {hash: char} 字典的语义一致, 同一哈希对应多个字形时以后出现者为准;
+    码位按解密时的规则由字形名去掉前三个字符后按十六进制解析得到, 无法解析的字形名不写入索引
+
+    Args:
+        json_path: 字体映射表JSON文件路径
+        bin_path: 二进制索引输出路径, 为None时不写入文件
+
+    Returns:
+        二进制索引内容
+    """
+    with open(json_path, "r", encoding="utf-8") as fp:
+        char_map: Dict[str, str] = json.load(fp)
+
+    hash_map = {hash_val: char for char, hash_val in char_map.items()}
+    entries = []
+    for hash_val, char in hash_map.items():
+        try:
+            code_point = int(char[3:], 16)
+            chr(code_point)
+        except (ValueError, OverflowError):
+            continue
+        entries.append((bytes.fromhex(hash_val), code_point))
+    entries.sort()
+
+    header = FONT_INDEX_HEADER.pack(FONT_INDEX_MAGIC, len(entries))
+    digests = b"".join(digest for digest, _ in entries)
+    code_points = struct.pack(f"<{len(entries)}I", *(code_point for _, code_point in entries))
+    data = header + digests + code_points
+
+    if bin_path:
+        # 每次使用独立的临时文件, 多个工作进程同时编译时不会互相覆盖写了一半的文件
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(bin_path) or ".", prefix=os.path.basename(bin_path) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, bin_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    return data
+
+
+class _DigestView(Sequence):
+    """以序列形式访问二进制索引中的哈希数组, 供 bisect 二分查找"""
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self._offset + index * FONT_DIGEST_SIZE
+        return self._buffer[start:start + FONT_DIGEST_SIZE]
+
+
 class FontHashDAO:
     """
     字体哈希数据访问对象，负责管理字体哈希映射表
+
+    映射表在首次查询时才加载: 优先内存映射编译好的二进制索引, 索引不存在、早于JSON或不完整时重新编译
     """
 
     def __init__(self, file_path: str = "resource/font_map_table.json"):
@@ -59,21 +156,74 @@ class FontHashDAO:
 
         Args:
             file_path: 字体映射表JSON文件路径，相对于资源目录
-        
+        """
+        self.file_path = resource_path(file_path)
+        self.index_path = str(Path(self.file_path).with_suffix(".bin"))
+        self._buffer = None
+        self._digests: Sequence = ()
+        self._code_points_offset = 0
+        self._char_map: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self._buffer is not None:
+            return
+        with self._lock:
+            if self._buffer is not None:
+                return
+            try:
+                buffer = self._load_index()
+                count = font_index_count(buffer)
+                if count is None:
+                    raise FontDecodeError(f"字体索引格式错误: {self.index_path}")
+            except Exception as e:
+                logger.warning(f"初始化字体哈希数据失败 - {e}")
+                buffer, count = FONT_INDEX_HEADER.pack(FONT_INDEX_MAGIC, 0), 0
+            self._digests = _DigestView(buffer, FONT_INDEX_HEADER.size, count)
+            self._code_points_offset = FONT_INDEX_HEADER.size + count * FONT_DIGEST_SIZE
+            self._buffer = buffer
+
+    def _load_index(self):
+        """
+        加载二进制索引
+
         Raises:
-            FileNotFoundError: 当字体映射表文件不存在时
-            json.JSONDecodeError: 当字体映射表JSON格式错误时
+            FontDecodeError: 当字体映射表文件不存在或格式错误时
         """
-        self.char_map: Dict[str, str] = {}  # unicode -> hash
-        self.hash_map: Dict[str, str] = {}  # hash -> unicode
-        
-        full_path = resource_path(file_path)
         try:
-            with open(full_path, "r", encoding="utf-8") as fp:
-                self.char_map = json.load(fp)
-                self.hash_map = {hash_val: char for char, hash_val in self.char_map.items()}
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            raise FontDecodeError(f"加载字体映射表失败: {full_path} - {e}") from e
+            json_mtime = os.path.getmtime(self.file_path)
+        except OSError as e:
+            raise FontDecodeError(f"加载字体映射表失败: {self.file_path} - {e}") from e
+        if os.path.isfile(self.index_path) and os.path.getmtime(self.index_path) >= json_mtime:
+            buffer = self._map_index()
+            if buffer is not None and font_index_count(buffer) is not None:
+                return buffer
+            if buffer is not None:
+                buffer.close()
+            logger.warning(f"字体哈希索引不完整, 重新编译: {self.index_path}")
+        try:
+            compile_font_table(self.file_path, self.index_path)
+            logger.debug(f"已编译字体哈希索引: {self.index_path}")
+        except OSError:
+            # 资源目录不可写(例如打包环境), 直接使用内存中的索引
+            try:
+                return compile_font_table(self.file_path)
+            except (OSError, json.JSONDecodeError) as e:
+                raise FontDecodeError(f"加载字体映射表失败: {self.file_path} - {e}") from e
+        except json.JSONDecodeError as e:
+            raise FontDecodeError(f"加载字体映射表失败: {self.file_path} - {e}") from e
+        buffer = self._map_index()
+        if buffer is None:
+            raise FontDecodeError(f"字体索引为空: {self.index_path}")
+        return buffer
+
+    def _map_index(self):
+        """内存映射二进制索引, 文件为空时返回None"""
+        with open(self.index_path, "rb") as fp:
+            try:
+                return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return None
 
     def find_char(self, font_hash: str) -> Optional[str]:
         """
@@ -83,9 +233,30 @@ class FontHashDAO:
             font_hash: 字体哈希值
 
         Returns:
-            对应的Unicode字符编码，如果未找到则返回None
+            对应的Unicode字符编码 (如 "uni4E00")，如果未找到则返回None
         """
-        return self.hash_map.get(font_hash)
+        code_point = self.find_code_point(font_hash)
+        return f"uni{code_point:04X}" if code_point is not None else None
+
+    def find_code_point(self, font_hash: str) -> Optional[int]:
+        """
+        通过字体哈希值查找对应的Unicode码位
+
+        Args:
+            font_hash: 字体哈希值
+
+        Returns:
+            对应的Unicode码位，如果未找到则返回None
+        """
+        self._ensure_loaded()
+        try:
+            digest = bytes.fromhex(font_hash)
+        except ValueError:
+            return None
+        index = bisect_left(self._digests, digest)
+        if index == len(self._digests) or self._digests[index] != digest:
+            return None
+        return FONT_CODE_POINT.unpack_from(self._buffer, self._code_points_offset + index * FONT_CODE_POINT.size)[0]
 
     def find_hash(self, char: str) -> Optional[str]:
         """
@@ -97,35 +268,69 @@ class FontHashDAO:
         Returns:
             对应的字体哈希值，如果未找到则返回None
         """
-        return self.char_map.get(char)
+        # 反向查询很少使用, 需要时才读取原始JSON
+        if self._char_map is None:
+            try:
+                with open(self.file_path, "r", encoding="utf-8") as fp:
+                    self._char_map = json.load(fp)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                logger.warning(f"加载字体映射表失败: {self.file_path} - {e}")
+                self._char_map = {}
+        return self._char_map.get(char)
+
 
+# 字体哈希DAO单例, 映射表在首次解密时才加载
+fonthash_dao = FontHashDAO()
 
-# 初始化字体哈希DAO单例
-try:
-    fonthash_dao = FontHashDAO()
-except Exception as e:
-    logger.warning(f"初始化字体哈希数据失败 - {e}")
-    fonthash_dao = FontHashDAO.__new__(FontHashDAO)
-    fonthash_dao.char_map = {}
-    fonthash_dao.hash_map = {}
+
+# 轮廓点标志位只保留最低位(是否在曲线上), 按字节批量转换
+_ON_CURVE_TAB = bytes(b & 0x01 for b in range(256))
 
 
 def hash_glyph(glyph: Glyph) -> str:
     """
     计算TTF字体字形的哈希值
-    
+
+    哈希内容为各轮廓点依次拼接的 f"{x}{y}{flag}", 坐标与标志位整体批量格式化,
+    坐标存在非整数时回退到逐点格式化, 两种方式的结果完全一致
+
     Args:
         glyph: TTF字体字形对象
-    
+
     Returns:
         字形的MD5哈希值
     """
     if glyph.numberOfContours <= 0:
         return ""
-    
+
+    end_points = glyph.endPtsOfContours
+    coords = getattr(glyph.coordinates, "array", None)
+    num_points = end_points[-1] + 1
+    if (
+        coords is None
+        or any(a >= b for a, b in zip(end_points, end_points[1:]))
+        or len(coords) < num_points * 2
+        or not all(map(float.is_integer, coords[:num_points * 2]))
+    ):
+        return _hash_glyph_slow(glyph)
+
+    values = [0] * (num_points * 3)
+    values[0::3] = coords[0:num_points * 2:2]
+    values[1::3] = coords[1:num_points * 2:2]
+    values[2::3] = bytes(glyph.flags[:num_points]).translate(_ON_CURVE_TAB)
+    # 整数值的浮点数经 %d 格式化与 int 的 f-string 结果相同
+    pos_bin = ("%d%d%d" * num_points) % tuple(values)
+    return hashlib.md5(pos_bin.encode()).hexdigest()
+
+
+def _hash_glyph_slow(glyph: Glyph) -> str:
+    """逐点格式化计算字形哈希值, 作为 hash_glyph 的回退路径"""
+    if glyph.numberOfContours <= 0:
+        return ""
+
     pos_data = []
     last_index = 0
-    
+
     for i in range(glyph.numberOfContours):
         end_point = glyph.endPtsOfContours[i]
         for j in range(last_index, end_point + 1):
@@ -133,14 +338,43 @@ def hash_glyph(glyph: Glyph) -> str:
             flag = glyph.flags[j] & 0x01
             pos_data.append(f"{x}{y}{flag}")
         last_index = end_point + 1
-    
+
     pos_bin = "".join(pos_data)
     return hashlib.md5(pos_bin.encode()).hexdigest()
 
 
+# 字形哈希映射表缓存, 以Base64字体数据的摘要为键, 同一份加密字体只解析一次
+font_map_cache = LRUCache(gc.FONT_MAP_CACHE_SIZE)
+
+
+def _load_font_map_from_disk(digest: str) -> Optional[Dict[str, str]]:
+    if not gc.FONT_MAP_CACHE_DIR:
+        return None
+    cache_file = Path(gc.FONT_MAP_CACHE_DIR) / f"{digest}.json"
+    try:
+        with cache_file.open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_font_map_to_disk(digest: str, font_hashmap: Dict[str, str]) -> None:
+    if not gc.FONT_MAP_CACHE_DIR:
+        return
+    cache_dir = Path(gc.FONT_MAP_CACHE_DIR)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with (cache_dir / f"{digest}.json").open("w", encoding="utf-8") as fp:
+            json.dump(font_hashmap, fp)
+    except OSError as e:
+        logger.warning(f"写入字体映射缓存失败: {e}")
+
+
 def font2map(font_data: Union[IO, Path, str]) -> Dict[str, str]:
     """
     从字体文件或Base64编码的字体数据中提取字形哈希映射表
+
+    Base64编码的字体数据按内容摘要缓存, 先查内存缓存, 再查磁盘缓存(配置了 FONT_MAP_CACHE_DIR 时)
     
     Args:
         font_data: 字体文件路径、文件对象或Base64编码的字体数据
@@ -151,14 +385,29 @@ def font2map(font_data: Union[IO, Path, str]) -> Dict[str, str]:
     Raises:
         ValueError: 当无法解析字体数据时
     """
-    font_hashmap = {}
-    
     # 处理Base64编码的字体数据
     if isinstance(font_data, str) and font_data.startswith("data:application/font-ttf;charset=utf-8;base64,"):
-        try:
-            font_data = BytesIO(base64.b64decode(font_data[47:]))
-        except Exception as e:
-            raise FontDecodeError(f"无法解码Base64字体数据: {e}") from e
+        digest = hashlib.sha1(font_data[47:].encode()).hexdigest()
+        font_hashmap = font_map_cache.get(digest)
+        if font_hashmap is not None:
+            return font_hashmap
+        font_hashmap = _load_font_map_from_disk(digest)
+        if font_hashmap is None:
+            try:
+                font_file = BytesIO(base64.b64decode(font_data[47:]))
+            except Exception as e:
+                raise FontDecodeError(f"无法解码Base64字体数据: {e}") from e
+            font_hashmap = _parse_font_map(font_file)
+            _save_font_map_to_disk(digest, font_hashmap)
+        font_map_cache.put(digest, font_hashmap)
+        return font_hashmap
+
+    return _parse_font_map(font_data)
+
+
+def _parse_font_map(font_data: Union[IO, Path, str]) -> Dict[str, str]:
+    """解析字体文件, 计算所有 uni 字形的哈希值"""
+    font_hashmap = {}
 
     try:
         with TTFont(font_data, lazy=False) as font_file:
@@ -174,40 +423,70 @@ def font2map(font_data: Union[IO, Path, str]) -> Dict[str, str]:
     return font_hashmap
 
 
-def decrypt(dst_fontmap: Dict[str, str], encrypted_text: str) -> str:
+def build_decrypt_table(dst_fontmap: Dict[str, str]) -> Dict[int, int]:
+    """
+    为目标字体构建解密用的字符转换表
+
+    转换表合并了字形映射与康熙部首替换表: 加密字符直接映射为替换部首后的原始字符,
+    其余字符按康熙部首替换表转换, 解密只需一次 str.translate
+
+    Args:
+        dst_fontmap: 目标字体的字形哈希映射表
+
+    Returns:
+        可用于 str.translate 的转换表
+    """
+    table = dict(KX_RADICALS_TAB)
+    for char_code, dst_hash in dst_fontmap.items():
+        # 只有形如 "uni4E00" 的字形名才能与加密字符对应
+        try:
+            encrypted_code_point = int(char_code[3:], 16)
+        except ValueError:
+            continue
+        if f"uni{encrypted_code_point:X}" != char_code:
+            continue
+        # 通过哈希值找回原始字符
+        original_code_point = fonthash_dao.find_code_point(dst_hash)
+        if original_code_point is not None:
+            table[encrypted_code_point] = KX_RADICALS_TAB.get(original_code_point, original_code_point)
+    return table
+
+
+# 转换表缓存, font2map 对同一字体返回同一映射表对象, 以对象标识为键复用转换表
+decrypt_table_cache = LRUCache(gc.FONT_MAP_CACHE_SIZE)
+
+
+def get_decrypt_table(dst_fontmap: Dict[str, str]) -> Dict[int, int]:
+    """
+    获取目标字体的转换表, 同一映射表对象只构建一次
+
+    Args:
+        dst_fontmap: 目标字体的字形哈希映射表
+
+    Returns:
+        可用于 str.translate 的转换表
+    """
+    cached = decrypt_table_cache.get(id(dst_fontmap))
+    # 缓存中保留映射表的引用, 校验对象一致以防id复用
+    if cached is not None and cached[0] is dst_fontmap:
+        return cached[1]
+    table = build_decrypt_table(dst_fontmap)
+    decrypt_table_cache.put(id(dst_fontmap), (dst_fontmap, table))
+    return table
+
+
+def decrypt(dst_fontmap: Dict[str, str], encrypted_text: str, table: Optional[Dict[int, int]] = None) -> str:
     """
     解密超星学习通加密字体的文本
     
     Args:
         dst_fontmap: 目标字体的字形哈希映射表
         encrypted_text: 加密的文本
+        table: 转换表, 不传入时通过 get_decrypt_table 获取
     
     Returns:
         解密后的文本
     """
-    result = []
-    
-    for char in encrypted_text:
-        # 构造Unicode字符名称 (如 "uni4E00")
-        char_code = f"uni{ord(char):X}"
-        
-        # 查找字符在目标字体中的哈希值
-        if char_code in dst_fontmap:
-            dst_hash = dst_fontmap[char_code]
-            # 通过哈希值找回原始字符
-            original_char_code = fonthash_dao.find_char(dst_hash)
-            if original_char_code:
-                # 将Unicode编码转换为字符
-                try:
-                    original_char = chr(int(original_char_code[3:], 16))
-                    result.append(original_char)
-                    continue
-                except (ValueError, IndexError):
-                    pass
-        
-        # 如果无法解密，则保留原字符
-        result.append(char)
-    
-    # 替换解密后的康熙部首
-    decrypted_text = "".join(result).translate(KX_RADICALS_TAB)
-    return decrypted_text
+    if table is None:
+        table = get_decrypt_table(dst_fontmap)
+    return encrypted_text.translate(table)
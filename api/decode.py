@@ -7,12 +7,55 @@
 """
 import re
 import json
+from functools import wraps
 from typing import List, Dict, Tuple, Any, Optional
 from bs4 import BeautifulSoup, NavigableString
 from api.logger import logger
 from api.font_decoder import FontDecoder
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+
+# 可选的页面解析后端: bs4 为默认的 BeautifulSoup 实现, lxml 为 api.decode_lxml 中基于 XPath 的实现
+PARSER_BACKENDS = ("bs4", "lxml")
+_parser_backend = "bs4"
+
+
+def set_parser_backend(backend: str) -> None:
+    """
+    设置页面解析后端
+
+    Args:
+        backend: 解析后端名称, bs4 或 lxml
+    """
+    global _parser_backend
+    backend = (backend or "bs4").strip().lower()
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"未知的解析后端: {backend}, 可选值为 {', '.join(PARSER_BACKENDS)}")
+    _parser_backend = backend
+    logger.debug(f"页面解析后端: {backend}")
+
+
+def get_parser_backend() -> str:
+    return _parser_backend
+
+
+def _dispatch_backend(func):
+    """解析后端为 lxml 时, 转发到 api.decode_lxml 中的同名函数"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _parser_backend == "lxml":
+            # 延迟导入, api.decode_lxml 会复用本模块中的辅助函数
+            from api import decode_lxml
+            return getattr(decode_lxml, func.__name__)(*args, **kwargs)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@_dispatch_backend
 def decode_course_list(html_text: str) -> List[Dict[str, str]]:
     """
     解析课程列表页面，提取课程信息
@@ -49,6 +92,7 @@ def decode_course_list(html_text: str) -> List[Dict[str, str]]:
     return course_list
 
 
+@_dispatch_backend
 def decode_course_folder(html_text: str) -> List[Dict[str, str]]:
     """
     解析二级课程列表页面，提取文件夹信息
@@ -77,6 +121,7 @@ def decode_course_folder(html_text: str) -> List[Dict[str, str]]:
     return course_folder_list
 
 
+@_dispatch_backend
 def decode_course_point(html_text: str) -> Dict[str, Any]:
     """
     解析章节列表页面，提取章节点信息
@@ -169,13 +214,8 @@ def decode_course_card(html_text: str) -> Tuple[List[Dict[str, Any]], Dict[str,
     if "章节未开放" in html_text:
         return [], {"notOpen": True}
 
-    # 提取mArg参数
-    temp = re.findall(r"mArg=\{(.*?)\};", html_text.replace(" ", ""))
-    if not temp:
-        return [], {}
-        
-    # 解析JSON数据
-    cards_data = json.loads("{" + temp[0] + "}")
+    # 提取并解析mArg参数
+    cards_data = _extract_marg(html_text)
     if not cards_data:
         return [], {}
 
@@ -189,6 +229,39 @@ def decode_course_card(html_text: str) -> Tuple[List[Dict[str, Any]], Dict[str,
     return job_list, job_info
 
 
+MARG_PATTERN = re.compile(r"\bmArg\s*=\s*\{")
+_json_decoder = json.JSONDecoder()
+
+
+def _extract_marg(html_text: str) -> Optional[Dict[str, Any]]:
+    """
+    定位页面中 mArg = {...}; 的赋值并解析其中的JSON
+
+    直接从赋值处的左花括号开始解析, 不复制整个页面; 安装了 orjson 时先尝试用
+    orjson 解析到第一个 "};" 为止的片段, 失败再回退到标准库逐字符解析
+
+    Args:
+        html_text: 任务点列表页面的HTML内容
+
+    Returns:
+        mArg 对象, 未找到或无法解析时返回 None
+    """
+    for match in MARG_PATTERN.finditer(html_text):
+        start = match.end() - 1
+        if orjson is not None:
+            end = html_text.find("};", start)
+            if end != -1:
+                try:
+                    return orjson.loads(html_text[start:end + 1])
+                except orjson.JSONDecodeError:
+                    pass
+        try:
+            return _json_decoder.raw_decode(html_text, start)[0]
+        except json.JSONDecodeError as e:
+            logger.debug(f"解析mArg失败: {e}")
+    return None
+
+
 def _extract_job_info(cards_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     从卡片数据中提取任务基本信息
@@ -319,6 +392,7 @@ def _process_work_task(card: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+@_dispatch_backend
 def decode_questions_info(html_content: str) -> Dict[str, Any]:
     """
     解析题目信息，提取表单数据和问题列表
@@ -332,12 +406,12 @@ def decode_questions_info(html_content: str) -> Dict[str, Any]:
     soup = BeautifulSoup(html_content, "lxml")
     form_data = _extract_form_data(soup)
     
-    # 检查是否存在字体加密
-    has_font_encryption = bool(soup.find("style", id="cxSecretStyle"))
+    # 检查是否存在字体加密, 直接复用已解析的样式标签, 避免重复解析整个页面
+    style_tag = soup.find("style", id="cxSecretStyle")
     font_decoder = None
     
-    if has_font_encryption:
-        font_decoder = FontDecoder(html_content)
+    if style_tag:
+        font_decoder = FontDecoder(style_text=style_tag.text)
     else:
         logger.warning("未找到字体文件，可能是未加密的题目不进行解密")
     
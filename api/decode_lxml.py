@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+基于 lxml XPath 的页面解析后端
+
+与 api.decode 中基于 BeautifulSoup 的实现保持相同的函数签名和返回结果,
+直接在 lxml 的元素树上用预编译的 XPath 查找, 省去构建 BeautifulSoup 树的开销。
+通过 api.decode.set_parser_backend("lxml") 启用。
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+from api.decode import _get_question_type
+from api.font_decoder import FontDecoder
+from api.logger import logger
+
+
+def _has_class(name: str) -> str:
+    """生成匹配 class 属性中包含指定类名的 XPath 谓词"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+COURSE_XPATH = etree.XPath(f"//div[{_has_class('course')}]")
+COURSE_NOT_OPEN_XPATH = etree.XPath(
+    f"(.//a[{_has_class('not-open-tip')}] | .//div[{_has_class('not-open-tip')}])[1]"
+)
+COURSE_CLAZZ_ID_XPATH = etree.XPath(f"(.//input[{_has_class('clazzId')}])[1]")
+COURSE_COURSE_ID_XPATH = etree.XPath(f"(.//input[{_has_class('courseId')}])[1]")
+COURSE_LINK_XPATH = etree.XPath("(.//a)[1]")
+COURSE_NAME_XPATH = etree.XPath(f"(.//span[{_has_class('course-name')}])[1]")
+COURSE_DESC_XPATH = etree.XPath(f"(.//p[{_has_class('margint10')}])[1]")
+COURSE_TEACHER_XPATH = etree.XPath(f"(.//p[{_has_class('color3')}])[1]")
+
+FOLDER_XPATH = etree.XPath(f"//ul[{_has_class('file-list')}]/li")
+FOLDER_RENAME_XPATH = etree.XPath(f"(.//input[{_has_class('rename-input')}])[1]")
+
+CHAPTER_UNIT_XPATH = etree.XPath(f"//div[{_has_class('chapter_unit')}]")
+POINT_DIV_XPATH = etree.XPath("(.//div)[1]")
+POINT_TITLE_XPATH = etree.XPath(f"(.//a[{_has_class('clicktitle')}])[1]")
+POINT_JOB_COUNT_XPATH = etree.XPath(f"(.//input[{_has_class('knowledgeJobCount')}])[1]")
+POINT_TIPS_XPATH = etree.XPath(f"(.//span[{_has_class('bntHoverTips')}])[1]")
+
+FORM_XPATH = etree.XPath("(//form)[1]")
+SECRET_STYLE_XPATH = etree.XPath("(//style[@id='cxSecretStyle'])[1]")
+QUESTION_XPATH = etree.XPath(f".//div[{_has_class('singleQuesId')}]")
+QUESTION_TYPE_XPATH = etree.XPath(f"(.//div[{_has_class('TiMu')}])[1]")
+QUESTION_TITLE_XPATH = etree.XPath(f"(.//div[{_has_class('Zy_TItle')}])[1]")
+QUESTION_OPTIONS_XPATH = etree.XPath("(.//ul)[1]")
+
+# BeautifulSoup 的 Tag.text 不包含这些标签内的文本
+_NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+# BeautifulSoup 会把仅由这些空白字符组成的文本折叠为单个换行或空格, 保留空白的标签除外
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "textarea"})
+
+
+def _parse_html(html_text: str) -> Optional[etree._Element]:
+    """解析HTML文本, 空文档返回 None"""
+    try:
+        return etree.HTML(html_text)
+    except ValueError:
+        # 带编码声明的 XML 头不能以 str 形式解析
+        return etree.HTML(html_text.encode("utf-8"))
+
+
+def _first(xpath: etree.XPath, element: etree._Element) -> Optional[etree._Element]:
+    result = xpath(element)
+    return result[0] if result else None
+
+
+def _string(text: str, preserve: bool = False) -> str:
+    """按 BeautifulSoup 的规则折叠纯空白文本"""
+    if preserve or text.strip(_ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _text(element: etree._Element) -> str:
+    """获取元素的文本内容, 与 BeautifulSoup 的 Tag.text 结果一致"""
+    preserve = element.tag in _PRESERVE_WHITESPACE_TAGS
+    if element.tag in _NON_TEXT_TAGS:
+        return _string(element.text, preserve) if element.text else ""
+    parts = []
+    _collect_text(element, parts, preserve)
+    return "".join(parts)
+
+
+def _collect_text(element: etree._Element, parts: List[str], preserve: bool = False) -> None:
+    if element.text:
+        parts.append(_string(element.text, preserve))
+    for child in element:
+        # 注释节点的 tag 不是字符串, 其内容不计入文本
+        if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+            _collect_text(child, parts, preserve or child.tag in _PRESERVE_WHITESPACE_TAGS)
+        if child.tail:
+            parts.append(_string(child.tail, preserve))
+
+
+def decode_course_list(html_text: str) -> List[Dict[str, str]]:
+    """
+    解析课程列表页面，提取课程信息
+
+    Args:
+        html_text: 课程列表页面的HTML内容
+
+    Returns:
+        课程信息列表，每个课程包含id、title、teacher等信息
+    """
+    logger.trace("开始解码课程列表...")
+    root = _parse_html(html_text)
+    course_list = []
+    if root is None:
+        return course_list
+
+    for course in COURSE_XPATH(root):
+        # 跳过未开放课程
+        if COURSE_NOT_OPEN_XPATH(course):
+            continue
+
+        desc = _first(COURSE_DESC_XPATH, course)
+        course_detail = {
+            "id": course.attrib["id"],
+            "info": course.attrib["info"],
+            "roleid": course.attrib["roleid"],
+            "clazzId": _first(COURSE_CLAZZ_ID_XPATH, course).attrib["value"],
+            "courseId": _first(COURSE_COURSE_ID_XPATH, course).attrib["value"],
+            "cpi": re.findall(r"cpi=(.*?)&", _first(COURSE_LINK_XPATH, course).attrib["href"])[0],
+            "title": _first(COURSE_NAME_XPATH, course).attrib["title"],
+            "desc": desc.attrib["title"] if desc is not None else "",
+            "teacher": _first(COURSE_TEACHER_XPATH, course).attrib["title"]
+        }
+        course_list.append(course_detail)
+
+    return course_list
+
+
+def decode_course_folder(html_text: str) -> List[Dict[str, str]]:
+    """
+    解析二级课程列表页面，提取文件夹信息
+
+    Args:
+        html_text: 二级课程列表页面的HTML内容
+
+    Returns:
+        课程文件夹信息列表
+    """
+    logger.trace("开始解码二级课程列表...")
+    root = _parse_html(html_text)
+    course_folder_list = []
+    if root is None:
+        return course_folder_list
+
+    for course in FOLDER_XPATH(root):
+        if not course.get("fileid"):
+            continue
+
+        course_folder_detail = {
+            "id": course.attrib["fileid"],
+            "rename": _first(FOLDER_RENAME_XPATH, course).attrib["value"]
+        }
+        course_folder_list.append(course_folder_detail)
+
+    return course_folder_list
+
+
+def decode_course_point(html_text: str) -> Dict[str, Any]:
+    """
+    解析章节列表页面，提取章节点信息
+
+    Args:
+        html_text: 章节列表页面的HTML内容
+
+    Returns:
+        章节信息字典，包含是否锁定状态和章节点列表
+    """
+    logger.trace("开始解码章节列表...")
+    root = _parse_html(html_text)
+    course_point = {
+        "hasLocked": False,  # 用于判断该课程任务是否是需要解锁
+        "points": [],
+    }
+    if root is None:
+        return course_point
+
+    for chapter_unit in CHAPTER_UNIT_XPATH(root):
+        points = _extract_points_from_chapter(chapter_unit)
+        # 检查是否有锁定内容
+        for point in points:
+            if point.get("need_unlock", False):
+                course_point["hasLocked"] = True
+
+        course_point["points"].extend(points)
+
+    return course_point
+
+
+def _extract_points_from_chapter(chapter_unit: etree._Element) -> List[Dict[str, Any]]:
+    """从章节单元中提取章节点信息"""
+    point_list = []
+
+    for raw_point in chapter_unit.iter("li"):
+        point = _first(POINT_DIV_XPATH, raw_point)
+        if "id" not in point.attrib:
+            continue
+
+        point_id = re.findall(r"^cur(\d{1,20})$", point.attrib["id"])[0]
+        point_title = _text(_first(POINT_TITLE_XPATH, point)).replace("\n", "").strip()
+
+        # 提取任务数量
+        job_count = 1  # 默认为1
+        need_unlock = False
+        job_count_input = _first(POINT_JOB_COUNT_XPATH, point)
+        tips = _first(POINT_TIPS_XPATH, point)
+        tips_text = _text(tips) if tips is not None else ""
+        if job_count_input is not None:
+            job_count = job_count_input.attrib["value"]
+        elif tips is not None and "解锁" in tips_text:
+            need_unlock = True
+
+        # 判断是否已完成
+        is_finished = tips is not None and "已完成" in tips_text
+
+        point_detail = {
+            "id": point_id,
+            "title": point_title,
+            "jobCount": job_count,
+            "has_finished": is_finished,
+            "need_unlock": need_unlock
+        }
+        point_list.append(point_detail)
+
+    return point_list
+
+
+def decode_questions_info(html_content: str) -> Dict[str, Any]:
+    """
+    解析题目信息，提取表单数据和问题列表
+
+    Args:
+        html_content: 题目页面HTML内容
+
+    Returns:
+        包含表单数据和问题列表的字典
+    """
+    root = _parse_html(html_content)
+    form_tag = _first(FORM_XPATH, root) if root is not None else None
+    form_data = _extract_form_data(form_tag)
+
+    # 检查是否存在字体加密
+    style_tag = _first(SECRET_STYLE_XPATH, root) if root is not None else None
+    font_decoder = None
+
+    if style_tag is not None:
+        font_decoder = FontDecoder(style_text=_text(style_tag))
+    else:
+        logger.warning("未找到字体文件，可能是未加密的题目不进行解密")
+
+    # 处理所有问题
+    questions = []
+    for div_tag in QUESTION_XPATH(form_tag):
+        question = _process_question(div_tag, font_decoder)
+        if question:
+            questions.append(question)
+
+    # 更新表单数据
+    form_data["questions"] = questions
+    form_data["answerwqbid"] = ",".join([q["id"] for q in questions]) + ","
+
+    return form_data
+
+
+def _extract_form_data(form_tag: Optional[etree._Element]) -> Dict[str, Any]:
+    """从表单元素中提取表单数据"""
+    form_data = {}
+
+    if form_tag is None:
+        return form_data
+
+    # 提取所有非答案字段的input
+    for input_tag in form_tag.iter("input"):
+        name = input_tag.get("name")
+        if name is None or "answer" in name:
+            continue
+        form_data[name] = input_tag.get("value", "")
+
+    return form_data
+
+
+def _process_question(div_tag: etree._Element, font_decoder=None) -> Dict[str, Any]:
+    """处理单个问题"""
+    # 提取问题ID和题目类型
+    question_id = div_tag.get("data", "")
+    q_type_code = _first(QUESTION_TYPE_XPATH, div_tag).get("data", "")
+    q_type = _get_question_type(q_type_code)
+
+    # 提取题目内容和选项
+    title_div = _first(QUESTION_TITLE_XPATH, div_tag)
+    options_ul = _first(QUESTION_OPTIONS_XPATH, div_tag)
+    options_list = list(options_ul.iter("li")) if options_ul is not None else []
+
+    # 解析题目和选项
+    q_title = _extract_title(title_div, font_decoder)
+    q_options = []
+    for li in options_list:
+        q_options.append(_extract_choices(li, font_decoder))
+    # 排序选项
+    q_options.sort()
+    q_options = '\n'.join(q_options)
+
+    return {
+        "id": question_id,
+        "title": q_title,
+        "options": q_options,
+        "type": q_type,
+        "answerField": {
+            f"answer{question_id}": "",
+            f"answertype{question_id}": q_type_code,
+        },
+    }
+
+
+def _extract_title(element: Optional[etree._Element], font_decoder=None) -> str:
+    """提取标题内容，支持解码加密字体"""
+    if element is None:
+        return ""
+
+    # 收集元素中的所有文本(含注释)和图片, 与 BeautifulSoup 的 descendants 遍历顺序一致
+    content = []
+    _collect_title_content(element, content, element.tag in _PRESERVE_WHITESPACE_TAGS)
+
+    raw_content = "".join(content)
+    cleaned_content = raw_content.replace("\r", "").replace("\t", "").replace("\n", "")
+
+    # 如果有字体解码器，进行解码
+    if font_decoder:
+        return font_decoder.decode(cleaned_content)
+
+    return cleaned_content
+
+
+def _collect_title_content(element: etree._Element, content: List[str], preserve: bool = False) -> None:
+    if element.text:
+        content.append(_string(element.text, preserve))
+    for child in element:
+        if child.tag == "img":
+            img_url = child.get("src", "")
+            content.append(f'<img src="{img_url}">')
+        if isinstance(child.tag, str):
+            _collect_title_content(child, content, preserve or child.tag in _PRESERVE_WHITESPACE_TAGS)
+        elif child.text:
+            content.append(_string(child.text, preserve))
+        if child.tail:
+            content.append(_string(child.tail, preserve))
+
+
+def _extract_choices(element: Optional[etree._Element], font_decoder=None) -> str:
+    """提取选项内容，支持解码加密字体"""
+    # 没有子元素的 lxml 元素布尔值为假, 需显式判断 None
+    if element is None:
+        return ""
+
+    # 提取aria-label属性值作为选项，解决#474
+    choice = element.get('aria-label')
+
+    cleaned_content = choice.replace("\r", "").replace("\t", "").replace("\n", "")
+
+    # 如果有字体解码器，进行解码
+    if font_decoder:
+        return font_decoder.decode(cleaned_content)
+
+    return cleaned_content
@@ -17,16 +17,22 @@ class FontDecoder:
     FONT_BASE64_PATTERN = r"base64,([\w\W]+?)\'"
     FONT_DATA_URL_PREFIX = "data:application/font-ttf;charset=utf-8;base64,"
     
-    def __init__(self, html_content: Optional[str] = None):
+    def __init__(self, html_content: Optional[str] = None, style_text: Optional[str] = None):
         """初始化字体解码器。
         
+        已解析过页面时可直接传入加密字体样式标签的文本, 避免重复解析整个HTML。
+        
         Args:
             html_content: 包含加密字体信息的HTML内容
+            style_text: 加密字体样式标签(style#cxSecretStyle)的文本, 优先于 html_content
         """
         self.html_content = html_content
         self.__font_map: Optional[Dict] = None
+        self.__decrypt_table: Optional[Dict[int, int]] = None
         
-        if html_content:
+        if style_text is not None:
+            self.__init_font_map_from_style(style_text)
+        elif html_content:
             self.__init_font_map(html_content)
     
     def __init_font_map(self, html_content: str) -> None:
@@ -38,20 +44,35 @@ class FontDecoder:
         try:
             soup = BeautifulSoup(html_content, "lxml")
             style_tag = soup.find("style", id="cxSecretStyle")
-            
-            if not style_tag or not style_tag.text:
+        except Exception as e:
+            logger.warning(f"初始化字体映射失败: {e}")
+            self.__font_map = None
+            self.__decrypt_table = None
+            return
+        self.__init_font_map_from_style(style_tag.text if style_tag else "")
+    
+    def __init_font_map_from_style(self, style_text: str) -> None:
+        """从加密字体样式标签的文本中提取字体信息并初始化字体映射。
+        
+        Args:
+            style_text: 加密字体样式标签的文本
+        """
+        try:
+            if not style_text:
                 raise FontDecodeError("未找到加密字体样式标签")
 
-            match = re.search(self.FONT_BASE64_PATTERN, style_tag.text)
+            match = re.search(self.FONT_BASE64_PATTERN, style_text)
             if not match:
                 raise FontDecodeError("无法从样式标签中提取字体数据")
 
             font_base64 = match.group(1)
             font_data_url = self.FONT_DATA_URL_PREFIX + font_base64
             self.__font_map = cxfont.font2map(font_data_url)
+            self.__decrypt_table = cxfont.get_decrypt_table(self.__font_map)
         except Exception as e:
             logger.warning(f"初始化字体映射失败: {e}")
             self.__font_map = None
+            self.__decrypt_table = None
     
     def decode(self, target_str: str) -> str:
         """解码加密字符串。
@@ -68,7 +89,7 @@ class FontDecoder:
         if not self.__font_map:
             raise FontDecodeError("字体映射未初始化，无法解码")
 
-        return cxfont.decrypt(self.__font_map, target_str)
+        return cxfont.decrypt(self.__font_map, target_str, self.__decrypt_table)
     
     def set_html_content(self, html_content: str) -> None:
         """设置新的HTML内容并重新初始化字体映射。
@@ -78,3 +99,12 @@ class FontDecoder:
         """
         self.html_content = html_content
         self.__init_font_map(html_content)
+    
+    def set_style_text(self, style_text: str) -> None:
+        """设置新的加密字体样式文本并重新初始化字体映射。
+        
+        Args:
+            style_text: 加密字体样式标签的文本
+        """
+        self.html_content = None
+        self.__init_font_map_from_style(style_text)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 请求统计模块
+
+按接口记录请求次数、收发字节数、状态码分布和耗时直方图:
+- RequestMetrics: 线程安全的统计容器, 默认使用全局实例 request_metrics
+- InstrumentedSession: 自动记录每次请求的 requests.Session, 供 Chaoxing 和题库使用
+- httpx_event_hooks: 为 httpx.Client 生成记录请求的事件钩子, 供 AI 题库的连接池使用
+- MetricsReporter: 运行过程中定期将统计结果写入 JSON 文件, 便于实时查看
+"""
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from api.logger import logger
+
+# 耗时直方图各桶的上限(秒), 超过最后一个桶的请求计入 "+Inf"
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 路径中的纯数字段和较长的十六进制段(课程ID、任务objectid、dtoken等)视为参数
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F]{16,})$")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """
+    将请求归类为接口名称, 例如 GET mooc1.chaoxing.com/ananas/status/{id}
+
+    Args:
+        method: 请求方法
+        url: 请求地址, 查询参数不参与归类
+
+    Returns:
+        接口名称
+    """
+    parts = urlsplit(url)
+    path = "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in parts.path.split("/"))
+    return f"{method.upper()} {parts.netloc}{path or '/'}"
+
+
+class EndpointStats:
+    """单个接口的统计数据"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors: Dict[str, int] = {}  # 异常类型 -> 次数
+        self.status: Dict[int, int] = {}  # 状态码 -> 次数
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, elapsed: float, status: Optional[int], sent: int, received: int, error: Optional[str]) -> None:
+        self.count += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.time_total += elapsed
+        self.time_max = max(self.time_max, elapsed)
+        if status is not None:
+            self.status[status] = self.status.get(status, 0) + 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """根据直方图估算分位数, 返回所在桶的上限, 落在最后一个桶时返回最大耗时"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(min(bound, self.time_max), 4)
+        return round(self.time_max, 4)
+
+    def to_dict(self) -> dict:
+        histogram = {f"le_{bound:g}": n for bound, n in zip(LATENCY_BUCKETS, self.buckets)}
+        histogram["+Inf"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "status": {str(code): n for code, n in sorted(self.status.items())},
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "time_total": round(self.time_total, 4),
+            "time_avg": round(self.time_total / self.count, 4) if self.count else 0,
+            "time_max": round(self.time_max, 4),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "histogram": histogram,
+        }
+
+
+class RequestMetrics:
+    """
+    线程安全的按接口请求统计
+    """
+
+    def __init__(self) -> None:
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        elapsed: float,
+        status: Optional[int] = None,
+        sent: int = 0,
+        received: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        记录一次请求
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            elapsed: 耗时(秒), 包含读取响应体的时间
+            status: 响应状态码, 请求异常时为None
+            sent: 请求体字节数
+            received: 响应体字节数
+            error: 请求异常的类型名称
+        """
+        name = endpoint_name(method, url)
+        with self._lock:
+            stats = self._endpoints.get(name)
+            if stats is None:
+                stats = self._endpoints[name] = EndpointStats()
+            stats.add(elapsed, status, sent, received, error)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self._started = time.time()
+
+    def summary(self) -> dict:
+        """返回 JSON 可序列化的统计结果, 接口按总耗时降序排列"""
+        with self._lock:
+            endpoints = {name: stats.to_dict() for name, stats in self._endpoints.items()}
+            started = self._started
+        endpoints = dict(sorted(endpoints.items(), key=lambda item: item[1]["time_total"], reverse=True))
+        return {
+            "started": started,
+            "duration": round(time.time() - started, 3),
+            "requests": sum(e["count"] for e in endpoints.values()),
+            "errors": sum(sum(e["errors"].values()) for e in endpoints.values()),
+            "bytes_sent": sum(e["bytes_sent"] for e in endpoints.values()),
+            "bytes_received": sum(e["bytes_received"] for e in endpoints.values()),
+            "time_total": round(sum(e["time_total"] for e in endpoints.values()), 4),
+            "buckets": list(LATENCY_BUCKETS),
+            "endpoints": endpoints,
+        }
+
+    def dump(self, path) -> None:
+        """将统计结果写入 JSON 文件, 先写临时文件再替换, 读取方不会看到写了一半的文件"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf8") as fp:
+            json.dump(self.summary(), fp, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+
+    def log_summary(self, top: int = 5) -> None:
+        """输出请求总览和总耗时最高的几个接口"""
+        summary = self.summary()
+        logger.info(
+            f"HTTP请求统计: 共 {summary['requests']} 次, 失败 {summary['errors']} 次, "
+            f"接收 {summary['bytes_received'] / 1024:.1f} KiB, 累计耗时 {summary['time_total']:.1f} s"
+        )
+        for name, stats in list(summary["endpoints"].items())[:top]:
+            logger.info(
+                f"  {name}: {stats['count']} 次, 累计 {stats['time_total']:.2f} s, "
+                f"平均 {stats['time_avg'] * 1000:.0f} ms, p90 {stats['p90'] * 1000:.0f} ms"
+            )
+
+
+# 全局请求统计, 同一进程内的所有会话共享
+request_metrics = RequestMetrics()
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0  # 流式或文件请求体不计入
+
+
+class InstrumentedSession(requests.Session):
+    """
+    记录每次请求的 requests.Session, 耗时包含重试和读取响应体的时间
+    """
+
+    def __init__(self, metrics: RequestMetrics = None) -> None:
+        super().__init__()
+        self.metrics = metrics or request_metrics
+
+    def request(self, method, url, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            self.metrics.record(method, url, time.perf_counter() - start_time, error=type(e).__name__)
+            raise
+        received = len(resp.content) if not kwargs.get("stream") else 0
+        self.metrics.record(
+            method,
+            url,
+            time.perf_counter() - start_time,
+            status=resp.status_code,
+            sent=_body_size(resp.request.body),
+            received=received,
+        )
+        return resp
+
+
+def httpx_event_hooks(metrics: RequestMetrics = None) -> dict:
+    """
+    生成 httpx.Client 的 event_hooks, 记录连接池发出的每次请求
+
+    httpx 的响应钩子在读取响应体之前调用, 这里主动读取响应体以统计字节数和完整耗时;
+    连接失败等异常不会触发响应钩子, 不计入统计
+    """
+    metrics = metrics or request_metrics
+
+    def on_request(request):
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    def on_response(response):
+        request = response.request
+        response.read()
+        start_time = request.extensions.get("metrics_start", time.perf_counter())
+        try:
+            sent = len(request.content)
+        except Exception:
+            sent = 0  # 流式请求体未读取
+        metrics.record(
+            request.method,
+            str(request.url),
+            time.perf_counter() - start_time,
+            status=response.status_code,
+            sent=sent,
+            received=len(response.content),
+        )
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+class MetricsReporter:
+    """
+    后台线程, 每隔 interval 秒将统计结果写入 JSON 文件, 用于运行过程中实时查看
+    """
+
+    def __init__(self, path, interval: float, metrics: RequestMetrics = None) -> None:
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or request_metrics
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.dump(self.path)
+            except OSError as e:
+                logger.warning(f"写入请求统计文件失败: {e}")
+
+    def stop(self) -> None:
+        """停止后台线程并写入最终结果"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.metrics.dump(self.path)
@@ -1,6 +1,7 @@
 import time
 from typing import Union
 from api.config import GlobalConst as gc
+from api.progress import ProgressEvent, progress
 
 
 def sec2time(seconds: int) -> str:
@@ -25,7 +26,7 @@ def sec2time(seconds: int) -> str:
 
 
 def show_progress(task_name: str, start_position: int, duration: int, 
-                 total_length: int, speed: float) -> None:
+                 total_length: int, speed: float, job_id: str = None) -> None:
     """
     显示任务进度条，模拟任务进度。
     
@@ -35,12 +36,14 @@ def show_progress(task_name: str, start_position: int, duration: int,
         duration: 任务持续时间（以秒为单位）
         total_length: 任务总长度（以秒为单位）
         speed: 任务执行速度
+        job_id: 任务点ID, 进度百分比变化时发出 job_progress 事件
         
     Returns:
         None
     """
     start_time = time.time()
     expected_end_time = start_time + (duration / speed)
+    last_percent = None
     
     while time.time() < expected_end_time:
         # 计算当前进度
@@ -59,4 +62,10 @@ def show_progress(task_name: str, start_position: int, duration: int,
         )
         
         print(progress_text, end="", flush=True)
+        if job_id is not None and percent_complete != last_percent:
+            last_percent = percent_complete
+            progress.emit(
+                ProgressEvent.JOB_PROGRESS, job_id=job_id, name=task_name, percent=percent_complete,
+                position=current_position, duration=total_length
+            )
         time.sleep(gc.THRESHOLD)
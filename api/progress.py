@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+学习进度事件模块
+
+学习流程在课程、章节、任务点的开始和结束时发出结构化的进度事件, 由注册的输出端处理:
+- StdoutSink: 以固定前缀逐行输出到标准输出, 任务服务读取子进程输出时按前缀识别
+- JsonLinesSink: 每个事件一行 JSON 追加写入文件
+- CallbackSink: 在进程内调用回调函数, 供任务服务的工作进程使用
+- ProgressState: 将事件合并为当前进度的快照, 供状态查询和推送使用
+
+未注册任何输出端时 emit 直接返回, 不影响学习流程
+"""
+import json
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+from api.logger import logger
+
+# StdoutSink 输出行的前缀
+PROGRESS_PREFIX = "@progress "
+
+
+class ProgressEvent:
+    """
+    一条进度事件, type 为下列常量之一, 其余字段见各常量的注释
+    """
+
+    COURSE_START = "course_start"  # course_id, title, index, total
+    COURSE_DONE = "course_done"  # course_id, title, status: completed/stopped
+    CHAPTER_START = "chapter_start"  # course_id, chapter_id, title, index, total, finished
+    JOB_START = "job_start"  # course_id, job_id, job_type, name
+    JOB_PROGRESS = "job_progress"  # job_id, name, percent, position, duration
+    JOB_DONE = "job_done"  # job_id, job_type, status: success/forbidden/error/timeout/skipped
+    ANSWERS = "answers"  # job_id, total, found, submitted
+
+    def __init__(self, type: str, data: dict = None, timestamp: float = None) -> None:
+        self.type = type
+        self.data = data or {}
+        self.time = timestamp if timestamp is not None else time.time()
+
+    def to_dict(self) -> dict:
+        return {"type": self.type, "time": self.time, **self.data}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProgressEvent":
+        data = dict(data)
+        return cls(data.pop("type"), data, data.pop("time", None))
+
+    def __repr__(self) -> str:
+        return f"ProgressEvent({self.type!r}, {self.data!r})"
+
+
+def parse_progress_line(line: str) -> Optional[ProgressEvent]:
+    """解析 StdoutSink 输出的一行, 不是进度事件时返回None"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        return ProgressEvent.from_dict(json.loads(line[len(PROGRESS_PREFIX):]))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class ProgressSink:
+    """进度事件输出端"""
+
+    def emit(self, event: ProgressEvent) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutSink(ProgressSink):
+    """
+    以 PROGRESS_PREFIX 开头的 JSON 行输出到标准输出
+
+    进度条以 \\r 开头且不换行, 这里先输出 \\r, 使事件总是位于单独的一行
+    """
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream
+
+    def emit(self, event: ProgressEvent) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(f"\r{PROGRESS_PREFIX}{json.dumps(event.to_dict(), ensure_ascii=False)}\n")
+        stream.flush()
+
+
+class JsonLinesSink(ProgressSink):
+    """每个事件一行 JSON 追加写入文件"""
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self._file = open(path, "a", encoding="utf8", buffering=1)
+        self._lock = threading.Lock()
+
+    def emit(self, event: ProgressEvent) -> None:
+        with self._lock:
+            self._file.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class CallbackSink(ProgressSink):
+    """在进程内将事件传给回调函数"""
+
+    def __init__(self, callback: Callable[[ProgressEvent], None]) -> None:
+        self.callback = callback
+
+    def emit(self, event: ProgressEvent) -> None:
+        self.callback(event)
+
+
+class ProgressReporter:
+    """
+    将进度事件分发给已注册的输出端, 单个输出端失败只记录警告
+    """
+
+    def __init__(self) -> None:
+        self._sinks: List[ProgressSink] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._sinks)
+
+    def add_sink(self, sink: ProgressSink) -> ProgressSink:
+        with self._lock:
+            self._sinks = self._sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink: ProgressSink) -> None:
+        """移除并关闭输出端"""
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+        sink.close()
+
+    def emit(self, event_type: str, **data) -> Optional[ProgressEvent]:
+        sinks = self._sinks
+        if not sinks:
+            return None
+        event = ProgressEvent(event_type, data)
+        for sink in sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                logger.warning(f"输出进度事件失败 {sink.__class__.__name__}: {e}")
+        return event
+
+
+# 全局进度事件分发, 学习流程通过它发出事件
+progress = ProgressReporter()
+
+
+class ProgressState:
+    """
+    将进度事件合并为当前进度的快照
+
+    快照包括当前课程、章节和任务点, 以及本次运行累计的题目数和找到答案的题目数
+    """
+
+    # 只对当前任务点有效的事件
+    _JOB_EVENTS = (ProgressEvent.JOB_PROGRESS, ProgressEvent.JOB_DONE, ProgressEvent.ANSWERS)
+
+    def __init__(self) -> None:
+        self.seq = 0  # 已合并的事件数, 快照变化时递增
+        self.updated = None
+        self.course = None
+        self.chapter = None
+        self.job = None
+        self.answers = {"total": 0, "found": 0}
+        self._lock = threading.Lock()
+
+    def apply(self, event: ProgressEvent) -> None:
+        data = event.data
+        with self._lock:
+            if event.type in self._JOB_EVENTS and (self.job is None or self.job.get("job_id") != data.get("job_id")):
+                return
+            self.seq += 1
+            self.updated = event.time
+            if event.type == ProgressEvent.COURSE_START:
+                self.course = dict(data)
+                self.chapter = self.job = None
+            elif event.type == ProgressEvent.COURSE_DONE:
+                if self.course is not None:
+                    self.course["status"] = data.get("status")
+            elif event.type == ProgressEvent.CHAPTER_START:
+                self.chapter = dict(data)
+                self.job = None
+            elif event.type == ProgressEvent.JOB_START:
+                self.job = dict(data, percent=0)
+            elif event.type == ProgressEvent.JOB_PROGRESS:
+                self.job.update(percent=data.get("percent"), position=data.get("position"), duration=data.get("duration"))
+            elif event.type == ProgressEvent.JOB_DONE:
+                self.job["status"] = data.get("status")
+                if data.get("status") == "success":
+                    self.job["percent"] = 100
+            elif event.type == ProgressEvent.ANSWERS:
+                self.job["answers"] = {k: data.get(k) for k in ("total", "found", "submitted")}
+                self.answers["total"] += data.get("total", 0)
+                self.answers["found"] += data.get("found", 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "updated": self.updated,
+                "course": dict(self.course) if self.course else None,
+                "chapter": dict(self.chapter) if self.chapter else None,
+                "job": dict(self.job) if self.job else None,
+                "answers": dict(self.answers),
+            }
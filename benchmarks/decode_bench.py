@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+api.decode 离线基准测试
+
+读取 benchmarks/fixtures 下的页面样本, 对每个解析函数:
+1. 校验解析结果与 fixtures/expected 下保存的期望结果一致
+2. 统计吞吐量(页/秒、MiB/秒)和 tracemalloc 记录的内存峰值
+
+真实的加密题目页面每次下发的字体都不同, 默认在每次解析加密页面前清空字体解析缓存,
+使用 --warm-font 可保留缓存, 只测量页面解析本身。
+
+用法:
+    python -m benchmarks.decode_bench [--backend bs4 lxml] [--repeat 5] [--number 10]
+    python -m benchmarks.decode_bench --update    # 解析逻辑有意变更后刷新期望结果
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import api.cxsecret_font as cxfont
+from api import decode
+from api.logger import logger
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+EXPECTED_DIR = FIXTURES_DIR / "expected"
+
+# 样本文件名 -> 解析函数
+FIXTURE_DECODERS = {
+    "course_list.html": decode.decode_course_list,
+    "course_folder.html": decode.decode_course_folder,
+    "course_point.html": decode.decode_course_point,
+    "course_card.html": decode.decode_course_card,
+    "questions.html": decode.decode_questions_info,
+    "questions_secret.html": decode.decode_questions_info,
+}
+
+
+def load_fixtures():
+    fixtures = []
+    for name, func in FIXTURE_DECODERS.items():
+        path = FIXTURES_DIR / name
+        if not path.is_file():
+            sys.exit(f"缺少样本文件 {path}, 请先运行 python -m benchmarks.make_fixtures")
+        fixtures.append((name, func, path.read_text(encoding="utf-8")))
+    return fixtures
+
+
+def normalize(result):
+    """将解析结果转换为 JSON 可比较的形式(元组转为列表)"""
+    return json.loads(json.dumps(result, ensure_ascii=False))
+
+
+def check_expected(name: str, result, update: bool) -> bool:
+    expected_file = EXPECTED_DIR / (Path(name).stem + ".json")
+    result = normalize(result)
+    if update:
+        EXPECTED_DIR.mkdir(exist_ok=True)
+        with expected_file.open("w", encoding="utf-8") as fp:
+            json.dump(result, fp, ensure_ascii=False, indent=2)
+            fp.write("\n")
+        return True
+    if not expected_file.is_file():
+        print(f"缺少期望结果 {expected_file}, 请使用 --update 生成")
+        return False
+    with expected_file.open("r", encoding="utf-8") as fp:
+        return json.load(fp) == result
+
+
+def cold_font(func):
+    """每次调用前清空字体解析缓存"""
+    def wrapper(page):
+        cxfont.font_map_cache.clear()
+        cxfont.decrypt_table_cache.clear()
+        return func(page)
+    return wrapper
+
+
+def measure_peak_memory(func, page: str) -> int:
+    """返回单次解析过程中 tracemalloc 记录的内存峰值(字节)"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func(page)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api.decode 离线基准测试")
+    parser.add_argument("--backend", nargs="+", default=list(decode.PARSER_BACKENDS),
+                        choices=list(decode.PARSER_BACKENDS), help="要测试的解析后端")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数, 取最快的一轮")
+    parser.add_argument("--number", type=int, default=10, help="每轮解析次数")
+    parser.add_argument("--warm-font", action="store_true", help="解析加密页面时保留字体解析缓存")
+    parser.add_argument("--update", action="store_true", help="用 bs4 后端的结果刷新期望结果")
+    args = parser.parse_args()
+
+    # 解析过程中的日志不计入耗时
+    logger.remove()
+    fixtures = load_fixtures()
+
+    failed = []
+    print(f"{'backend':<8} {'fixture':<22} {'KiB':>7} {'ms/page':>9} {'pages/s':>9} {'MiB/s':>7} {'peak KiB':>9}")
+    for backend in args.backend:
+        decode.set_parser_backend(backend)
+        for name, func, page in fixtures:
+            if "cxSecretStyle" in page and not args.warm_font:
+                func = cold_font(func)
+            result = func(page)
+            if not check_expected(name, result, args.update and backend == "bs4"):
+                failed.append(f"{backend}:{name}")
+            seconds = min(timeit.repeat(lambda: func(page), number=args.number, repeat=args.repeat)) / args.number
+            peak = measure_peak_memory(func, page)
+            size = len(page.encode("utf-8"))
+            print(
+                f"{backend:<8} {name:<22} {size / 1024:7.1f} {seconds * 1000:9.3f} "
+                f"{1 / seconds:9.1f} {size / seconds / 2 ** 20:7.2f} {peak / 1024:9.1f}"
+            )
+    decode.set_parser_backend("bs4")
+
+    if failed:
+        sys.exit(f"解析结果与期望不一致: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
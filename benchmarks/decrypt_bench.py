@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+cxsecret_font.decrypt 微基准测试
+
+对比逐字符查表的旧实现与基于 str.translate 转换表的新实现的单字符耗时,
+并校验两者解密结果完全一致。
+
+用法: python -m benchmarks.decrypt_bench [--chars 20000] [--glyphs 600]
+"""
+import argparse
+import json
+import random
+import timeit
+
+import api.cxsecret_font as cxfont
+
+
+def legacy_decrypt(hash_map, dst_fontmap, encrypted_text):
+    """逐字符解密的旧实现(哈希表为内存字典), 仅用作对照"""
+    result = []
+    for char in encrypted_text:
+        char_code = f"uni{ord(char):X}"
+        if char_code in dst_fontmap:
+            original_char_code = hash_map.get(dst_fontmap[char_code])
+            if original_char_code:
+                try:
+                    result.append(chr(int(original_char_code[3:], 16)))
+                    continue
+                except (ValueError, IndexError):
+                    pass
+        result.append(char)
+    return "".join(result).translate(cxfont.KX_RADICALS_TAB)
+
+
+def build_sample(glyphs: int, chars: int, seed: int = 0):
+    """用字体映射表中的真实哈希构造一份加密字体映射和加密文本"""
+    rng = random.Random(seed)
+    with open(cxfont.fonthash_dao.file_path, "r", encoding="utf-8") as fp:
+        char_map = json.load(fp)
+    hash_map = {hash_val: char for char, hash_val in char_map.items()}
+    hashes = [h for name, h in char_map.items() if name.startswith("uni4") or name.startswith("uni5")]
+    encrypted_chars = [chr(0x4E00 + i) for i in rng.sample(range(0x5000), glyphs)]
+    dst_fontmap = {f"uni{ord(c):X}": rng.choice(hashes) for c in encrypted_chars}
+    # 混入未加密字符、康熙部首和ASCII
+    pool = encrypted_chars + [chr(0x4E00 + i) for i in range(200)] + list("⼀⼈⼝⼤abc123，。（）")
+    text = "".join(rng.choice(pool) for _ in range(chars))
+    return hash_map, dst_fontmap, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cxsecret_font.decrypt 微基准测试")
+    parser.add_argument("--chars", type=int, default=20000, help="加密文本长度")
+    parser.add_argument("--glyphs", type=int, default=600, help="加密字体的字形数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数, 取最小值")
+    args = parser.parse_args()
+
+    hash_map, dst_fontmap, text = build_sample(args.glyphs, args.chars)
+    table = cxfont.build_decrypt_table(dst_fontmap)
+    assert legacy_decrypt(hash_map, dst_fontmap, text) == cxfont.decrypt(dst_fontmap, text, table), "新旧实现解密结果不一致"
+
+    cases = {
+        "legacy": lambda: legacy_decrypt(hash_map, dst_fontmap, text),
+        "translate": lambda: cxfont.decrypt(dst_fontmap, text, table),
+        "build_table": lambda: cxfont.build_decrypt_table(dst_fontmap),
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        per_char = seconds / args.chars * 1e9
+        print(f"{name:<12} {seconds * 1000:8.3f} ms  {per_char:8.1f} ns/char")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+cxsecret_font.hash_glyph 微基准测试
+
+用 fontTools 生成一份包含大量字形的示例字体, 校验批量格式化的 hash_glyph
+与逐点格式化的旧实现对每个字形得到完全一致的哈希值, 并对比两者耗时。
+
+用法: python -m benchmarks.glyph_hash_bench [--glyphs 2000] [--points 60]
+"""
+import argparse
+import random
+import timeit
+from io import BytesIO
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.ttFont import TTFont
+
+import api.cxsecret_font as cxfont
+
+
+def build_sample_font(glyphs: int, points: int, seed: int = 0) -> bytes:
+    """生成包含 glyphs 个 uni 字形的 TTF 字体, 每个字形约 points 个轮廓点"""
+    rng = random.Random(seed)
+    names = [".notdef"] + [f"uni{0x4E00 + i:04X}" for i in range(glyphs)]
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({0x4E00 + i: name for i, name in enumerate(names[1:])})
+    glyph_table = {}
+    for i, name in enumerate(names):
+        pen = TTGlyphPen(None)
+        if i:
+            remaining = points
+            while remaining > 0:
+                size = min(remaining, rng.randint(4, 20))
+                pen.moveTo((rng.randint(-100, 1000), rng.randint(-200, 900)))
+                for _ in range(size - 1):
+                    pt = (rng.randint(-100, 1000), rng.randint(-200, 900))
+                    if rng.random() < 0.3:
+                        pen.qCurveTo((rng.randint(-100, 1000), rng.randint(-200, 900)), pt)
+                    else:
+                        pen.lineTo(pt)
+                pen.closePath()
+                remaining -= size
+        glyph_table[name] = pen.glyph()
+    fb.setupGlyf(glyph_table)
+    fb.setupHorizontalMetrics({name: (1000, 0) for name in names})
+    fb.setupHorizontalHeader(ascent=900, descent=-100)
+    fb.setupOS2()
+    fb.setupPost()
+    fb.setupNameTable({"familyName": "Bench", "styleName": "Regular"})
+    buf = BytesIO()
+    fb.save(buf)
+    return buf.getvalue()
+
+
+def check_parity(glyph_list) -> None:
+    """逐字形比对新旧实现, 并覆盖非整数坐标的回退路径"""
+    for glyph in glyph_list:
+        assert cxfont.hash_glyph(glyph) == cxfont._hash_glyph_slow(glyph), "新旧实现哈希值不一致"
+    glyph = glyph_list[-1]
+    glyph.coordinates[0] = (glyph.coordinates[0][0] + 0.5, glyph.coordinates[0][1])
+    assert cxfont.hash_glyph(glyph) == cxfont._hash_glyph_slow(glyph), "非整数坐标回退结果不一致"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cxsecret_font.hash_glyph 微基准测试")
+    parser.add_argument("--glyphs", type=int, default=2000, help="字形数量")
+    parser.add_argument("--points", type=int, default=60, help="每个字形的轮廓点数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数, 取最小值")
+    args = parser.parse_args()
+
+    font_bytes = build_sample_font(args.glyphs, args.points)
+    with TTFont(BytesIO(font_bytes), lazy=False) as font:
+        table = font["glyf"]
+        glyph_list = [table[name] for name in table.glyphOrder if name.startswith("uni")]
+
+        cases = {
+            "slow": lambda: [cxfont._hash_glyph_slow(g) for g in glyph_list],
+            "bulk": lambda: [cxfont.hash_glyph(g) for g in glyph_list],
+        }
+        for name, func in cases.items():
+            seconds = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            print(f"{name:<6} {seconds * 1000:8.3f} ms  {seconds / len(glyph_list) * 1e6:8.2f} us/glyph")
+        check_parity(glyph_list)
+
+    seconds = min(timeit.repeat(lambda: cxfont._parse_font_map(BytesIO(font_bytes)), number=1, repeat=args.repeat))
+    print(f"font2map {seconds * 1000:8.3f} ms  ({len(glyph_list)} glyphs)")
+    print("parity ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+生成 benchmarks/fixtures 下的离线页面样本
+
+样本由 benchmarks.samples 按固定随机种子生成, 不含任何真实账号或课程数据。
+页面结构调整后重新运行本脚本, 再运行 python -m benchmarks.decode_bench --update
+刷新期望结果。
+
+用法: python -m benchmarks.make_fixtures
+"""
+from pathlib import Path
+
+from benchmarks import samples
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+FIXTURE_PAGES = {
+    "course_list.html": lambda: samples.course_list_page(60),
+    "course_folder.html": lambda: samples.course_folder_page(12),
+    "course_point.html": lambda: samples.course_point_page(30, 10),
+    "course_card.html": lambda: samples.course_card_page(12),
+    "questions.html": lambda: samples.quiz_page(40, encrypted=False),
+    "questions_secret.html": lambda: samples.quiz_page(40, encrypted=True),
+}
+
+
+def main():
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for name, build in FIXTURE_PAGES.items():
+        path = FIXTURES_DIR / name
+        path.write_text(build(), encoding="utf-8")
+        print(f"{path} {path.stat().st_size / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+本地超星模拟服务器
+
+用 Flask 模拟登录、课程列表、章节、任务点卡片、视频状态与进度上报、文档/阅读任务、
+章节测验获取与提交等接口, 并附带一个 TikuAdapter 格式的题库接口。页面由
+benchmarks.samples 按固定随机种子渲染, 同样的参数每次生成完全相同的课程数据。
+
+每个接口都可以注入固定延迟和随机抖动, 用于离线、可重复地对 main.py 的完整运行进行性能分析;
+GET /__mock__/stats 返回各接口的请求次数, POST /__mock__/reset 清空统计和学习进度。
+
+用法:
+    python -m benchmarks.mock_server [--port 5001] [--latency 0.05] [--jitter 0.02]
+                                     [--endpoint-latency cards=0.2 ...]
+    python main.py -c benchmarks/mock_config.ini
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, jsonify, make_response, request
+
+from benchmarks import samples
+
+MOCK_FID = "1000"
+MOCK_UID = "100000001"
+
+
+class MockChaoxing:
+    """
+    模拟服务器的课程数据与学习进度
+
+    课程、章节和任务点在初始化时按随机种子一次性生成, 已完成的任务点记录在 passed 中,
+    之后再请求章节列表和任务点卡片时会体现为已完成
+    """
+
+    JOB_KINDS = ("video", "document", "read", "workid")
+
+    def __init__(self, courses: int = 2, folder_courses: int = 1, chapters: int = 3, points: int = 3,
+                 questions: int = 5, video_duration: int = 60, secret_font: bool = True, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.questions = questions
+        self.video_duration = video_duration
+        self.secret_font = secret_font
+        self.font_url = samples.make_font(samples.SAMPLE_CHARS, seed) if secret_font else None
+        self.passed = set()
+        self.lock = threading.Lock()
+
+        self.folders = [{"id": 9000 + i, "name": f"文件夹{i + 1}"} for i in range(1 if folder_courses else 0)]
+        self.courses = []
+        self.points: Dict[str, Dict[str, Any]] = {}  # 章节点ID -> 章节点
+        self.works: Dict[str, List[Dict[str, Any]]] = {}  # 测验ID -> 题目列表
+        for i in range(courses + folder_courses):
+            course_id = str(100001 + i)
+            course = {
+                "courseId": course_id,
+                "clazzId": str(800001 + i),
+                "cpi": str(300001 + i),
+                "title": f"模拟课程{i + 1}",
+                "teacher": "模拟教师",
+                "desc": samples.random_words(self.rng, 12),
+                "folder": self.folders[0]["id"] if i >= courses else 0,
+                "units": [],
+            }
+            for c in range(chapters):
+                unit = {"title": f"第{c + 1}章 {samples.random_words(self.rng, 6)}", "points": []}
+                for p in range(points):
+                    point_id = f"{course_id}{c + 1:02d}{p + 1:02d}"
+                    point = {
+                        "id": point_id,
+                        "title": f"{c + 1}.{p + 1} {samples.random_words(self.rng, 8)}",
+                        "jobs": [self._new_job(point_id, kind) for kind in self.JOB_KINDS],
+                        "knowledge": {
+                            "ktoken": f"{self.rng.getrandbits(128):032x}",
+                            "cpi": course["cpi"],
+                            "knowledgeid": point_id,
+                        },
+                    }
+                    unit["points"].append(point)
+                    self.points[point_id] = point
+                course["units"].append(unit)
+            self.courses.append(course)
+
+    def _new_job(self, point_id: str, kind: str) -> Dict[str, Any]:
+        object_id = f"{self.rng.getrandbits(128):032x}"
+        job_id = f"{point_id}{self.JOB_KINDS.index(kind)}"
+        if kind == "workid":
+            job_id = f"work-{job_id}"
+            self.works[job_id.replace("work-", "")] = [self._new_question() for _ in range(self.questions)]
+        return {
+            "jobid": job_id,
+            "job": kind != "read",
+            "type": kind,
+            "otherInfo": f"nodeId_{point_id}-cpi_{self.rng.randrange(10 ** 9)}-rt_d-ds_0",
+            "mid": f"{self.rng.randrange(10 ** 16)}",
+            "objectId": object_id,
+            "aid": self.rng.randrange(10 ** 9),
+            "enc": f"{self.rng.getrandbits(128):032x}",
+            "jtoken": f"{self.rng.getrandbits(128):032x}",
+            "property": {
+                "name": f"{samples.random_words(self.rng, 6)}.mp4",
+                "title": samples.random_words(self.rng, 8),
+                "id": object_id,
+                "objectid": object_id,
+                "read": False,
+            },
+        }
+
+    def _new_question(self) -> Dict[str, Any]:
+        type_code = self.rng.choice("013")
+        options = [(samples.random_words(self.rng, 6),) * 2 for _ in "ABCD"] if type_code in "01" else []
+        return {
+            "id": str(200000000 + self.rng.randrange(10 ** 8)),
+            "type": type_code,
+            "title": samples.random_words(self.rng, 20),
+            "tail": samples.random_words(self.rng, 4),
+            "options": options,
+        }
+
+    def find_course(self, course_id: str) -> Optional[Dict[str, Any]]:
+        return next((course for course in self.courses if course["courseId"] == course_id), None)
+
+    def mark_passed(self, job_id: str) -> None:
+        with self.lock:
+            self.passed.add(job_id)
+
+    def is_passed(self, job_id: str) -> bool:
+        return job_id in self.passed
+
+    def reset(self) -> None:
+        with self.lock:
+            self.passed.clear()
+
+
+def create_app(store: MockChaoxing, latency: float = 0.0, jitter: float = 0.0,
+               endpoint_latency: Optional[Dict[str, float]] = None, instant_video: bool = True) -> Flask:
+    """
+    创建模拟服务器应用
+
+    Args:
+        store: 课程数据
+        latency: 每个请求的固定延迟(秒)
+        jitter: 在固定延迟上叠加的随机抖动上限(秒)
+        endpoint_latency: 按接口名覆盖固定延迟, 接口名即下方视图函数名
+        instant_video: 为 True 时视频首次上报进度即视为完成, 否则需要上报到视频时长
+    """
+    app = Flask(__name__)
+    endpoint_latency = endpoint_latency or {}
+    stats = Counter()
+    stats_lock = threading.Lock()
+    jitter_rng = random.Random(0)
+
+    @app.before_request
+    def inject_latency():
+        endpoint = request.endpoint or "unknown"
+        if endpoint.startswith("mock_"):
+            return
+        with stats_lock:
+            stats[endpoint] += 1
+            delay = endpoint_latency.get(endpoint, latency) + jitter_rng.uniform(0, jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    @app.route("/fanyalogin", methods=["POST"])
+    def login():
+        resp = make_response(jsonify({"status": True, "url": "/space/index"}))
+        for name, value in {"fid": MOCK_FID, "_uid": MOCK_UID, "UID": MOCK_UID, "_d": str(int(time.time()))}.items():
+            resp.set_cookie(name, value)
+        return resp
+
+    @app.route("/mooc2-ans/visit/courselistdata", methods=["POST"])
+    def course_list():
+        folder_id = int(request.form.get("courseFolderId", 0))
+        return samples.render_course_list([c for c in store.courses if c["folder"] == folder_id])
+
+    @app.route("/mooc2-ans/visit/interaction")
+    def course_folder():
+        return samples.render_course_folder(store.folders)
+
+    @app.route("/mooc2-ans/mycourse/studentcourse")
+    def course_point():
+        course = store.find_course(request.args.get("courseid", ""))
+        if not course:
+            return "课程不存在", 404
+        units = []
+        for unit in course["units"]:
+            points = []
+            for point in unit["points"]:
+                remaining = sum(not store.is_passed(job["jobid"]) for job in point["jobs"])
+                points.append({"id": point["id"], "title": point["title"], "status": remaining or "finished"})
+            units.append({"title": unit["title"], "points": points})
+        return samples.render_course_point(units)
+
+    @app.route("/mooc-ans/knowledge/cards")
+    def cards():
+        point = store.points.get(request.args.get("knowledgeid", ""))
+        # 每个章节点只有第一张任务卡片
+        if not point or request.args.get("num") != "0":
+            return "<!DOCTYPE html><html><head></head><body></body></html>"
+        attachments = [dict(job, isPassed=store.is_passed(job["jobid"])) for job in point["jobs"]]
+        return samples.render_course_card({
+            "attachments": attachments,
+            "defaults": dict(point["knowledge"], reportTimeInterval=60, cardid=point["id"]),
+            "control": True,
+        })
+
+    @app.route("/ananas/status/<object_id>")
+    def video_status(object_id):
+        return jsonify({
+            "status": "success",
+            "dtoken": object_id[:16],
+            "duration": store.video_duration,
+            "crc": object_id[16:],
+            "key": object_id[::-1],
+        })
+
+    @app.route("/mooc-ans/multimedia/log/a/<cpi>/<dtoken>")
+    def video_log(cpi, dtoken):
+        playing_time = int(request.args.get("playingTime", 0))
+        duration = int(request.args.get("duration", store.video_duration))
+        is_passed = instant_video or playing_time >= duration
+        if is_passed:
+            store.mark_passed(request.args.get("jobid", ""))
+        return jsonify({"isPassed": is_passed})
+
+    @app.route("/ananas/job/document")
+    def document():
+        store.mark_passed(request.args.get("jobid", ""))
+        return jsonify({"status": True, "msg": "success"})
+
+    @app.route("/ananas/job/readv2")
+    def read():
+        store.mark_passed(request.args.get("jobid", ""))
+        return jsonify({"status": True, "msg": "success"})
+
+    @app.route("/mooc-ans/mycourse/studentstudyAjax")
+    def empty_page():
+        return "<!DOCTYPE html><html><head></head><body></body></html>"
+
+    @app.route("/mooc-ans/api/work")
+    def work():
+        work_id = request.args.get("workId", "")
+        questions = store.works.get(work_id)
+        if questions is None:
+            return "测验不存在", 404
+        form_fields = [
+            ("courseId", request.args.get("courseid", "")),
+            ("classId", request.args.get("clazzId", "")),
+            ("knowledgeid", request.args.get("knowledgeid", "")),
+            ("workRelationId", work_id),
+            ("oldWorkId", work_id),
+            ("enc_work", request.args.get("enc", "")),
+            ("pyFlag", ""),
+        ]
+        return samples.render_quiz(questions, form_fields, store.font_url)
+
+    @app.route("/mooc-ans/work/addStudentWorkNew", methods=["POST"])
+    def work_submit():
+        if request.form.get("pyFlag") == "":
+            store.mark_passed(f"work-{request.form.get('workRelationId', '')}")
+        return jsonify({"status": True, "msg": "success"})
+
+    @app.route("/tikuadapter/search", methods=["POST"])
+    def tiku_search():
+        data = request.get_json(silent=True) or {}
+        options = data.get("options") or []
+        if data.get("type") == 3:
+            answer = ["正确"]
+        elif data.get("type") == 1:
+            answer = options[:2]
+        else:
+            answer = options[:1]
+        return jsonify({"plat": 0, "question": data.get("question", ""), "answer": {"bestAnswer": answer}})
+
+    @app.route("/__mock__/stats")
+    def mock_stats():
+        with stats_lock:
+            return jsonify({"total": sum(stats.values()), "endpoints": dict(stats)})
+
+    @app.route("/__mock__/reset", methods=["POST"])
+    def mock_reset():
+        with stats_lock:
+            stats.clear()
+        store.reset()
+        return jsonify({"status": True})
+
+    return app
+
+
+def parse_endpoint_latency(values: List[str]) -> Dict[str, float]:
+    endpoint_latency = {}
+    for value in values:
+        name, _, seconds = value.partition("=")
+        endpoint_latency[name.strip()] = float(seconds)
+    return endpoint_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地超星模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--courses", type=int, default=2, help="顶层课程数量")
+    parser.add_argument("--folder-courses", type=int, default=1, help="文件夹中的课程数量")
+    parser.add_argument("--chapters", type=int, default=3, help="每门课程的章节数")
+    parser.add_argument("--points", type=int, default=3, help="每章的章节点数")
+    parser.add_argument("--questions", type=int, default=5, help="每个测验的题目数")
+    parser.add_argument("--video-duration", type=int, default=60, help="视频时长(秒)")
+    parser.add_argument("--realtime-video", action="store_true", help="视频需上报到完整时长才算完成")
+    parser.add_argument("--no-secret-font", action="store_true", help="测验页面不使用加密字体")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机抖动上限(秒)")
+    parser.add_argument("--endpoint-latency", nargs="*", default=[], metavar="NAME=SECONDS",
+                        help="按接口覆盖固定延迟, 例如 cards=0.2 work=0.5")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = MockChaoxing(
+        courses=args.courses,
+        folder_courses=args.folder_courses,
+        chapters=args.chapters,
+        points=args.points,
+        questions=args.questions,
+        video_duration=args.video_duration,
+        secret_font=not args.no_secret_font,
+        seed=args.seed,
+    )
+    app = create_app(
+        store,
+        latency=args.latency,
+        jitter=args.jitter,
+        endpoint_latency=parse_endpoint_latency(args.endpoint_latency),
+        instant_video=not args.realtime_video,
+    )
+    print("课程ID: " + ",".join(course["courseId"] for course in store.courses))
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
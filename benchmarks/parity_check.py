@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+快速路径一致性校验
+
+不计时, 只校验各项优化后的实现与原实现得到完全一致的结果, 任一项不一致时以非零状态退出。
+修改 api/cxsecret_font.py 或 api/decode.py 后运行。
+
+用法: python -m benchmarks.parity_check
+"""
+import sys
+from io import BytesIO
+
+from fontTools.ttLib.ttFont import TTFont
+
+from api import decode
+from api.logger import logger
+from benchmarks.decode_bench import check_expected, load_fixtures
+from benchmarks.glyph_hash_bench import build_sample_font, check_parity as check_glyph_hash_parity
+from benchmarks.parser_bench import build_cases, check_parity as check_parser_parity
+
+
+def check_glyph_hash() -> None:
+    """hash_glyph 批量格式化与逐点格式化的哈希值一致"""
+    with TTFont(BytesIO(build_sample_font(200, 40)), lazy=False) as font:
+        table = font["glyf"]
+        glyph_list = [table[name] for name in table.glyphOrder if name.startswith("uni")]
+        check_glyph_hash_parity(glyph_list)
+
+
+def check_parser_backends() -> None:
+    """lxml 后端与 bs4 后端对示例页面的解析结果一致"""
+    check_parser_parity(build_cases(1))
+
+
+def check_fixtures() -> None:
+    """每种解析后端对 fixtures 页面样本的解析结果与保存的期望结果一致"""
+    try:
+        for backend in decode.PARSER_BACKENDS:
+            decode.set_parser_backend(backend)
+            for name, func, page in load_fixtures():
+                assert check_expected(name, func(page), update=False), f"{backend}:{name} 与期望结果不一致"
+    finally:
+        decode.set_parser_backend("bs4")
+
+
+# 校验名称 -> 校验函数, 不一致时抛出 AssertionError
+CHECKS = {
+    "glyph_hash": check_glyph_hash,
+    "parser_backends": check_parser_backends,
+    "decode_fixtures": check_fixtures,
+}
+
+
+def main():
+    # 解析过程中的日志与校验结果无关
+    logger.remove()
+    failed = []
+    for name, check in CHECKS.items():
+        try:
+            check()
+        except AssertionError as e:
+            failed.append(name)
+            print(f"{name:<18} FAILED  {e}")
+        else:
+            print(f"{name:<18} ok")
+    if failed:
+        sys.exit(f"一致性校验失败: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+api.decode 解析后端对比
+
+对每种示例页面分别用 bs4 和 lxml 后端解析, 校验两者结果完全一致并对比耗时。
+
+用法: python -m benchmarks.parser_bench [--scale 1] [--repeat 5]
+"""
+import argparse
+import timeit
+
+from api import decode
+from benchmarks import samples
+
+
+def build_cases(scale: int):
+    """返回 (名称, 解析函数, 页面) 列表, scale 控制页面规模"""
+    return [
+        ("course_list", decode.decode_course_list, samples.course_list_page(50 * scale)),
+        ("course_folder", decode.decode_course_folder, samples.course_folder_page(10 * scale)),
+        ("course_point", decode.decode_course_point, samples.course_point_page(20 * scale, 10)),
+        ("questions", decode.decode_questions_info, samples.quiz_page(30 * scale, encrypted=False)),
+        ("questions_secret", decode.decode_questions_info, samples.quiz_page(30 * scale)),
+    ]
+
+
+def run_backend(backend: str, func, page: str):
+    decode.set_parser_backend(backend)
+    try:
+        return func(page)
+    finally:
+        decode.set_parser_backend("bs4")
+
+
+def check_parity(cases) -> None:
+    for name, func, page in cases:
+        expected = run_backend("bs4", func, page)
+        actual = run_backend("lxml", func, page)
+        assert expected == actual, f"{name}: bs4 与 lxml 解析结果不一致"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api.decode 解析后端对比")
+    parser.add_argument("--scale", type=int, default=1, help="页面规模倍数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数, 取最小值")
+    args = parser.parse_args()
+
+    cases = build_cases(args.scale)
+    check_parity(cases)
+
+    print(f"{'page':<18} {'KiB':>7} {'bs4 ms':>9} {'lxml ms':>9} {'speedup':>8}")
+    for name, func, page in cases:
+        timings = {}
+        for backend in decode.PARSER_BACKENDS:
+            timings[backend] = min(timeit.repeat(
+                lambda: run_backend(backend, func, page), number=1, repeat=args.repeat
+            ))
+        print(
+            f"{name:<18} {len(page.encode()) / 1024:7.1f} {timings['bs4'] * 1000:9.2f} "
+            f"{timings['lxml'] * 1000:9.2f} {timings['bs4'] / timings['lxml']:7.1f}x"
+        )
+    print("parity ok")
+
+
+if __name__ == "__main__":
+    main()
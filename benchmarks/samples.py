@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的示例页面生成器
+
+按超星页面的结构生成课程列表、二级课程文件夹、章节列表、任务点卡片和题目页面,
+所有ID、标题均为随机生成的占位数据。加密题目页面的字体用 fontTools 现场生成。
+"""
+import base64
+import json
+import random
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.misc.timeTools import timestampFromString
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+FONT_DATA_URL_PREFIX = "data:application/font-ttf;charset=utf-8;base64,"
+SAMPLE_FONT_TIMESTAMP = timestampFromString("Mon Jan  1 00:00:00 2024")
+SAMPLE_CHARS = "的一是了我不人在有这中大来上个国到说们为子和你地出道也时年"
+
+
+def make_font(chars: Iterable[str], seed: int = 0) -> str:
+    """生成包含指定字符字形的 TTF 字体, 返回 data URL"""
+    chars = list(dict.fromkeys(chars))
+    names = [".notdef"] + [f"uni{ord(c):04X}" for c in chars]
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({ord(c): f"uni{ord(c):04X}" for c in chars})
+    glyphs = {}
+    for i, name in enumerate(names):
+        pen = TTGlyphPen(None)
+        if i:
+            k = i * 7 + seed
+            pen.moveTo((k % 50, 0))
+            pen.lineTo((100 + k % 13, 700 - k % 29))
+            pen.qCurveTo((300, 800 + i), (500 + k % 11, 0))
+            pen.closePath()
+            pen.moveTo((10, 10))
+            pen.lineTo((20 + i, 30))
+            pen.lineTo((40, 5 + k % 3))
+            pen.closePath()
+        glyphs[name] = pen.glyph()
+    fb.setupGlyf(glyphs)
+    fb.setupHorizontalMetrics({name: (1000, 0) for name in names})
+    fb.setupHorizontalHeader(ascent=900, descent=-100)
+    fb.setupOS2()
+    fb.setupPost()
+    fb.setupNameTable({"familyName": "Sample", "styleName": "Regular"})
+    # 固定创建时间, 保证同样的输入生成完全相同的字体
+    fb.updateHead(created=SAMPLE_FONT_TIMESTAMP, modified=SAMPLE_FONT_TIMESTAMP)
+    buf = BytesIO()
+    fb.save(buf)
+    return FONT_DATA_URL_PREFIX + base64.b64encode(buf.getvalue()).decode()
+
+
+def random_words(rng: random.Random, size: int) -> str:
+    return "".join(rng.choice(SAMPLE_CHARS) for _ in range(size))
+
+
+def render_course_list(courses: List[Dict[str, Any]]) -> str:
+    """
+    渲染课程列表页面
+
+    每门课程包含 courseId、clazzId、cpi、title、teacher, 可选 desc、not_open,
+    以及仅影响显示文本的 title_text、desc_text、teacher_text
+    """
+    items = []
+    for i, course in enumerate(courses):
+        course_id, clazz_id = course["courseId"], course["clazzId"]
+        not_open = '<a class="not-open-tip">课程未开放</a>' if course.get("not_open") else ""
+        desc = ""
+        if course.get("desc"):
+            desc = f'<p class="margint10 line2" title="{course["desc"]}">{course.get("desc_text", course["desc"])}</p>'
+        items.append(f'''
+<div class="course clearfix learnCourse" id="course_{course_id}_{clazz_id}" info="{course_id}_{clazz_id}" roleid="3">
+  <input type="hidden" class="clazzId" value="{clazz_id}"/>
+  <input type="hidden" class="courseId" value="{course_id}"/>
+  <div class="course-cover">
+    <a href="https://mooc1.chaoxing.com/visit/stucoursemiddle?courseid={course_id}&clazzid={clazz_id}&cpi={course["cpi"]}&ismooc2=1" target="_blank"><img src="https://p.ananas.chaoxing.com/star3/{i}.png"/></a>
+    {not_open}
+  </div>
+  <div class="course-info">
+    <h3 class="inlineBlock"><a class="color1" href="javascript:void(0)"><span class="course-name overHidden2" title="{course["title"]}">{course.get("title_text", course["title"])}</span></a></h3>
+    {desc}
+    <p class="line2 color3" title="{course["teacher"]}">{course.get("teacher_text", course["teacher"])}</p>
+  </div>
+</div>''')
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"/><title>课程</title><script>var ServerHost = {{}};</script></head>
+<body><div class="course-list"><ul class="course-list" id="courseList">{"".join(items)}</ul></div></body></html>'''
+
+
+def course_list_page(courses: int = 50, seed: int = 0) -> str:
+    """课程列表页面, 约十分之一的课程未开放"""
+    rng = random.Random(seed)
+    course_list = []
+    for i in range(courses):
+        course = {
+            "courseId": 200000000 + rng.randrange(10 ** 8),
+            "clazzId": 80000000 + rng.randrange(10 ** 7),
+            "not_open": i % 10 == 9,
+        }
+        if i % 3:
+            course["desc"], course["desc_text"] = random_words(rng, 12), random_words(rng, 12)
+        course["cpi"] = rng.randrange(10 ** 9)
+        course["title"], course["title_text"] = random_words(rng, 8), random_words(rng, 8)
+        course["teacher"], course["teacher_text"] = random_words(rng, 3), random_words(rng, 3)
+        course_list.append(course)
+    return render_course_list(course_list)
+
+
+def render_course_folder(folders: List[Dict[str, Any]]) -> str:
+    """渲染二级课程文件夹列表页面, 每个文件夹包含 id、name, 可选 rename"""
+    items = ['<li class="file-item title-item">文件夹</li>']
+    for folder in folders:
+        items.append(f'''
+<li class="file-item" fileid="{folder["id"]}">
+  <span class="file-name">{folder["name"]}</span>
+  <input class="rename-input" type="text" value="{folder.get("rename", folder["name"])}"/>
+</li>''')
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"/></head>
+<body><ul class="file-list">{"".join(items)}</ul></body></html>'''
+
+
+def course_folder_page(folders: int = 10, seed: int = 0) -> str:
+    """二级课程文件夹列表页面"""
+    rng = random.Random(seed)
+    folder_list = []
+    for _ in range(folders):
+        folder_id = rng.randrange(10 ** 8)
+        folder_list.append({"id": folder_id, "name": random_words(rng, 4), "rename": random_words(rng, 4)})
+    return render_course_folder(folder_list)
+
+
+def render_course_point(units: List[Dict[str, Any]]) -> str:
+    """
+    渲染章节列表页面
+
+    每个章节单元包含 title、points, 可选 subtitle; 每个章节点包含 id、title 和 status,
+    status 为任务点数量(int)、"finished" 或 "locked"
+    """
+    unit_items = []
+    for c, unit in enumerate(units):
+        points = []
+        for p, point in enumerate(unit["points"]):
+            status = point["status"]
+            if status == "finished":
+                status_html = '<span class="bntHoverTips">已完成</span>'
+            elif status == "locked":
+                status_html = '<span class="bntHoverTips">该章节未解锁</span>'
+            else:
+                status_html = f'<input type="hidden" class="knowledgeJobCount" value="{status}"/>'
+            points.append(f'''
+    <li>
+      <div class="chapter_item" id="cur{point["id"]}" onclick="toOld('{point["id"]}')">
+        <div class="catalog_sbar">{c + 1}.{p + 1}</div>
+        <span class="catalog_points_yi">{status_html}</span>
+        <a class="clicktitle" href="javascript:void(0)">
+          {point["title"]}
+        </a>
+      </div>
+    </li>''')
+        unit_items.append(f'''
+<div class="chapter_unit">
+  <div class="catalog_name"><span class="catalog_sbar">{c + 1}</span>{unit["title"]}</div>
+  <div class="catalog_level"><ul>
+    <li><div class="chapter_item"><span>{unit.get("subtitle", unit["title"])}</span></div></li>{"".join(points)}
+  </ul></div>
+</div>''')
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"/></head>
+<body><div class="fanyaChapter"><div class="chapter_body">{"".join(unit_items)}</div></div></body></html>'''
+
+
+def course_point_page(chapters: int = 20, points_per_chapter: int = 10, seed: int = 0) -> str:
+    """章节列表页面, 包含已完成、待完成、待解锁的章节点"""
+    rng = random.Random(seed)
+    units = []
+    for _ in range(chapters):
+        points = []
+        for _ in range(points_per_chapter):
+            point_id = 500000000 + rng.randrange(10 ** 8)
+            state = rng.randrange(3)
+            status = rng.randint(1, 5) if state == 0 else ("finished" if state == 1 else "locked")
+            points.append({"id": point_id, "status": status, "title": random_words(rng, 10)})
+        units.append({"title": random_words(rng, 6), "subtitle": random_words(rng, 4), "points": points})
+    return render_course_point(units)
+
+
+def render_course_card(marg: Dict[str, Any], paragraphs: Iterable[str] = ()) -> str:
+    """渲染任务点卡片页面, marg 为页面脚本中 mArg 的内容"""
+    filler = "".join(f'<p class="ans-p">{text}</p>' for text in paragraphs)
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"/>
+<script type="text/javascript">
+    var mArg = "";
+    try {{
+        mArg = {json.dumps(marg, ensure_ascii=False)};
+    }} catch (e) {{
+        mArg = {{}};
+    }}
+</script></head>
+<body><div class="course_main">{filler}</div></body></html>'''
+
+
+def render_quiz(questions: List[Dict[str, Any]], form_fields: List[Tuple[str, Any]],
+                font_url: Optional[str] = None) -> str:
+    """
+    渲染章节测验页面
+
+    每道题包含 id、type(题型代码)、title、options(选项文本列表), 可选 tail(图片后的文本);
+    form_fields 为表单中的隐藏字段, font_url 不为空时附带 cxSecretStyle 加密字体
+    """
+    style = ""
+    if font_url:
+        style = (
+            "<style id='cxSecretStyle'>@font-face{font-family:'font-cxsecret';"
+            f"src:url('{font_url}') format('woff');}}</style>"
+        )
+    items = []
+    for i, question in enumerate(questions):
+        question_id, type_code = question["id"], question["type"]
+        options = "".join(
+            f'<li aria-label="{label} {text}" class="clearfix"><span class="num_option" data="{label}">{label}</span><a>{shown}</a></li>'
+            for label, (text, shown) in zip("ABCDEFGH", question["options"])
+        )
+        items.append(f'''
+<div class="TiMu newTiMu singleQuesId" data="{question_id}">
+  <div class="Zy_TItle clearfix" data="{type_code}">
+    <i class="fl">{i + 1}</i>
+    <div class="clearfix font-cxsecret fontLabel">【{type_code}】 {question["title"]} ⼈⼤<!-- {question_id} -->
+      <img src="https://p.ananas.chaoxing.com/star3/{question_id}.png"/> {question.get("tail", "")}
+    </div>
+  </div>
+  <div class="TiMu" data="{type_code}"></div>
+  <ul class="Zy_ulTop">{options}</ul>
+  <input type="hidden" name="answer{question_id}" value=""/>
+  <input type="hidden" name="answertype{question_id}" value="{type_code}"/>
+</div>''')
+    fields = "\n".join(f'<input type="hidden" name="{name}" value="{value}"/>' for name, value in form_fields)
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"/>{style}</head>
+<body><form id="submitForm" method="post">
+{fields}
+{"".join(items)}
+</form></body></html>'''
+
+
+def quiz_page(questions: int = 30, encrypted: bool = True, seed: int = 0) -> str:
+    """章节测验页面, encrypted 为 True 时附带 cxSecretStyle 加密字体"""
+    rng = random.Random(seed)
+    question_list = []
+    for _ in range(questions):
+        question = {"id": 200000000 + rng.randrange(10 ** 8), "type": str(rng.randrange(5))}
+        question["options"] = [
+            (random_words(rng, 6), random_words(rng, 6)) for _ in "ABCD"
+        ] if question["type"] in "01" else []
+        question["title"], question["tail"] = random_words(rng, 20), random_words(rng, 4)
+        question_list.append(question)
+    form_fields = [
+        ("courseId", rng.randrange(10 ** 9)),
+        ("classId", rng.randrange(10 ** 8)),
+        ("knowledgeid", rng.randrange(10 ** 9)),
+        ("workRelationId", rng.randrange(10 ** 8)),
+        ("enc_work", f"{rng.getrandbits(128):032x}"),
+        ("pyFlag", ""),
+    ]
+    return render_quiz(question_list, form_fields, make_font(SAMPLE_CHARS, seed) if encrypted else None)
+
+
+def course_card_page(cards: int = 8, seed: int = 0) -> str:
+    """任务点卡片页面, mArg 中包含视频、文档、作业和阅读任务"""
+    rng = random.Random(seed)
+    kinds = ["video", "document", "workid", "read"]
+    attachments = []
+    for i in range(cards):
+        kind = kinds[i % len(kinds)]
+        object_id = f"{rng.getrandbits(128):032x}"
+        attachment = {
+            "headOffset": 0,
+            "jobid": f"{rng.randrange(10 ** 13)}",
+            "isPassed": i % 5 == 4,
+            "job": kind != "read",
+            "type": kind,
+            "otherInfo": f"nodeId_{rng.randrange(10 ** 9)}-cpi_{rng.randrange(10 ** 9)}-rt_d-ds_0",
+            "mid": f"{rng.randrange(10 ** 16)}",
+            "objectId": object_id,
+            "aid": rng.randrange(10 ** 9),
+            "enc": f"{rng.getrandbits(128):032x}",
+            "jtoken": f"{rng.getrandbits(128):032x}",
+            "property": {
+                "name": f"{random_words(rng, 6)} 第 {i + 1} 讲.mp4",
+                "title": f"{random_words(rng, 6)} {random_words(rng, 4)}",
+                "id": f"{rng.randrange(10 ** 9)}",
+                "objectid": object_id,
+                "read": False,
+            },
+        }
+        attachments.append(attachment)
+    marg = {
+        "attachments": attachments,
+        "defaults": {
+            "ktoken": f"{rng.getrandbits(128):032x}",
+            "mtEnc": f"{rng.getrandbits(128):032x}",
+            "reportTimeInterval": 60,
+            "defenc": f"{rng.getrandbits(128):032x}",
+            "cardid": rng.randrange(10 ** 9),
+            "cpi": rng.randrange(10 ** 9),
+            "qnenc": f"{rng.getrandbits(128):032x}",
+            "knowledgeid": rng.randrange(10 ** 9),
+            "chapterCapture": "function () { return 1; }",
+        },
+        "control": True,
+    }
+    return render_course_card(marg, [random_words(rng, 40) for _ in range(200)])
@@ -156,11 +156,8 @@ def init_chaoxing(common_config, tiku_config):
     # tiku = tiku.get_tiku_from_config()  # 载入题库
     # tiku.init_tiku()  # 初始化题库
     
-    # 获取查询延迟设置
-    query_delay = tiku_config.get("delay", 0)
-    
     # 实例化超星API
-    chaoxing = Chaoxing(account=account,  query_delay=query_delay)
+    chaoxing = Chaoxing(account=account)
     
     return chaoxing
 
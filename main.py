@@ -1,25 +1,31 @@
 # -*- coding: utf-8 -*-
 import argparse
 import configparser
+import json
 import random
 import time
 import sys
 import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from urllib3 import disable_warnings, exceptions
 
 from api.logger import logger
 from api.base import Chaoxing, Account
 from api.exceptions import LoginError, InputFormatError, MaxRollBackExceeded
 from api.answer import Tiku
+from api.config import GlobalConst as gc
+from api.decode import PARSER_BACKENDS, set_parser_backend
+from api.metrics import MetricsReporter, request_metrics
 from api.notification import Notification
+from api.progress import JsonLinesSink, ProgressEvent, StdoutSink, progress
 
 # 关闭警告
 disable_warnings(exceptions.InsecureRequestWarning)
 
 
-def parse_args():
-    """解析命令行参数"""
+def parse_args(argv=None):
+    """解析命令行参数, argv为None时读取sys.argv"""
     parser = argparse.ArgumentParser(
         description="Samueli924/chaoxing",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -48,13 +54,41 @@ def parse_args():
         choices=["retry", "ask", "continue"],
         help="遇到关闭任务点时的行为: retry-重试, ask-询问, continue-继续"
     )
+    parser.add_argument(
+        "--prefetch", type=int, default=0,
+        help="处理当前章节时预先获取后续多少个章节的任务点 (默认0, 不预取)"
+    )
+    parser.add_argument(
+        "--base-url", type=str, default=None,
+        help="超星接口地址, 用于连接本地模拟服务器 (默认使用官方地址)"
+    )
+    parser.add_argument(
+        "--metrics-file", type=str, default=None,
+        help="按接口统计的HTTP请求JSON输出文件 (默认只在结束时输出到日志)"
+    )
+    parser.add_argument(
+        "--metrics-interval", type=float, default=0,
+        help="运行过程中每隔多少秒刷新一次统计文件 (默认0, 只在结束时写入)"
+    )
+    parser.add_argument(
+        "--progress-file", type=str, default=None,
+        help="将结构化的学习进度事件逐行以JSON追加写入该文件"
+    )
+    parser.add_argument(
+        "--progress-stdout", action="store_true",
+        help="将学习进度事件以 @progress 开头的JSON行输出到标准输出, 供任务服务读取"
+    )
+    parser.add_argument(
+        "--parser", type=str, default="bs4", choices=list(PARSER_BACKENDS),
+        help="页面解析后端: bs4-BeautifulSoup (默认), lxml-lxml XPath (更快)"
+    )
 
     # 在解析之前捕获 -h 的行为
-    if len(sys.argv) == 2 and sys.argv[1] in {"-h", "--help"}:
+    if argv is None and len(sys.argv) == 2 and sys.argv[1] in {"-h", "--help"}:
         parser.print_help()
         sys.exit(0)
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def load_config_from_file(config_path):
@@ -78,6 +112,15 @@ def load_config_from_file(config_path):
         # 处理notopen_action，设置默认值为retry
         if "notopen_action" not in common_config:
             common_config["notopen_action"] = "retry"
+        # 处理prefetch_chapters，将字符串转换为整数
+        if "prefetch_chapters" in common_config:
+            common_config["prefetch_chapters"] = int(common_config["prefetch_chapters"] or 0)
+        # 处理metrics_interval，将字符串转换为浮点数
+        if "metrics_interval" in common_config:
+            common_config["metrics_interval"] = float(common_config["metrics_interval"] or 0)
+        # 处理progress_stdout，将字符串转换为布尔值
+        if "progress_stdout" in common_config:
+            common_config["progress_stdout"] = common_config["progress_stdout"] == "true"
     
     # 检查并读取tiku节
     if config.has_section("tiku"):
@@ -101,7 +144,14 @@ def build_config_from_args(args):
         "password": args.password,
         "course_list": args.list.split(",") if args.list else None,
         "speed": args.speed if args.speed else 1.0,
-        "notopen_action": args.notopen_action if args.notopen_action else "retry"
+        "notopen_action": args.notopen_action if args.notopen_action else "retry",
+        "prefetch_chapters": args.prefetch,
+        "parser_backend": args.parser,
+        "base_url": args.base_url,
+        "metrics_file": args.metrics_file,
+        "metrics_interval": args.metrics_interval,
+        "progress_file": args.progress_file,
+        "progress_stdout": args.progress_stdout,
     }
     return common_config, {}, {}
 
@@ -136,6 +186,56 @@ class RollBackManager:
             self.rollback_times = 0
 
 
+class ChapterPrefetcher:
+    """章节任务点预取器，在处理当前章节时后台获取后续章节的任务点列表"""
+    def __init__(self, chaoxing, course, points, depth: int):
+        self.chaoxing = chaoxing
+        self.course = course
+        self.points = points
+        self.depth = max(0, depth)
+        self._futures = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.depth) if self.depth else None
+
+    def _fetch(self, point):
+        return self.chaoxing.get_job_list(
+            self.course["clazzId"], self.course["courseId"], self.course["cpi"], point["id"]
+        )
+
+    def schedule(self, index: int):
+        """为当前章节之后的depth个未完成章节提交预取任务"""
+        if not self._executor:
+            return
+        for point in self.points[index + 1:index + 1 + self.depth]:
+            if point["has_finished"] or point["id"] in self._futures:
+                continue
+            logger.debug(f"预取章节任务点: {point['title']}")
+            self._futures[point["id"]] = self._executor.submit(self._fetch, point)
+
+    def get(self, point):
+        """获取章节任务点列表，优先使用预取结果"""
+        future = self._futures.pop(point["id"], None)
+        if future is not None:
+            try:
+                jobs, job_info = future.result()
+                # 预取时章节可能尚未解锁，上一章节完成后需要重新获取
+                if not job_info.get("notOpen", False):
+                    return jobs, job_info
+            except Exception as e:
+                logger.warning(f"预取章节任务点失败, 将重新获取: {e}")
+        return self._fetch(point)
+
+    def invalidate(self):
+        """发生回滚时丢弃所有预取结果"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def close(self):
+        self.invalidate()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+
 def init_chaoxing(common_config, tiku_config):
     """初始化超星实例"""
     username = common_config.get("username", "")
@@ -156,11 +256,8 @@ def init_chaoxing(common_config, tiku_config):
     tiku = tiku.get_tiku_from_config()  # 载入题库
     tiku.init_tiku()  # 初始化题库
     
-    # 获取查询延迟设置
-    query_delay = tiku_config.get("delay", 0)
-    
-    # 实例化超星API
-    chaoxing = Chaoxing(account=account, tiku=tiku, query_delay=query_delay)
+    # 实例化超星API, 答题查询的间隔由题库的 rate_limiter 控制
+    chaoxing = Chaoxing(account=account, tiku=tiku, base_url=common_config.get("base_url"))
     
     return chaoxing
 
@@ -203,6 +300,11 @@ def handle_not_open_chapter(notopen_action, point, tiku, RB, auto_skip_notopen=F
 
 def process_job(chaoxing, course, job, job_info, speed):
     """处理单个任务点"""
+    progress.emit(
+        ProgressEvent.JOB_START, course_id=course["courseId"], job_id=job["jobid"],
+        job_type=job["type"], name=job.get("name", "")
+    )
+    result = None
     # 视频任务
     if job["type"] == "video":
         logger.trace(f"识别到视频任务, 任务章节: {course['title']} 任务ID: {job['jobid']}")
@@ -218,21 +320,26 @@ def process_job(chaoxing, course, job, job_info, speed):
             logger.warning(
                 f"出现异常任务 -> 任务章节: {course['title']} 任务ID: {job['jobid']}, 已跳过"
             )
+        result = video_result
     # 文档任务
     elif job["type"] == "document":
         logger.trace(f"识别到文档任务, 任务章节: {course['title']} 任务ID: {job['jobid']}")
-        chaoxing.study_document(course, job)
+        result = chaoxing.study_document(course, job)
     # 测验任务
     elif job["type"] == "workid":
         logger.trace(f"识别到章节检测任务, 任务章节: {course['title']}")
-        chaoxing.study_work(course, job, job_info)
+        result = chaoxing.study_work(course, job, job_info)
     # 阅读任务
     elif job["type"] == "read":
         logger.trace(f"识别到阅读任务, 任务章节: {course['title']}")
-        chaoxing.strdy_read(course, job, job_info)
+        result = chaoxing.strdy_read(course, job, job_info)
+    progress.emit(
+        ProgressEvent.JOB_DONE, job_id=job["jobid"], job_type=job["type"],
+        status=result.name.lower() if isinstance(result, chaoxing.StudyResult) else "skipped"
+    )
 
 
-def process_chapter(chaoxing, course, point, RB, notopen_action, speed, auto_skip_notopen=False):
+def process_chapter(chaoxing, course, point, RB, notopen_action, speed, auto_skip_notopen=False, prefetcher=None):
     """处理单个章节"""
     logger.info(f'当前章节: {point["title"]}')
     
@@ -248,9 +355,12 @@ def process_chapter(chaoxing, course, point, RB, notopen_action, speed, auto_ski
     # 获取当前章节的所有任务点
     jobs = []
     job_info = None
-    jobs, job_info = chaoxing.get_job_list(
-        course["clazzId"], course["courseId"], course["cpi"], point["id"]
-    )
+    if prefetcher:
+        jobs, job_info = prefetcher.get(point)
+    else:
+        jobs, job_info = chaoxing.get_job_list(
+            course["clazzId"], course["courseId"], course["cpi"], point["id"]
+        )
 
     # 发现未开放章节, 根据配置处理
     try:
@@ -289,7 +399,7 @@ def process_chapter(chaoxing, course, point, RB, notopen_action, speed, auto_ski
     return 1, auto_skip_notopen  # 继续下一章节
 
 
-def process_course(chaoxing, course, notopen_action, speed):
+def process_course(chaoxing, course, notopen_action, speed, prefetch_chapters=0):
     """处理单个课程"""
     logger.info(f"开始学习课程: {course['title']}")
     
@@ -304,21 +414,36 @@ def process_course(chaoxing, course, notopen_action, speed):
     auto_skip_notopen = False
     # 初始化回滚管理器
     RB = RollBackManager()
+    # 初始化章节预取器
+    prefetcher = ChapterPrefetcher(chaoxing, course, point_list["points"], prefetch_chapters)
+    status = "completed"
     
-    while __point_index < len(point_list["points"]):
-        point = point_list["points"][__point_index]
-        logger.debug(f"当前章节 __point_index: {__point_index}")
-        
-        result, auto_skip_notopen = process_chapter(
-            chaoxing, course, point, RB, notopen_action, speed, auto_skip_notopen
-        )
-        
-        if result == -1:  # 退出当前课程
-            break
-        elif result == 0:  # 重试前一章节
-            __point_index -= 1  # 默认第一个任务总是开放的
-        else:  # 继续下一章节
-            __point_index += 1
+    try:
+        while __point_index < len(point_list["points"]):
+            point = point_list["points"][__point_index]
+            logger.debug(f"当前章节 __point_index: {__point_index}")
+            prefetcher.schedule(__point_index)
+            progress.emit(
+                ProgressEvent.CHAPTER_START, course_id=course["courseId"], chapter_id=point["id"],
+                title=point["title"], index=__point_index + 1, total=len(point_list["points"]),
+                finished=point["has_finished"]
+            )
+            
+            result, auto_skip_notopen = process_chapter(
+                chaoxing, course, point, RB, notopen_action, speed, auto_skip_notopen, prefetcher
+            )
+            
+            if result == -1:  # 退出当前课程
+                status = "stopped"
+                break
+            elif result == 0:  # 重试前一章节
+                __point_index -= 1  # 默认第一个任务总是开放的
+                prefetcher.invalidate()  # 回滚后预取结果可能已过期
+            else:  # 继续下一章节
+                __point_index += 1
+    finally:
+        prefetcher.close()
+    progress.emit(ProgressEvent.COURSE_DONE, course_id=course["courseId"], title=course["title"], status=status)
 
 
 def filter_courses(all_course, course_list):
@@ -354,15 +479,85 @@ def filter_courses(all_course, course_list):
         return course_task
 
 
-def main():
-    """主程序入口"""
+def init_metrics_reporter(common_config):
+    """根据配置启动请求统计文件的定期写入, 未配置metrics_file时返回None"""
+    metrics_file = common_config.get("metrics_file")
+    if not metrics_file:
+        return None
+    reporter = MetricsReporter(metrics_file, common_config.get("metrics_interval", 0))
+    reporter.start()
+    return reporter
+
+
+def report_metrics(reporter):
+    """输出请求统计, 配置了metrics_file时同时写入JSON文件"""
+    request_metrics.log_summary()
+    if reporter is None:
+        logger.debug(f"HTTP请求统计详情: {json.dumps(request_metrics.summary(), ensure_ascii=False)}")
+        return
+    try:
+        reporter.stop()
+        logger.info(f"HTTP请求统计已写入 {reporter.path}")
+    except OSError as e:
+        logger.warning(f"写入请求统计文件失败: {e}")
+
+
+def init_progress_sinks(common_config):
+    """根据配置注册学习进度事件的输出端, 返回注册的输出端, 结束时由 close_progress_sinks 移除"""
+    sinks = []
+    if common_config.get("progress_stdout"):
+        sinks.append(progress.add_sink(StdoutSink()))
+    if common_config.get("progress_file"):
+        try:
+            sinks.append(progress.add_sink(JsonLinesSink(common_config["progress_file"])))
+        except OSError as e:
+            logger.warning(f"打开进度事件文件失败: {e}")
+    return sinks
+
+
+def close_progress_sinks(sinks):
+    for sink in sinks:
+        progress.remove_sink(sink)
+
+
+def release_chaoxing(chaoxing):
+    """释放本次运行创建的题库缓存、连接池和会话, 任务服务的工作进程会在同一进程内多次运行 main"""
+    if chaoxing is None:
+        return
+    try:
+        if chaoxing.tiku is not None:
+            chaoxing.tiku.close()
+    finally:
+        chaoxing.session_manager.close()
+
+
+def main(config=None):
+    """
+    主程序入口
+
+    Args:
+        config: (common_config, tiku_config, notification_config), 为None时从命令行参数或配置文件读取,
+            任务服务的工作进程通过该参数在同一进程内重复运行
+    """
+    metrics_reporter = None
+    progress_sinks = []
+    chaoxing = None
+    # cookies_path 会修改全局配置, 结束时恢复, 避免影响工作进程中之后的任务
+    cookies_path = gc.COOKIES_PATH
     try:
         # 初始化配置
-        common_config, tiku_config, notification_config = init_config()
+        common_config, tiku_config, notification_config = config or init_config()
+        request_metrics.reset()
         
         # 规范化播放速度
         speed = min(2.0, max(1.0, common_config.get("speed", 1.0)))
         notopen_action = common_config.get("notopen_action", "retry")
+        prefetch_chapters = common_config.get("prefetch_chapters", 0)
+        set_parser_backend(common_config.get("parser_backend", "bs4"))
+        if common_config.get("cookies_path"):
+            gc.COOKIES_PATH = common_config["cookies_path"]
+        metrics_reporter = init_metrics_reporter(common_config)
+        progress_sinks = init_progress_sinks(common_config)
         
         # 初始化超星实例
         chaoxing = init_chaoxing(common_config, tiku_config)
@@ -386,10 +581,16 @@ def main():
         
         # 开始学习
         logger.info(f"课程列表过滤完毕, 当前课程任务数量: {len(course_task)}")
-        for course in course_task:
-            process_course(chaoxing, course, notopen_action, speed)
+        for index, course in enumerate(course_task, 1):
+            progress.emit(
+                ProgressEvent.COURSE_START, course_id=course["courseId"], title=course["title"],
+                index=index, total=len(course_task)
+            )
+            process_course(chaoxing, course, notopen_action, speed, prefetch_chapters)
         
         logger.info("所有课程学习任务已完成")
+        logger.info(f"运行统计: 共创建HTTP会话 {chaoxing.session_manager.created} 个")
+        logger.debug(f"答案内存缓存统计: {Tiku.memory_cache.stats()}")
         notification.send("chaoxing : 所有课程学习任务已完成")
         
     except SystemExit as e:
@@ -406,6 +607,12 @@ def main():
         except Exception:
             pass  # 如果通知发送失败，忽略异常
         raise e
+    finally:
+        # 无论是否正常结束都输出请求统计, 便于定位耗时最多的接口
+        report_metrics(metrics_reporter)
+        close_progress_sinks(progress_sinks)
+        release_chaoxing(chaoxing)
+        gc.COOKIES_PATH = cookies_path
 
 
 if __name__ == "__main__":
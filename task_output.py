@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+任务输出的环形缓冲区
+
+内存中只保留最近 max_lines 行, 每行按写入顺序编号(从0开始), 轮询方通过 since 游标只获取新行,
+推送方通过 wait 阻塞等待新行; 指定日志文件时所有输出同时追加写入文件, 游标早于内存窗口时从文件补齐。
+"""
+import os
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+
+
+class OutputBuffer:
+    """
+    有界的任务输出缓冲区
+    """
+
+    def __init__(self, max_lines: int = 1000, log_path: Optional[str] = None) -> None:
+        self.max_lines = max(1, max_lines)
+        self.log_path = log_path
+        self._lines = deque(maxlen=self.max_lines)
+        self._total = 0  # 已写入的总行数, 即下一行的编号
+        self._file = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def __len__(self) -> int:
+        return self._total
+
+    @property
+    def first_offset(self) -> int:
+        """内存中最早一行的编号"""
+        return self._total - len(self._lines)
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line)
+            self._total += 1
+            self._changed.notify_all()
+            if self.log_path:
+                try:
+                    if self._file is None:
+                        # 固定使用 \n 换行, 行号与文件中的行一一对应
+                        self._file = open(self.log_path, "a", encoding="utf-8", newline="\n", buffering=1)
+                    self._file.write(line + "\n")
+                except OSError as e:
+                    print(f"写入任务日志失败 {self.log_path}: {e}")
+                    self.log_path = None
+
+    def read(self, since: Optional[int] = None, limit: Optional[int] = None) -> dict:
+        """
+        读取编号不小于 since 的输出
+
+        Args:
+            since: 起始编号, 为None时返回内存中保留的全部输出
+            limit: 最多返回的行数, 不超过 max_lines
+
+        Returns:
+            offset: 返回的第一行的编号
+            lines: 输出行
+            next: 下次轮询使用的 since
+            total: 已写入的总行数
+            dropped: 已从内存和日志中丢失、无法返回的行数
+        """
+        limit = min(limit or self.max_lines, self.max_lines)
+        with self._lock:
+            total = self._total
+            first = total - len(self._lines)
+            since = first if since is None else max(0, min(since, total))
+            if since >= first:
+                start = since - first
+                lines = list(islice(self._lines, start, start + limit))
+                return self._result(since, lines, total, 0)
+            # 游标早于内存窗口, 先从日志文件读取被挤出的部分
+            memory = list(islice(self._lines, 0, limit))
+            log_path = self.log_path
+        lines = self._read_log(log_path, since, min(first, since + limit)) if log_path else []
+        if len(lines) != min(first, since + limit) - since:
+            # 没有日志文件或日志不完整, 从内存窗口开始返回
+            return self._result(first, memory, total, first - since)
+        lines.extend(memory[:limit - len(lines)])
+        return self._result(since, lines, total, 0)
+
+    def wait(self, since: int, timeout: float) -> bool:
+        """
+        等待编号不小于 since 的新行, 有新行、调用 wake 或超时后返回
+
+        Returns:
+            是否有新行
+        """
+        with self._changed:
+            if self._total <= since:
+                self._changed.wait(timeout)
+            return self._total > since
+
+    def wake(self) -> None:
+        """唤醒所有等待中的读取方, 例如任务结束时"""
+        with self._changed:
+            self._changed.notify_all()
+
+    @staticmethod
+    def _result(offset: int, lines: List[str], total: int, dropped: int) -> dict:
+        return {"offset": offset, "lines": lines, "next": offset + len(lines), "total": total, "dropped": dropped}
+
+    @staticmethod
+    def _read_log(path: str, start: int, stop: int) -> List[str]:
+        if not os.path.isfile(path):
+            return []
+        with open(path, "r", encoding="utf-8", newline="\n") as fp:
+            return [line.rstrip("\n") for line in islice(fp, start, stop)]
+
+    def tail(self, count: Optional[int] = None) -> List[str]:
+        """内存中最后 count 行, 为None时返回全部"""
+        with self._lock:
+            if count is None or count >= len(self._lines):
+                return list(self._lines)
+            return list(islice(self._lines, len(self._lines) - count, None))
+
+    def close(self) -> None:
+        """关闭日志文件并唤醒等待中的读取方, 之后仍可追加, 会重新打开文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._changed.notify_all()
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+任务服务的常驻工作进程池
+
+每个工作进程启动时导入一次 main 及 api.* 并预热字体映射表, 之后循环接收任务参数,
+在进程内调用 main.main 执行学习任务, 省去每个任务启动解释器和重新导入依赖的开销。
+
+- 任务的 stdout/stderr 和日志按行回传给服务进程, 行的划分与子进程模式读取管道一致
+- 学习进度事件通过 api.progress 的回调输出端直接回传, 不经过文本输出
+- 每个工作进程使用独立的管道通信, 停止任务时终止对应的工作进程并补充新进程,
+  不影响其他任务; 工作进程收到 SIGTERM 后先执行 main 的清理(刷新答案缓存等)再退出
+- 工作进程意外退出时, 其正在执行的任务以进程退出码结束
+"""
+import io
+import itertools
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from collections import deque
+from multiprocessing.connection import wait
+
+
+class TaskHandler:
+    """
+    任务事件回调, 由任务服务实现, 在进程池的收集线程中调用
+    """
+
+    def on_start(self, task_id: str, pid: int) -> None:
+        pass
+
+    def on_output(self, task_id: str, line: str) -> None:
+        pass
+
+    def on_progress(self, task_id: str, event: dict) -> None:
+        pass
+
+    def on_done(self, task_id: str, returncode: int, error: str) -> None:
+        pass
+
+
+def task_argv(username, password, list_id) -> list:
+    """/api/run 的参数对应的 main.py 命令行参数, 与子进程模式执行的命令一致"""
+    return ["-u", str(username), "-p", str(password), "-l", str(list_id)]
+
+
+class _PipeWriter(io.TextIOBase):
+    """
+    替换工作进程的 stdout/stderr, 按行将输出发送给服务进程
+
+    与子进程模式的 universal newlines 读取一致, \\r 和 \\n 都视为换行, 空行被丢弃
+    """
+
+    def __init__(self, conn, lock: threading.Lock) -> None:
+        self._conn = conn
+        self._lock = lock
+        self._buffer = ""
+        self.task_id = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            lines = (self._buffer + text).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            self._buffer = lines.pop()
+            for line in lines:
+                self._send(line)
+        return len(text)
+
+    def finish(self) -> None:
+        """任务结束时发送最后一行未换行的输出"""
+        with self._lock:
+            self._send(self._buffer)
+            self._buffer = ""
+
+    def _send(self, line: str) -> None:
+        line = line.strip()
+        if line and self.task_id is not None:
+            self._conn.send(("output", self.task_id, line))
+
+    def send_progress(self, event) -> None:
+        """api.progress 的回调, 将进度事件发送给服务进程"""
+        with self._lock:
+            if self.task_id is not None:
+                self._conn.send(("progress", self.task_id, event.to_dict()))
+
+
+def _warm_up() -> None:
+    """导入学习任务依赖的模块并加载字体映射表"""
+    from api.cxsecret_font import fonthash_dao
+    # 映射表在首次查询时加载, 用空哈希查询一次即可
+    fonthash_dao.find_char("")
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    # 转为 SystemExit, 使 main 的 finally 释放资源, 例如将缓冲的答案写入缓存
+    raise SystemExit(128 + signum)
+
+
+def _worker_main(conn) -> None:
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    import main as entry
+    from api.logger import logger
+    from api.progress import CallbackSink, progress
+
+    _warm_up()
+    lock = threading.Lock()
+    writer = _PipeWriter(conn, lock)
+    sys.stdout = sys.stderr = writer
+    # loguru 的默认输出绑定了启动时的 stderr, 改为写入当前的 sys.stderr
+    try:
+        logger.remove(0)
+    except ValueError:
+        pass
+    logger.add(lambda message: sys.stderr.write(message), level="DEBUG", colorize=False)
+    progress.add_sink(CallbackSink(writer.send_progress))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        task_id, argv = task
+        writer.task_id = task_id
+        # 服务进程没有交互终端, 需要输入时直接失败
+        sys.stdin = io.StringIO()
+        with lock:
+            conn.send(("start", task_id, os.getpid()))
+        returncode, error = 0, ""
+        try:
+            entry.main(entry.build_config_from_args(entry.parse_args(argv)))
+        except SystemExit as e:
+            if e.code == 128 + signal.SIGTERM:
+                raise  # 任务被停止, 工作进程退出
+            if isinstance(e.code, int):
+                returncode = e.code
+            elif e.code is not None:
+                returncode, error = 1, str(e.code)
+        except BaseException as e:
+            # main 已将异常和堆栈写入日志
+            returncode, error = 1, f"{type(e).__name__}: {e}"
+        writer.finish()
+        writer.task_id = None
+        with lock:
+            conn.send(("done", task_id, returncode, error))
+
+
+class _Worker:
+    def __init__(self, worker_id: int, process, conn) -> None:
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.task_id = None
+
+
+class WorkerPool:
+    """
+    固定数量的常驻工作进程, 任务按提交顺序分配给空闲的工作进程
+    """
+
+    def __init__(self, size: int, handler: TaskHandler) -> None:
+        self.size = max(1, size)
+        self.handler = handler
+        # 服务进程是多线程的 Flask 应用, 使用 spawn 避免 fork 时复制其他线程持有的锁
+        self._ctx = multiprocessing.get_context("spawn")
+        self._ids = itertools.count(1)
+        self._workers = {}  # worker_id -> _Worker
+        self._pending = deque()  # (task_id, argv)
+        self._retired = []  # 已取消任务的工作进程, 由收集线程关闭其管道
+        self._lock = threading.Lock()
+        self._collector = None
+        self._closed = False
+
+    def start(self) -> None:
+        with self._lock:
+            for _ in range(self.size):
+                self._spawn()
+        self._collector = threading.Thread(target=self._collect, name="worker-pool", daemon=True)
+        self._collector.start()
+
+    def _spawn(self) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(next(self._ids), process, parent_conn)
+        self._workers[worker.worker_id] = worker
+
+    def submit(self, task_id: str, argv: list) -> None:
+        with self._lock:
+            self._pending.append((task_id, argv))
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        for worker in self._workers.values():
+            if not self._pending:
+                break
+            if worker.task_id is None:
+                task_id, argv = self._pending.popleft()
+                worker.task_id = task_id
+                worker.conn.send((task_id, argv))
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        取消任务, 等待中的任务直接移除, 执行中的任务终止其工作进程并补充新的工作进程
+
+        Returns:
+            任务是否由进程池取消
+        """
+        with self._lock:
+            for item in self._pending:
+                if item[0] == task_id:
+                    self._pending.remove(item)
+                    return True
+            worker = next((w for w in self._workers.values() if w.task_id == task_id), None)
+            if worker is None:
+                return False
+            del self._workers[worker.worker_id]
+            worker.process.terminate()
+            self._spawn()
+            self._dispatch()
+        worker.process.join(5)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        # 收集线程可能正在 wait 该管道, 交给它在下一轮开始时关闭
+        with self._lock:
+            self._retired.append(worker)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "busy": sum(1 for w in self._workers.values() if w.task_id is not None),
+                "pending": len(self._pending),
+            }
+
+    def _collect(self) -> None:
+        while not self._closed:
+            with self._lock:
+                workers = list(self._workers.values())
+                retired, self._retired = self._retired, []
+            for worker in retired:
+                worker.conn.close()
+            waitables = {}
+            for worker in workers:
+                waitables[worker.conn] = worker
+                waitables[worker.process.sentinel] = worker
+            for ready in wait(list(waitables), timeout=0.5):
+                worker = waitables[ready]
+                self._drain(worker)
+                if ready is not worker.conn:
+                    self._reap(worker)
+
+    def _drain(self, worker: _Worker) -> None:
+        try:
+            while worker.conn.poll():
+                self._handle(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+
+    def _handle(self, worker: _Worker, event: tuple) -> None:
+        kind, task_id = event[0], event[1]
+        with self._lock:
+            # 已取消的任务或已被替换的工作进程发来的事件直接丢弃
+            if self._workers.get(worker.worker_id) is not worker or worker.task_id != task_id:
+                return
+            if kind == "done":
+                worker.task_id = None
+                self._dispatch()
+        if kind == "start":
+            self.handler.on_start(task_id, event[2])
+        elif kind == "output":
+            self.handler.on_output(task_id, event[2])
+        elif kind == "progress":
+            self.handler.on_progress(task_id, event[2])
+        elif kind == "done":
+            self.handler.on_done(task_id, event[2], event[3])
+
+    def _reap(self, worker: _Worker) -> None:
+        """工作进程意外退出, 结束其任务并补充新的工作进程"""
+        with self._lock:
+            if self._workers.get(worker.worker_id) is not worker:
+                return
+            del self._workers[worker.worker_id]
+            task_id = worker.task_id
+            if not self._closed:
+                self._spawn()
+                self._dispatch()
+        worker.process.join()
+        worker.conn.close()
+        if task_id is not None:
+            exitcode = worker.process.exitcode
+            self.handler.on_done(task_id, exitcode if exitcode is not None else -1, f"工作进程异常退出, 退出码: {exitcode}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+            self._workers.clear()
+            self._pending.clear()
+            retired, self._retired = self._retired, []
+        for worker in retired:
+            worker.conn.close()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+任务服务的准入控制
+
+限制同时执行的任务数量, 超出的任务进入有界队列按提交顺序等待, 队列已满时拒绝提交;
+同一用户名在排队或执行期间只允许存在一个任务。
+"""
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+    pass
+
+
+class DuplicateTaskError(Exception):
+    """同一用户名已有排队或执行中的任务"""
+
+    def __init__(self, task_id: str) -> None:
+        super().__init__(f"已有未完成的任务: {task_id}")
+        self.task_id = task_id
+
+
+class TaskScheduler:
+    """
+    有界任务队列和并发限制
+
+    submit 传入的 start 回调在获得执行名额时调用, 应尽快返回(例如启动线程或提交给工作进程),
+    任务结束后必须调用 finish 释放名额, finish 会在调用方线程中启动下一个排队的任务
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 20) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self._running = {}  # task_id -> key
+        self._queue = deque()  # (task_id, key, start)
+        self._keys = {}  # key -> task_id
+        self._lock = threading.Lock()
+
+    def submit(self, task_id: str, key: str, start: Callable[[], None]) -> int:
+        """
+        提交任务
+
+        Args:
+            task_id: 任务ID
+            key: 去重键, 一般为用户名
+            start: 获得执行名额时调用的回调
+
+        Returns:
+            0 表示已开始执行, 大于0表示在队列中的位置(从1开始)
+
+        Raises:
+            DuplicateTaskError: 同一去重键已有未完成的任务
+            QueueFullError: 执行名额已满且队列已满
+        """
+        with self._lock:
+            if key in self._keys:
+                raise DuplicateTaskError(self._keys[key])
+            if len(self._running) < self.max_concurrent and not self._queue:
+                self._running[task_id] = key
+                position = 0
+            elif len(self._queue) < self.max_queue:
+                self._queue.append((task_id, key, start))
+                position = len(self._queue)
+            else:
+                raise QueueFullError(f"任务队列已满({self.max_queue}), 请稍后再试")
+            self._keys[key] = task_id
+        if position == 0:
+            self._start(task_id, start)
+        return position
+
+    def _start(self, task_id: str, start: Callable[[], None]) -> None:
+        try:
+            start()
+        except Exception as e:
+            print(f"任务启动失败，任务ID: {task_id}: {e}")
+            self.finish(task_id)
+
+    def finish(self, task_id: str) -> None:
+        """任务结束, 释放执行名额并启动排队的任务, 重复调用无影响"""
+        with self._lock:
+            key = self._running.pop(task_id, None)
+            if key is None:
+                return
+            self._release_key(key, task_id)
+            ready = []
+            while self._queue and len(self._running) < self.max_concurrent:
+                next_id, next_key, start = self._queue.popleft()
+                self._running[next_id] = next_key
+                ready.append((next_id, start))
+        for next_id, start in ready:
+            self._start(next_id, start)
+
+    def cancel(self, task_id: str) -> bool:
+        """从队列中移除尚未开始的任务, 返回任务是否在队列中"""
+        with self._lock:
+            for item in self._queue:
+                if item[0] == task_id:
+                    self._queue.remove(item)
+                    self._release_key(item[1], task_id)
+                    return True
+        return False
+
+    def _release_key(self, key: str, task_id: str) -> None:
+        if self._keys.get(key) == task_id:
+            del self._keys[key]
+
+    def position(self, task_id: str) -> Optional[int]:
+        """0 表示执行中, 大于0表示在队列中的位置, None 表示任务已结束或不存在"""
+        with self._lock:
+            if task_id in self._running:
+                return 0
+            for index, item in enumerate(self._queue, 1):
+                if item[0] == task_id:
+                    return index
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+            }
@@ -3,101 +3,214 @@ import requests
 import time
 import json
 
+# 推送连接的读取超时, 服务端每15秒发送一次保活注释
+STREAM_READ_TIMEOUT = 60
+# 长轮询每次最长等待时间（秒）
+LONG_POLL_WAIT = 25
+
+
+def iter_sse(response):
+    """
+    解析 Server-Sent Events 响应
+
+    Yields:
+        (event, data, event_id), data 为解析后的 JSON
+    """
+    event, event_id, data_lines = "message", None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            # 空行表示一个事件结束
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines)), event_id
+            event, event_id, data_lines = "message", None, []
+        elif line.startswith(":"):
+            continue  # 保活注释
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "id":
+                event_id = value
+            elif field == "data":
+                data_lines.append(value)
+
+
+def poll_task_events(host, task_id, since=0, poll_interval=2):
+    """
+    服务端不支持推送时, 通过 /api/output 的 since 游标轮询, 生成与推送接口相同的事件
+    """
+    cursor = since
+    while True:
+        output_response = requests.get(
+            f"{host}/api/output/{task_id}",
+            params={"since": cursor, "wait": LONG_POLL_WAIT},
+            timeout=LONG_POLL_WAIT + 10
+        )
+        if output_response.status_code != 200:
+            raise RuntimeError(f"获取输出失败: {output_response.text}")
+        output_data = output_response.json()
+        lines = output_data.get("output", [])
+        if lines:
+            yield "output", {
+                "offset": output_data.get("offset", cursor),
+                "lines": lines,
+                "dropped": output_data.get("dropped", 0)
+            }
+        cursor = output_data.get("next", cursor + len(lines))
+
+        status_response = requests.get(f"{host}/api/status/{task_id}")
+        if status_response.status_code != 200:
+            raise RuntimeError(f"获取状态失败: {status_response.text}")
+        status_data = status_response.json()
+        if not status_data.get("running", False) and cursor >= status_data.get("line_count", cursor):
+            error_info = status_data.get("last_error")
+            yield "done", {
+                "success": error_info is None,
+                "stderr": (error_info or {}).get("stderr", "")
+            }
+            return
+        # 旧版服务端不支持 wait 参数, 没有新输出时按间隔轮询
+        if not lines:
+            time.sleep(poll_interval)
+
+
+def stream_task_events(host, task_id, poll_interval=2):
+    """
+    获取任务的进度事件, 优先使用 /api/stream 推送, 断线后从上次的位置重连,
+    服务端不支持推送时退回轮询
+
+    Yields:
+        (event, data), event 为 status / progress / output / done
+    """
+    cursor = 0
+    while True:
+        try:
+            with requests.get(
+                f"{host}/api/stream/{task_id}",
+                headers={"Accept": "text/event-stream", "Last-Event-ID": str(cursor)},
+                stream=True,
+                timeout=(10, STREAM_READ_TIMEOUT)
+            ) as response:
+                if response.status_code == 404:
+                    if response.headers.get("Content-Type", "").startswith("application/json"):
+                        raise RuntimeError(response.json().get("message", "任务ID不存在"))
+                    # 旧版服务端没有推送接口
+                    yield from poll_task_events(host, task_id, cursor, poll_interval)
+                    return
+                if response.status_code != 200:
+                    raise RuntimeError(f"连接推送接口失败: {response.text}")
+                for event, data, event_id in iter_sse(response):
+                    if event_id is not None:
+                        cursor = int(event_id)
+                    yield event, data
+                    if event == "done":
+                        return
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f"推送连接中断，正在重连: {e}")
+            time.sleep(poll_interval)
+
+
+def format_progress(progress):
+    """学习进度快照的简短描述"""
+    parts = []
+    course = progress.get("course")
+    chapter = progress.get("chapter")
+    job = progress.get("job")
+    answers = progress.get("answers") or {}
+    if course:
+        parts.append(f"课程 {course['index']}/{course['total']} {course['title']}")
+    if chapter:
+        parts.append(f"章节 {chapter['index']}/{chapter['total']} {chapter['title']}")
+    if job:
+        parts.append(f"任务点 {job.get('name') or job.get('job_type')} {job.get('percent') or 0}%")
+    if answers.get("total"):
+        parts.append(f"找到答案 {answers['found']}/{answers['total']}")
+    return " | ".join(parts)
+
+
+def print_task_events(host, task_id, poll_interval=2):
+    """
+    显示任务进度, 只显示每批输出的最后一行, 任务结束后返回是否成功
+    """
+    last_output_line = ""
+    last_progress_line = ""
+    for event, data in stream_task_events(host, task_id, poll_interval):
+        if event == "status":
+            if data.get("queued"):
+                print(f"排队中，当前排在第 {data.get('queue_position')} 位")
+        elif event == "progress":
+            progress_line = format_progress(data)
+            if progress_line and progress_line != last_progress_line:
+                last_progress_line = progress_line
+                print(f"[进度] {progress_line}")
+        elif event == "output":
+            if data.get("dropped"):
+                print(f"（{data['dropped']} 行输出已丢弃）")
+            current_line = data["lines"][-1]
+            # 如果最后一行发生变化，则显示
+            if current_line != last_output_line:
+                last_output_line = current_line
+                print(f"> {current_line}")
+        elif event == "done":
+            return data.get("success", False), data
+    return False, {}
+
+
 def run_script_and_monitor_last_line(host, username, password, list_id, poll_interval=2):
     """
     运行脚本并只监控最后一行输出的简化版本
-    
+
     Args:
         host: 服务器地址，如 "http://154.36.158.140:5000" 或 "http://127.0.0.1:5000"
         username: 用户名
         password: 密码
         list_id: 列表ID
-        poll_interval: 轮询间隔（秒）
+        poll_interval: 服务端不支持推送时的轮询间隔（秒）
     """
-    
+
     # 1. 启动任务
     print("正在启动任务...")
     response = requests.post(
         f"{host}/api/run",
         json={
             "username": username,
-            "password": password, 
+            "password": password,
             "list_id": list_id
         }
     )
-    
+
     if response.status_code != 200:
         print(f"启动任务失败: {response.text}")
         return None
-    
+
     result = response.json()
     print(f"启动成功: {result['message']}")
-    
+
     task_id = result.get("task_id")
     if not task_id:
         print("未获取到任务ID")
         return None
-    
+
     print(f"任务ID: {task_id}")
     print("开始监控最后一行输出...\n")
-    
-    # 2. 监控任务状态和最后一行输出
-    last_output_line = ""
-    task_completed = False
-    
+
+    # 2. 接收任务状态和输出的推送
     try:
-        while not task_completed:
-            # 获取任务状态
-            status_response = requests.get(f"{host}/api/status/{task_id}")
-            if status_response.status_code == 200:
-                status_data = status_response.json()
-                running = status_data.get("running", False)
-                
-                # 获取所有输出
-                output_response = requests.get(f"{host}/api/output/{task_id}")
-                
-                if output_response.status_code == 200:
-                    output_data = output_response.json()
-                    all_outputs = output_data.get("output", [])
-                    
-                    # 只获取最后一行输出
-                    if all_outputs:
-                        last_output = all_outputs[-1]
-                        current_line = last_output.get("content", "")
-                        
-                        # 如果最后一行发生变化，则显示
-                        if current_line != last_output_line:
-                            last_output_line = current_line
-                            output_type = last_output.get("type", "stdout")
-                            prefix = ">" if output_type == "stdout" else "![错误]"
-                            print(f"{prefix} {current_line}")
-                    
-                    # 更新任务完成状态
-                    if not running and not task_completed:
-                        task_completed = True
-                        print("\n" + "="*40)
-                        print("任务执行完成!")
-                        
-                        # 显示最终结果
-                        if status_data.get("last_result"):
-                            print("✅ 执行成功!")
-                        elif status_data.get("last_error"):
-                            error_info = status_data.get("last_error", {})
-                            print(f"❌ 执行失败: {error_info.get('stderr', '未知错误')}")
-                        
-                        print("="*40)
-                
-                else:
-                    print(f"获取输出失败: {output_response.text}")
-            
-            else:
-                print(f"获取状态失败: {status_response.text}")
-                break
-            
-            # 如果任务还在运行，等待一段时间后继续轮询
-            if not task_completed:
-                time.sleep(poll_interval)
-    
+        success, outcome = print_task_events(host, task_id, poll_interval)
+        print("\n" + "="*40)
+        print("任务执行完成!")
+
+        # 显示最终结果
+        if success:
+            print("✅ 执行成功!")
+        else:
+            print(f"❌ 执行失败: {outcome.get('stderr') or '未知错误'}")
+
+        print("="*40)
+
     except KeyboardInterrupt:
         print("\n用户中断监控，正在停止任务...")
         stop_response = requests.post(f"{host}/api/stop/{task_id}")
@@ -105,10 +218,10 @@ def run_script_and_monitor_last_line(host, username, password, list_id, poll_int
             print("任务已停止")
         else:
             print(f"停止任务失败: {stop_response.text}")
-    
+
     except Exception as e:
         print(f"监控过程中发生错误: {e}")
-    
+
     return task_id
 
 def get_last_line_only(host, task_id):
@@ -117,19 +230,15 @@ def get_last_line_only(host, task_id):
     """
     try:
         response = requests.get(f"{host}/api/output/{task_id}")
-        
+
         if response.status_code == 200:
             data = response.json()
             outputs = data.get("output", [])
-            
+
             if outputs:
-                last_output = outputs[-1]
-                content = last_output.get("content", "")
-                output_type = last_output.get("type", "stdout")
-                
-                prefix = "最后输出>" if output_type == "stdout" else "最后错误!"
-                print(f"{prefix} {content}")
-                
+                content = outputs[-1]
+                print(f"最后输出> {content}")
+
                 return content
             else:
                 print("暂无输出")
@@ -137,7 +246,7 @@ def get_last_line_only(host, task_id):
         else:
             print(f"获取输出失败: {response.text}")
             return None
-            
+
     except Exception as e:
         print(f"获取输出时发生错误: {e}")
         return None
@@ -148,44 +257,11 @@ def monitor_last_line_realtime(host, task_id, poll_interval=2):
     """
     print(f"开始实时监控任务 {task_id} 的最后一行输出...")
     print("按 Ctrl+C 停止监控\n")
-    
-    last_output_line = ""
-    
+
     try:
-        while True:
-            # 获取任务状态
-            status_response = requests.get(f"{host}/api/status/{task_id}")
-            if status_response.status_code != 200:
-                print("获取任务状态失败")
-                break
-                
-            status_data = status_response.json()
-            running = status_data.get("running", False)
-            
-            # 获取输出
-            output_response = requests.get(f"{host}/api/output/{task_id}")
-            if output_response.status_code == 200:
-                output_data = output_response.json()
-                all_outputs = output_data.get("output", [])
-                
-                # 只显示最后一行
-                if all_outputs:
-                    last_output = all_outputs[-1]
-                    current_line = last_output.get("content", "")
-                    
-                    if current_line != last_output_line:
-                        last_output_line = current_line
-                        output_type = last_output.get("type", "stdout")
-                        prefix = ">" if output_type == "stdout" else "![错误]"
-                        print(f"{prefix} {current_line}")
-            
-            # 如果任务已完成，退出监控
-            if not running:
-                print("\n任务已完成")
-                break
-                
-            time.sleep(poll_interval)
-            
+        print_task_events(host, task_id, poll_interval)
+        print("\n任务已完成")
+
     except KeyboardInterrupt:
         print("\n停止监控")
     except Exception as e:
@@ -1,17 +1,191 @@
+import argparse
+import json
 import subprocess
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import threading
 import time
 import os
 import sys
 import uuid
 
+from api.progress import ProgressEvent, ProgressState, parse_progress_line
+from task_output import OutputBuffer
+from task_pool import TaskHandler, WorkerPool, task_argv
+from task_scheduler import DuplicateTaskError, QueueFullError, TaskScheduler
+
 app = Flask(__name__)
 
 # 存储执行状态和结果
 execution_status = {}
 # 存储线程对象
 execution_threads = {}
+# 常驻工作进程池, 启动参数 --workers 为0时不创建, 每个任务改为启动子进程执行
+worker_pool = None
+# 任务准入控制, 限制同时执行的任务数和排队任务数, 启动时根据参数重新创建
+scheduler = TaskScheduler()
+# 任务ID -> 输出缓冲区, 不放在 execution_status 中, 避免每次查询状态都复制全部输出
+task_outputs = {}
+# 任务ID -> 学习进度快照, 由工作进程回传或子进程输出的进度事件合并而成
+task_progress = {}
+# 每个任务在内存中保留的输出行数, 以及保存完整输出的日志目录(为None时不写文件), 启动时根据参数设置
+OUTPUT_MAX_LINES = 1000
+OUTPUT_LOG_DIR = None
+# 推送接口检查任务状态的间隔, 以及无事件时发送保活注释的间隔(秒)
+STREAM_POLL_INTERVAL = 1
+STREAM_KEEPALIVE_INTERVAL = 15
+# 长轮询 /api/output/<id>?wait= 的最长等待时间(秒)
+OUTPUT_MAX_WAIT = 30
+
+
+def new_output_buffer(task_id):
+    log_path = os.path.join(OUTPUT_LOG_DIR, f"{task_id}.log") if OUTPUT_LOG_DIR else None
+    buffer = OutputBuffer(OUTPUT_MAX_LINES, log_path)
+    task_outputs[task_id] = buffer
+    task_progress[task_id] = ProgressState()
+    return buffer
+
+
+def drop_output(task_id):
+    """任务未被接受时移除其输出缓冲区和进度"""
+    task_outputs.pop(task_id, None)
+    task_progress.pop(task_id, None)
+
+
+def append_output(task_id, line):
+    buffer = task_outputs.get(task_id)
+    if buffer is not None:
+        buffer.append(line)
+
+
+def handle_output_line(task_id, line):
+    """子进程的一行输出, 进度事件合并到任务进度中, 其余行写入输出缓冲区"""
+    event = parse_progress_line(line)
+    if event is not None:
+        record_progress(task_id, event)
+        return
+    append_output(task_id, line)
+    print(f"任务 {task_id} 输出: {line}")
+
+
+def record_progress(task_id, event):
+    """合并进度事件, 并唤醒推送连接"""
+    state = task_progress.get(task_id)
+    if state is not None:
+        state.apply(event)
+        wake_output(task_id)
+
+
+def progress_snapshot(task_id):
+    state = task_progress.get(task_id)
+    return state.snapshot() if state is not None else None
+
+
+def output_text(task_id):
+    """内存中保留的输出, 作为任务结束时的 stdout"""
+    buffer = task_outputs.get(task_id)
+    return "\n".join(buffer.tail()) if buffer is not None else ""
+
+
+def close_output(task_id):
+    buffer = task_outputs.get(task_id)
+    if buffer is not None:
+        buffer.close()
+
+
+def wake_output(task_id):
+    """任务状态变化后唤醒等待输出的推送连接"""
+    buffer = task_outputs.get(task_id)
+    if buffer is not None:
+        buffer.wake()
+
+
+class PoolTaskHandler(TaskHandler):
+    """将工作进程池的任务事件写入 execution_status"""
+
+    def on_start(self, task_id, pid):
+        if task_id in execution_status:
+            execution_status[task_id]["pid"] = pid
+            print(f"任务 {task_id} 开始执行，工作进程: {pid}")
+
+    def on_output(self, task_id, line):
+        if task_id in execution_status:
+            append_output(task_id, line)
+            print(f"任务 {task_id} 输出: {line}")
+
+    def on_progress(self, task_id, event):
+        record_progress(task_id, ProgressEvent.from_dict(event))
+
+    def on_done(self, task_id, returncode, error):
+        status = execution_status.get(task_id)
+        if status is None:
+            scheduler.finish(task_id)
+            return
+        close_output(task_id)
+        result = {
+            "returncode": returncode,
+            "stdout": output_text(task_id),
+            "stderr": error,
+            "completed": True
+        }
+        status["last_result"] = result
+        if returncode == 0:
+            print(f"命令执行成功，任务ID: {task_id}")
+        else:
+            status["last_error"] = result
+            print(f"命令执行失败，任务ID: {task_id}, 返回码: {returncode}")
+        status["running"] = False
+        status["end_time"] = time.time()
+        wake_output(task_id)
+        scheduler.finish(task_id)
+
+
+def new_queued_status():
+    """排队中的任务状态, 开始执行时由各执行函数更新"""
+    return {
+        "running": True,
+        "queued": True,
+        "last_result": None,
+        "last_error": None,
+        "start_time": time.time()
+    }
+
+
+def run_main_script_in_pool(task_id, username, password, list_id):
+    """交给常驻工作进程执行, 状态和输出格式与新线程模式一致"""
+    status = execution_status[task_id]
+    status["queued"] = False
+    status["start_time"] = time.time()
+    worker_pool.submit(task_id, task_argv(username, password, list_id))
+
+
+def start_in_thread(task_id, target, args):
+    """在新线程中执行任务, 结束后释放调度器名额"""
+    def run():
+        try:
+            target(task_id, *args)
+        except Exception as e:
+            # 执行函数在更新状态之前出错时记录失败, 避免任务一直显示为排队或执行中
+            status = execution_status.get(task_id)
+            if status is not None:
+                status["running"] = False
+                status["queued"] = False
+                status["last_error"] = {
+                    "returncode": -1,
+                    "stdout": "",
+                    "stderr": str(e),
+                    "completed": False
+                }
+                status["end_time"] = time.time()
+                wake_output(task_id)
+            print(f"执行异常，任务ID: {task_id}: {e}")
+        finally:
+            scheduler.finish(task_id)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    # 保存线程引用
+    execution_threads[task_id] = thread
 
 def run_main_script_in_thread(task_id, username, password, list_id):
     """在新线程中运行主脚本"""
@@ -21,8 +195,7 @@ def run_main_script_in_thread(task_id, username, password, list_id):
         "running": True,
         "last_result": None,
         "last_error": None,
-        "start_time": time.time(),
-        "output": []  # 用于存储实时输出
+        "start_time": time.time()
     }
     
     try:
@@ -30,17 +203,19 @@ def run_main_script_in_thread(task_id, username, password, list_id):
             "python", "main.py", 
             "-u", username, 
             "-p", password, 
-            "-l", str(list_id)
+            "-l", str(list_id),
+            "--progress-stdout"
         ]
         
         print(f"开始在新线程中执行命令，任务ID: {task_id}")
         print(f"命令: {' '.join(cmd)}")
         
         # 使用Popen来获取实时输出
+        # 日志由 loguru 写入 stderr, 合并到 stdout 后按产生顺序实时读取, 也避免 stderr 管道写满阻塞子进程
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
             bufsize=1,
             universal_newlines=True
@@ -48,38 +223,22 @@ def run_main_script_in_thread(task_id, username, password, list_id):
         
         # 读取实时输出
         def read_output():
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    execution_status[task_id]["output"].append(output.strip())
-                    print(f"任务 {task_id} 输出: {output.strip()}")
-            
-            # 读取剩余输出
-            remaining_stdout, stderr = process.communicate()
-            if remaining_stdout:
-                for line in remaining_stdout.split('\n'):
-                    if line.strip():
-                        execution_status[task_id]["output"].append(line.strip())
-                        print(f"任务 {task_id} 输出: {line.strip()}")
-            if stderr:
-                for line in stderr.split('\n'):
-                    if line.strip():
-                        execution_status[task_id]["output"].append(f"错误: {line.strip()}")
-                        print(f"任务 {task_id} 错误: {line.strip()}")
+            for output in process.stdout:
+                if output.strip():
+                    handle_output_line(task_id, output.strip())
         
         # 启动输出读取线程
         output_thread = threading.Thread(target=read_output)
         output_thread.daemon = True
         output_thread.start()
         
-        # 等待进程完成
+        # 等待进程完成, 并等待输出读取完毕, 任务结束前推送接口和 stdout 已包含全部输出
         returncode = process.wait()
+        output_thread.join()
         
         execution_status[task_id]["last_result"] = {
             "returncode": returncode,
-            "stdout": "\n".join(execution_status[task_id]["output"]),
+            "stdout": output_text(task_id),
             "stderr": "",
             "completed": True
         }
@@ -89,7 +248,7 @@ def run_main_script_in_thread(task_id, username, password, list_id):
         else:
             execution_status[task_id]["last_error"] = {
                 "returncode": returncode,
-                "stdout": "\n".join(execution_status[task_id]["output"]),
+                "stdout": output_text(task_id),
                 "stderr": "",
                 "completed": True
             }
@@ -98,7 +257,7 @@ def run_main_script_in_thread(task_id, username, password, list_id):
     except subprocess.TimeoutExpired:
         execution_status[task_id]["last_error"] = {
             "returncode": -1,
-            "stdout": "\n".join(execution_status[task_id].get("output", [])),
+            "stdout": output_text(task_id),
             "stderr": "命令执行超时",
             "completed": False
         }
@@ -106,7 +265,7 @@ def run_main_script_in_thread(task_id, username, password, list_id):
     except Exception as e:
         execution_status[task_id]["last_error"] = {
             "returncode": -1,
-            "stdout": "\n".join(execution_status[task_id].get("output", [])),
+            "stdout": output_text(task_id),
             "stderr": str(e),
             "completed": False
         }
@@ -114,6 +273,8 @@ def run_main_script_in_thread(task_id, username, password, list_id):
     finally:
         execution_status[task_id]["running"] = False
         execution_status[task_id]["end_time"] = time.time()
+        close_output(task_id)
+        wake_output(task_id)
         # 清理线程引用
         if task_id in execution_threads:
             del execution_threads[task_id]
@@ -209,29 +370,50 @@ def run_script():
     
     # 获取执行模式，默认为新线程模式（不再是新窗口）
     use_thread_mode = data.get('new_window', True)  # 保持参数名兼容，但实际使用线程
+    args = (username, password, list_id)
     
-    # 在新线程中执行脚本
-    if use_thread_mode:
-        thread = threading.Thread(
-            target=run_main_script_in_thread,
-            args=(task_id, username, password, list_id)
-        )
+    if worker_pool is not None:
+        use_thread_mode = True
+        mode = "工作进程模式"
+        start = lambda: run_main_script_in_pool(task_id, *args)
+    elif use_thread_mode:
+        # 在新线程中执行脚本
+        mode = "新线程模式"
+        start = lambda: start_in_thread(task_id, run_main_script_in_thread, args)
     else:
-        thread = threading.Thread(
-            target=run_main_script_background,
-            args=(task_id, username, password, list_id)
-        )
-    
-    thread.daemon = True
-    thread.start()
+        mode = "后台模式"
+        start = lambda: start_in_thread(task_id, run_main_script_background, args)
     
-    # 保存线程引用
-    execution_threads[task_id] = thread
+    # 执行名额已满时进入队列, 同一账号只允许一个未完成的任务
+    execution_status[task_id] = new_queued_status()
+    new_output_buffer(task_id)
+    try:
+        position = scheduler.submit(task_id, str(username), start)
+    except DuplicateTaskError as e:
+        del execution_status[task_id]
+        drop_output(task_id)
+        return jsonify({
+            "status": "error",
+            "message": f"账号 {username} 已有未完成的任务",
+            "task_id": e.task_id
+        }), 409
+    except QueueFullError as e:
+        del execution_status[task_id]
+        drop_output(task_id)
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 429
     
+    if position == 0:
+        message = f"任务已开始执行（{mode}）"
+    else:
+        message = f"任务已加入队列，当前排在第 {position} 位（{mode}）"
     return jsonify({
         "status": "success",
-        "message": "任务已开始执行" + ("（新线程模式）" if use_thread_mode else "（后台模式）"),
+        "message": message,
         "task_id": task_id,
+        "queue_position": position,
         "new_window": use_thread_mode  # 保持兼容性
     })
 
@@ -244,7 +426,15 @@ def get_status():
 def get_task_status(task_id):
     """获取特定任务状态的API接口"""
     if task_id in execution_status:
-        return jsonify(execution_status[task_id])
+        # queue_position: 0 表示执行中, 大于0表示排队位置, None 表示已结束
+        status = dict(execution_status[task_id])
+        status["queue_position"] = scheduler.position(task_id)
+        # 输出通过 /api/output/<id> 分页获取, 这里只返回行数和日志文件
+        buffer = task_outputs.get(task_id)
+        status["line_count"] = len(buffer) if buffer is not None else 0
+        status["log_file"] = buffer.log_path if buffer is not None else None
+        status["progress"] = progress_snapshot(task_id)
+        return jsonify(status)
     else:
         return jsonify({
             "status": "error",
@@ -258,7 +448,7 @@ def list_tasks():
     for task_id, status in execution_status.items():
         task_info = {
             "task_id": task_id,
-            "status": "running" if status["running"] else "completed",
+            "status": "queued" if status.get("queued") else ("running" if status["running"] else "completed"),
             "start_time": status.get("start_time"),
             "end_time": status.get("end_time"),
             "has_error": status.get("last_error") is not None
@@ -272,13 +462,27 @@ def list_tasks():
 
 @app.route('/api/output/<task_id>', methods=['GET'])
 def get_task_output(task_id):
-    """获取任务实时输出的API接口"""
-    if task_id in execution_status:
-        output_data = execution_status[task_id].get("output", [])
+    """
+    获取任务实时输出的API接口
+
+    查询参数 since 为上次返回的 next, 只返回之后的新行; 不传时返回内存中保留的最近输出;
+    limit 限制返回的行数
+    """
+    buffer = task_outputs.get(task_id)
+    if task_id in execution_status and buffer is not None:
+        since = request.args.get("since", type=int)
+        # 长轮询: 传入 wait=<秒> 时, 没有新行则等待新行或任务结束后再返回
+        wait = min(request.args.get("wait", 0, type=float), OUTPUT_MAX_WAIT)
+        if since is not None and wait > 0 and execution_status[task_id]["running"]:
+            buffer.wait(since, wait)
+        result = buffer.read(since, request.args.get("limit", type=int))
         return jsonify({
             "task_id": task_id,
-            "output": output_data,
-            "line_count": len(output_data)
+            "output": result["lines"],
+            "line_count": result["total"],
+            "offset": result["offset"],
+            "next": result["next"],
+            "dropped": result["dropped"]
         })
     else:
         return jsonify({
@@ -286,6 +490,96 @@ def get_task_output(task_id):
             "message": "任务ID不存在"
         }), 404
 
+def task_state(task_id):
+    """推送给客户端的任务状态"""
+    status = execution_status.get(task_id, {})
+    return {
+        "running": status.get("running", False),
+        "queued": bool(status.get("queued")),
+        "queue_position": scheduler.position(task_id),
+        "pid": status.get("pid")
+    }
+
+
+def task_outcome(task_id):
+    """任务结束时推送的结果, 不含 stdout, 完整输出已通过 output 事件推送"""
+    status = execution_status.get(task_id, {})
+    result = status.get("last_error") or status.get("last_result") or {}
+    return {
+        "success": status.get("last_error") is None,
+        "returncode": result.get("returncode"),
+        "stderr": result.get("stderr", ""),
+        "end_time": status.get("end_time")
+    }
+
+
+def format_sse(event, data, event_id=None):
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/stream/<task_id>', methods=['GET'])
+def stream_task(task_id):
+    """
+    以 Server-Sent Events 推送任务进度
+
+    事件类型:
+        status: 任务状态变化, 包括排队位置
+        progress: 学习进度快照变化, 包括当前课程、章节、任务点和答题情况
+        output: 新的输出行, id 为下一次的游标, 断线重连时通过 Last-Event-ID 或 since 参数续传
+        done: 任务结束, 推送后关闭连接
+    """
+    buffer = task_outputs.get(task_id)
+    if task_id not in execution_status or buffer is None:
+        return jsonify({
+            "status": "error",
+            "message": "任务ID不存在"
+        }), 404
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", 0, type=int)
+
+    def generate():
+        cursor = since
+        last_state = None
+        last_seq = 0  # 还没有进度事件时不推送空快照
+        last_sent = time.time()
+        while True:
+            result = buffer.read(cursor)
+            if result["lines"]:
+                cursor = result["next"]
+                last_sent = time.time()
+                yield format_sse("output", {
+                    "offset": result["offset"],
+                    "lines": result["lines"],
+                    "dropped": result["dropped"]
+                }, cursor)
+                continue
+            snapshot = progress_snapshot(task_id)
+            if snapshot is not None and snapshot["seq"] != last_seq:
+                last_seq = snapshot["seq"]
+                last_sent = time.time()
+                yield format_sse("progress", snapshot)
+            state = task_state(task_id)
+            if state != last_state:
+                last_state = state
+                last_sent = time.time()
+                yield format_sse("status", state)
+            if not state["running"]:
+                yield format_sse("done", task_outcome(task_id))
+                return
+            if not buffer.wait(cursor, STREAM_POLL_INTERVAL) and time.time() - last_sent >= STREAM_KEEPALIVE_INTERVAL:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/stop/<task_id>', methods=['POST'])
 def stop_task(task_id):
     """停止运行中的任务"""
@@ -303,8 +597,15 @@ def stop_task(task_id):
             "message": "任务未在运行"
         }), 400
     
-    # 这里可以添加终止逻辑
-    # 注意：终止外部进程比较复杂，这里只是标记状态
+    # 排队中的任务直接移出队列
+    # 工作进程模式下终止执行该任务的工作进程
+    # 子进程模式终止外部进程比较复杂，这里只是标记状态, 名额在进程结束后释放
+    if scheduler.cancel(task_id):
+        execution_status[task_id]["queued"] = False
+    elif worker_pool is not None:
+        worker_pool.cancel(task_id)
+        scheduler.finish(task_id)
+        close_output(task_id)
     execution_status[task_id]["running"] = False
     execution_status[task_id]["last_error"] = {
         "returncode": -1,
@@ -313,6 +614,7 @@ def stop_task(task_id):
         "completed": False
     }
     execution_status[task_id]["end_time"] = time.time()
+    wake_output(task_id)
     
     return jsonify({
         "status": "success",
@@ -326,13 +628,15 @@ def health_check():
         "status": "healthy",
         "timestamp": time.time(),
         "active_tasks": len([t for t in execution_status.values() if t["running"]]),
-        "total_tasks": len(execution_status)
+        "total_tasks": len(execution_status),
+        "worker_pool": worker_pool.stats() if worker_pool is not None else None,
+        "scheduler": scheduler.stats()
     })
 
 @app.route('/api/cleanup', methods=['POST'])
 def cleanup_tasks():
     """清理已完成的任务记录"""
-    global execution_status, execution_threads
+    global execution_status, execution_threads, task_outputs, task_progress
     
     # 只保留最近24小时的任务记录
     cutoff_time = time.time() - 24 * 60 * 60
@@ -344,6 +648,20 @@ def cleanup_tasks():
         if status.get("start_time", 0) > cutoff_time or status.get("running", False)
     }
     
+    # 同时清理输出缓冲区和进度, 日志文件保留在磁盘上
+    for task_id in set(task_outputs) - set(execution_status):
+        close_output(task_id)
+    task_outputs = {
+        task_id: buffer
+        for task_id, buffer in task_outputs.items()
+        if task_id in execution_status
+    }
+    task_progress = {
+        task_id: state
+        for task_id, state in task_progress.items()
+        if task_id in execution_status
+    }
+    
     # 同时清理线程引用
     execution_threads = {
         task_id: thread 
@@ -360,20 +678,61 @@ def cleanup_tasks():
     })
 
 if __name__ == '__main__':
-    print("启动接口服务，监听端口 5000")
+    parser = argparse.ArgumentParser(description="学习任务接口服务")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument(
+        "--workers", type=int, default=2,
+        help="常驻工作进程数量, 0表示每个任务启动一个 python main.py 子进程"
+    )
+    parser.add_argument(
+        "--max-concurrent", type=int, default=None,
+        help="同时执行的最大任务数 (默认与工作进程数量相同, 子进程模式默认2)"
+    )
+    parser.add_argument(
+        "--max-queue", type=int, default=20,
+        help="排队等待的最大任务数, 队列已满时 /api/run 返回429"
+    )
+    parser.add_argument(
+        "--output-lines", type=int, default=1000,
+        help="每个任务在内存中保留的最近输出行数"
+    )
+    parser.add_argument(
+        "--output-dir", type=str, default=None,
+        help="保存任务完整输出的日志目录, 每个任务一个 <task_id>.log (默认不保存)"
+    )
+    args = parser.parse_args()
+
+    OUTPUT_MAX_LINES = args.output_lines
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        OUTPUT_LOG_DIR = args.output_dir
+
+    max_concurrent = args.max_concurrent or (args.workers if args.workers > 0 else 2)
+    scheduler = TaskScheduler(max_concurrent, args.max_queue)
+
+    if args.workers > 0:
+        worker_pool = WorkerPool(args.workers, PoolTaskHandler())
+        worker_pool.start()
+
+    print(f"启动接口服务，监听端口 {args.port}")
     print("可用接口:")
     print("  POST /api/run          - 执行脚本")
     print("  GET  /api/status       - 获取所有任务状态")
     print("  GET  /api/status/<id>  - 获取特定任务状态")
     print("  GET  /api/tasks        - 列出所有任务")
-    print("  GET  /api/output/<id>  - 获取任务实时输出")
+    print("  GET  /api/output/<id>  - 获取任务实时输出（?since=<next> 只获取新输出，&wait=<秒> 长轮询）")
+    print("  GET  /api/stream/<id>  - 以 Server-Sent Events 推送任务状态、学习进度和输出")
     print("  POST /api/stop/<id>    - 停止运行中的任务")
     print("  GET  /api/health       - 健康检查")
     print("  POST /api/cleanup      - 清理任务记录")
+    print(f"\n并发限制: 最多同时执行 {scheduler.max_concurrent} 个任务，排队 {scheduler.max_queue} 个，同一账号只允许一个未完成的任务")
     print("\n执行模式:")
-    print("  - 默认在新线程中执行（支持实时输出）")
-    print("  - 可通过请求体中的 'new_window': false 切换到简单后台模式")
+    if worker_pool is not None:
+        print(f"  - 由 {args.workers} 个常驻工作进程执行（支持实时输出），超出的任务排队等待")
+    else:
+        print("  - 默认在新线程中执行（支持实时输出）")
+        print("  - 可通过请求体中的 'new_window': false 切换到简单后台模式")
     
 
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    app.run(host='0.0.0.0', port=args.port, debug=False)
 